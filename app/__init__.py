@@ -1,5 +1,44 @@
-from .core.connection import IBConnection
-from .core.config import ConfigWatcher
-from .services.trade_logger import TradeLogger
+import importlib
 
-__all__ = ['IBConnection', 'ConfigWatcher', 'TradeLogger']
\ No newline at end of file
+# Öffentliche Klassen -> Modul; erst beim ersten Zugriff importiert, damit `import app.x`
+# nicht ib_insync, numpy usw. für alle Dienste lädt (Startzeit von main.py)
+_EXPORTS = {
+    'IBConnection': '.core.connection',
+    'ConfigWatcher': '.core.config',
+    'OrderSettings': '.core.settings',
+    'TradeLogger': '.services.trade_logger',
+    'TradeJournal': '.services.trade_journal',
+    'OrderTracker': '.services.order_tracker',
+    'BracketSupervisor': '.services.bracket_supervisor',
+    'EventBus': '.services.event_bus',
+    'TradeStats': '.services.trade_stats',
+    'AlertMetrics': '.services.metrics',
+    'MetricsRegistry': '.services.metrics',
+    'IdempotencyCache': '.services.idempotency',
+    'InstrumentRegistry': '.services.instrument_registry',
+    'InstrumentSpec': '.services.instrument_registry',
+    'Bars': '.services.backtester',
+    'BracketBacktester': '.services.backtester',
+    'ParameterSweep': '.services.optimizer',
+    'BarStore': '.services.bar_store',
+    'MarketDataManager': '.services.market_data',
+    'BracketReconciler': '.services.reconciler',
+    'PnLEngine': '.services.pnl_engine',
+    'AlertIntake': '.services.alert_intake',
+    'StartupProfile': '.core.startup',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
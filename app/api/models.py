@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic import BaseModel
 
 class BracketOrderModel(BaseModel):
@@ -9,4 +10,6 @@ class BracketOrderModel(BaseModel):
     trailAmt: int          
     stopLoss: float = 20    
     timeframe: str = "None" 
-    relativeType: str = "ticks"
\ No newline at end of file
+    relativeType: str = "ticks"
+    timestamp: Optional[str] = None
+    idempotencyKey: Optional[str] = None
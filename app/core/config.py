@@ -1,7 +1,31 @@
 import asyncio
 import yaml
 import os
-from datetime import datetime
+from .settings import OrderSettings
+from .log import get_logger
+
+log = get_logger("config")
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:  # watchdog nicht installiert: Polling als Fallback
+    Observer = None
+    FileSystemEventHandler = object
+
+
+class _ConfigFileHandler(FileSystemEventHandler):
+    """Forwards filesystem events for the config file to the event loop"""
+    def __init__(self, path, loop, callback):
+        self.path = path
+        self.loop = loop
+        self.callback = callback
+
+    def on_any_event(self, event):
+        paths = (event.src_path, getattr(event, 'dest_path', None))
+        if self.path in (os.path.abspath(p) for p in paths if p):
+            self.loop.call_soon_threadsafe(self.callback)
+
 
 # Replace the static config loading with a Config class
 class ConfigWatcher:
@@ -10,15 +34,39 @@ class ConfigWatcher:
         self.reload_interval = reload_interval
         self.last_modified = None
         self.config = {}
+        self.version = 0
+        self.settings = OrderSettings()  # compiled, immutable order_settings snapshot
         self._watch_task = None
+        self._observer = None
+        self._pending_reload = None
+        self.on_change = None  # optional callback(config) after a reload
 
     async def start_watching(self):
-        """Start the config file watching task"""
+        """Start watching the config file (inotify via watchdog, polling as fallback)"""
+        self.reload()
+        if Observer is not None:
+            try:
+                path = os.path.abspath(self.config_path)
+                handler = _ConfigFileHandler(path, asyncio.get_running_loop(), self._schedule_reload)
+                self._observer = Observer()
+                self._observer.schedule(handler, os.path.dirname(path), recursive=False)
+                self._observer.start()
+                log.info("Started watching %s for changes (filesystem events)", self.config_path)
+                return
+            except Exception as e:
+                log.warning("Filesystem watcher unavailable (%s), falling back to polling", e)
+                self._observer = None
         self._watch_task = asyncio.create_task(self._watch_config())
-        print(f"📋 Started watching {self.config_path} for changes")
+        log.info("Started watching %s for changes", self.config_path)
 
     async def stop_watching(self):
         """Stop the config file watching task"""
+        if self._pending_reload:
+            self._pending_reload.cancel()
+        if self._observer:
+            self._observer.stop()
+            await asyncio.to_thread(self._observer.join)
+            self._observer = None
         if self._watch_task:
             self._watch_task.cancel()
             await asyncio.gather(self._watch_task, return_exceptions=True)
@@ -30,31 +78,73 @@ class ConfigWatcher:
     async def _watch_config(self):
         """Watch the config file for changes and reload when modified"""
         while True:
-            try:
-                if os.path.exists(self.config_path):
-                    mtime = os.path.getmtime(self.config_path)
-                    
-                    # Check if file was modified
-                    if self.last_modified != mtime:
+            self.reload()
+            await asyncio.sleep(self.reload_interval)
+
+    def _schedule_reload(self, delay=0.05):
+        """Coalesce bursts of filesystem events (editors write in several steps)"""
+        if self._pending_reload:
+            self._pending_reload.cancel()
+        self._pending_reload = asyncio.get_running_loop().call_later(delay, self.reload)
+
+    def reload(self):
+        """Reload the config file if it was modified since the last read"""
+        try:
+            if os.path.exists(self.config_path):
+                mtime = os.path.getmtime(self.config_path)
+                
+                # Check if file was modified
+                if self.last_modified != mtime:
+                    try:
                         with open(self.config_path, 'r') as f:
                             new_config = yaml.safe_load(f)
-                            
-                        if new_config != self.config:
-                            old_config = self.config.copy()
-                            self.config = new_config
-                            self.last_modified = mtime
-                            print(f"🔄 Config reloaded at {datetime.now().strftime('%H:%M:%S')}")
-                            # Log significant changes
-                            self._log_config_changes(old_config, new_config)
-                else:
-                    print(f"⚠️ Config file {self.config_path} not found, using defaults")
-                    self.config = {}
-                
-            except Exception as e:
-                print(f"❌ Error reading config: {e}")
-                self.config = {}
-                
-            await asyncio.sleep(self.reload_interval)
+                    except (OSError, yaml.YAMLError) as e:
+                        new_config = e
+                    if not isinstance(new_config, dict) or not new_config:
+                        # Datei wird gerade geschrieben (leer oder halb): letzten gültigen Stand behalten,
+                        # last_modified bleibt, das nächste Event bzw. Polling liest erneut
+                        log.warning("Config file empty or unreadable, keeping version %s: %s", self.version,
+                                    new_config if isinstance(new_config, Exception) else "no mapping")
+                        return
+
+                    if new_config == self.config:
+                        # Nur das mtime geändert (z.B. touch): nicht bei jedem Poll neu parsen
+                        self.last_modified = mtime
+                        return
+                    try:
+                        settings = OrderSettings.from_config(new_config, self.version + 1)
+                    except ValueError as e:
+                        log.error("Invalid config, keeping version %s: %s", self.version, e)
+                        self.last_modified = mtime
+                        return
+                    old_config = self.config.copy()
+                    self.config = new_config
+                    self.settings = settings
+                    self.version = settings.version
+                    self.last_modified = mtime
+                    log.info("Config reloaded (version %s)", self.version)
+                    # Log significant changes
+                    self._log_config_changes(old_config, new_config)
+                    if self.on_change:
+                        self.on_change(new_config)
+            else:
+                log.warning("Config file %s not found, using defaults", self.config_path)
+                self._reset()
+
+        except Exception as e:
+            # Unerwarteter Fehler: letzten gültigen Stand behalten, beim nächsten Event erneut versuchen
+            log.exception("Error reading config, keeping version %s: %s", self.version, e)
+
+    def _reset(self):
+        """Fall back to defaults (config file removed) and publish them like a reload"""
+        self.last_modified = None
+        if self.config:
+            self.config = {}
+            self.version += 1
+            self.settings = OrderSettings(version=self.version)
+            log.info("Config reset to defaults (version %s)", self.version)
+            if self.on_change:
+                self.on_change(self.config)
 
     def _log_config_changes(self, old_config, new_config):
         """Log significant changes in configuration"""
@@ -85,4 +175,5 @@ class ConfigWatcher:
             old_value = get_nested(old_config, path)
             new_value = get_nested(new_config, path)
             if old_value != new_value:
-                print(f"📝 Config change: {path}: {old_value} -> {new_value}")
\ No newline at end of file
+                log.info("Config change: %s: %s -> %s", path, old_value, new_value,
+                         extra={"path": path, "old": old_value, "new": new_value})
\ No newline at end of file
@@ -1,26 +1,29 @@
 from ib_insync import *
 import asyncio
+from .connection_pool import IBConnectionPool
+from ..services.order_tracker import OrderTracker
+from ..services.contract_resolver import ContractResolver
+from ..services.bar_store import BarStore
 
 class IBConnection:
-    def __init__(self):
-        self.ib = IB()
-        self._keep_alive_task = None
+    def __init__(self, settings=None):
+        # Eigene Client-IDs für Orders, Marktdaten und Reporting
+        self.pool = IBConnectionPool()
+        self.pool.configure(settings)
+        self.ib = self.pool.orders
+        self.order_tracker = OrderTracker(self.ib)
+        self.contract_resolver = ContractResolver(self.pool.market_data)
+        self.bar_store = BarStore(self.pool.market_data)
 
     async def connect(self):
         util.patchAsyncio()
-        await self.ib.connectAsync(host='127.0.0.1', port=7497, clientId=1)
-        self._keep_alive_task = asyncio.create_task(self._keep_alive())
+        await self.pool.start()
 
     async def disconnect(self):
-        if self._keep_alive_task:
-            self._keep_alive_task.cancel()
-        self.ib.disconnect()
-
-    async def _keep_alive(self):
-        while True:
-            if not self.ib.isConnected():
-                await self.ib.connectAsync(host='127.0.0.1', port=7497, clientId=1)
-            await asyncio.sleep(10)
+        await self.pool.stop()
 
     def is_connected(self):
-        return self.ib.isConnected()
\ No newline at end of file
+        return self.ib.isConnected()
+
+    def health(self):
+        return self.pool.health()
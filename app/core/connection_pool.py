@@ -0,0 +1,246 @@
+import asyncio
+from datetime import datetime
+from ib_insync import IB
+from .log import get_logger
+from .pacing import RequestPacer
+
+log = get_logger("connection")
+
+ROLES = ("orders", "market_data", "reporting")
+
+DEFAULT_CLIENT_IDS = {"orders": 1, "market_data": 2, "reporting": 3}
+
+
+class RoleConnection:
+    """
+    One IB API client serving a single role.
+
+    Runs its own reconnect loop with exponential backoff and keeps a health
+    record (state, connected since, reconnect count, last error), so a broken
+    market-data or reporting socket never blocks the order connection.
+    Outbound messages go through the connection's RequestPacer.
+    """
+
+    def __init__(self, role, client_id, readonly=False, metrics=None):
+        self.role = role
+        self.client_id = client_id
+        self.readonly = readonly
+        self.ib = IB()
+        self.pacer = RequestPacer(self.ib.client, role, metrics=metrics)
+        self.state = "disconnected"
+        self.connected_since = None
+        self.last_disconnect = None
+        self.last_error = None
+        self.reconnects = 0
+        self.on_state_change = None
+        self._lost = asyncio.Event()
+        self._up = asyncio.Event()
+        self._first_attempt = None
+        self._task = None
+        self.ib.disconnectedEvent += self._on_disconnected
+
+    def start(self, host, port, timeout=4.0, min_backoff=1.0, max_backoff=30.0, check_interval=10.0):
+        self._first_attempt = asyncio.get_running_loop().create_future()
+        self._task = asyncio.create_task(
+            self._run(host, port, timeout, min_backoff, max_backoff, check_interval),
+            name=f"ib-{self.role}",
+        )
+        return self._first_attempt
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.ib.disconnect()
+        self._set_state("disconnected")
+
+    def is_connected(self):
+        return self.ib.isConnected()
+
+    async def wait_connected(self):
+        """Wait until the reconnect loop has (re-)established the connection."""
+        while not self.is_connected():
+            # Ein gesetztes Event kann einem noch nicht gemeldeten Disconnect vorausgehen
+            self._up.clear()
+            await self._up.wait()
+
+    def health(self):
+        return {
+            "role": self.role,
+            "clientId": self.client_id,
+            "state": self.state,
+            "connected": self.is_connected(),
+            "connectedSince": self.connected_since,
+            "lastDisconnect": self.last_disconnect,
+            "lastError": self.last_error,
+            "reconnects": self.reconnects,
+            "pacing": self.pacer.stats(),
+        }
+
+    async def _run(self, host, port, timeout, min_backoff, max_backoff, check_interval):
+        delay = min_backoff
+        connected_before = False
+        while True:
+            if not self.ib.isConnected():
+                self._set_state("reconnecting" if connected_before else "connecting")
+                try:
+                    await self.ib.connectAsync(host=host, port=port, clientId=self.client_id,
+                                               timeout=timeout, readonly=self.readonly)
+                    if connected_before:
+                        self.reconnects += 1
+                    connected_before = True
+                    self.connected_since = datetime.now().isoformat()
+                    self.last_error = None
+                    delay = min_backoff
+                    self._lost.clear()
+                    self._set_state("connected")
+                    log.info("IB %s connection established (clientId %s)", self.role, self.client_id,
+                             extra={"role": self.role, "clientId": self.client_id})
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.last_error = str(e) or type(e).__name__
+                    self._set_state("disconnected")
+                    log.error("IB %s connection failed (clientId %s): %s, retry in %.0fs", self.role, self.client_id,
+                              self.last_error, delay, extra={"role": self.role, "clientId": self.client_id})
+                    self._resolve_first_attempt()
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, max_backoff)
+                    continue
+            self._resolve_first_attempt()
+            # Bis zum Verbindungsabbruch warten, spätestens check_interval
+            try:
+                await asyncio.wait_for(self._lost.wait(), check_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _resolve_first_attempt(self):
+        if self._first_attempt is not None and not self._first_attempt.done():
+            self._first_attempt.set_result(self.is_connected())
+
+    def _on_disconnected(self):
+        if self.state == "connected":
+            log.warning("IB %s connection lost (clientId %s), reconnecting...", self.role, self.client_id,
+                        extra={"role": self.role, "clientId": self.client_id})
+            self.last_disconnect = datetime.now().isoformat()
+            self._set_state("disconnected")
+        self.pacer.clear()
+        self._lost.set()
+
+    def _set_state(self, state):
+        if state == "connected":
+            self._up.set()
+        else:
+            self._up.clear()
+        if state != self.state:
+            self.state = state
+            if self.on_state_change:
+                self.on_state_change(self)
+
+
+class IBConnectionPool:
+    """
+    Several IB API clients with role assignments:
+
+      orders       order placement, status and fills (the only writable client)
+      market_data  contract details and market data
+      reporting    account, position and execution reports
+
+    Every role has its own socket, so heavy data or reporting traffic does not
+    queue in front of order submission. IB's message limit applies per client,
+    so every role paces its own messages (see pacing.RequestPacer). Client IDs,
+    pacing and the gateway address come from config.yaml's `connection` section.
+    """
+
+    def __init__(self, host="127.0.0.1", port=7497, client_ids=None, metrics=None):
+        self.host = host
+        self.port = port
+        self.timeout = 4.0
+        self.min_backoff = 1.0
+        self.max_backoff = 30.0
+        self.check_interval = 10.0
+        self.on_state_change = None
+        client_ids = {**DEFAULT_CLIENT_IDS, **(client_ids or {})}
+        self.connections = {
+            role: RoleConnection(role, client_ids[role], readonly=(role != "orders"), metrics=metrics)
+            for role in ROLES
+        }
+        for connection in self.connections.values():
+            connection.on_state_change = self._state_changed
+        self._validate()
+
+    def configure(self, settings):
+        """Apply config.yaml's `connection` section. Must be called before start()."""
+        settings = settings or {}
+        self.host = settings.get("host", self.host)
+        self.port = int(settings.get("port", self.port))
+        self.timeout = float(settings.get("timeout", self.timeout))
+        self.max_backoff = float(settings.get("reconnect_interval", self.max_backoff))
+        for role, client_id in (settings.get("client_ids") or {}).items():
+            if role not in self.connections:
+                raise ValueError(f"connection.client_ids: unknown role {role!r}")
+            self.connections[role].client_id = int(client_id)
+        for connection in self.connections.values():
+            connection.pacer.configure(settings.get("pacing"))
+        self._validate()
+
+    def __getitem__(self, role):
+        return self.connections[role].ib
+
+    @property
+    def orders(self):
+        return self["orders"]
+
+    @property
+    def market_data(self):
+        return self["market_data"]
+
+    @property
+    def reporting(self):
+        return self["reporting"]
+
+    def pacer(self, role="orders"):
+        return self.connections[role].pacer
+
+    def clients(self):
+        """IB instances of all roles, orders first."""
+        return [self.connections[role].ib for role in ROLES]
+
+    async def start(self):
+        """
+        Start the reconnect loop of every role and wait for each first
+        connection attempt (concurrently). Returns {role: connected}.
+        """
+        attempts = {
+            role: connection.start(self.host, self.port, self.timeout, self.min_backoff,
+                                   self.max_backoff, self.check_interval)
+            for role, connection in self.connections.items()
+        }
+        results = await asyncio.gather(*attempts.values())
+        return dict(zip(attempts, results))
+
+    async def stop(self):
+        await asyncio.gather(*(connection.stop() for connection in self.connections.values()))
+
+    def is_connected(self, role="orders"):
+        return self.connections[role].is_connected()
+
+    async def wait_connected(self, *roles):
+        """Wait until all given roles (default: all) are connected at the same time."""
+        roles = roles or ROLES
+        while not all(self.is_connected(role) for role in roles):
+            for role in roles:
+                await self.connections[role].wait_connected()
+
+    def health(self):
+        return {role: connection.health() for role, connection in self.connections.items()}
+
+    def _validate(self):
+        ids = [connection.client_id for connection in self.connections.values()]
+        if len(set(ids)) != len(ids):
+            raise ValueError(f"connection.client_ids must be distinct, got {ids}")
+
+    def _state_changed(self, connection):
+        if self.on_state_change:
+            self.on_state_change(connection)
@@ -0,0 +1,132 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from datetime import datetime, timezone
+
+from .trace import current_trace
+
+ROOT_LOGGER = "tradingbot"
+
+# Attribute jedes LogRecords; alles andere kam über extra= und wird als eigenes JSON-Feld geschrieben
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "traceId"}
+
+_listener = None
+
+
+def get_logger(name):
+    """Logger below the tradingbot root, e.g. get_logger("webhook") -> tradingbot.webhook."""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, traceId plus any extra= fields."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="microseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        trace_id = getattr(record, "traceId", None)
+        if trace_id:
+            entry["traceId"] = trace_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Human readable console format with the trace ID in brackets."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        trace_id = getattr(record, "traceId", None)
+        return f"{line} [{trace_id}]" if trace_id else line
+
+
+class TracingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the writer thread. Runs on the caller's thread, so this
+    is where the trace ID of the current alert is captured and the message is
+    rendered (arguments may be mutated after the call returns).
+    """
+
+    def prepare(self, record):
+        if not hasattr(record, "traceId"):
+            trace = current_trace.get()
+            record.traceId = trace.id if trace is not None else None
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(settings=None):
+    """
+    Configure the tradingbot loggers from config.yaml's `logging` section.
+
+    Records go through a queue to a background QueueListener thread, which
+    writes JSON lines to a rotating file (by size, or by time with
+    rotation: time) and optionally to the console. The event loop only pays
+    for enqueueing. Calling it again replaces the previous configuration.
+    """
+    global _listener
+    settings = settings or {}
+    level = logging.getLevelName(str(settings.get("level", "INFO")).upper())
+    if not isinstance(level, int):
+        raise ValueError(f"logging.level: unknown level {settings.get('level')!r}")
+
+    handlers = []
+    path = settings.get("file", "logs/tradingbot.log")
+    if path:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if settings.get("rotation", "size") == "time":
+            file_handler = logging.handlers.TimedRotatingFileHandler(
+                path, when=settings.get("when", "midnight"), backupCount=int(settings.get("backup_count", 14)),
+                encoding="utf-8", utc=True)
+        else:
+            file_handler = logging.handlers.RotatingFileHandler(
+                path, maxBytes=int(settings.get("max_bytes", 10 * 1024 * 1024)),
+                backupCount=int(settings.get("backup_count", 10)), encoding="utf-8")
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+    console = settings.get("console", "text")
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(JsonFormatter() if console == "json" else TextFormatter())
+        handlers.append(console_handler)
+
+    shutdown_logging()
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger(ROOT_LOGGER)
+    root.handlers = [TracingQueueHandler(log_queue)]
+    root.setLevel(level)
+    root.propagate = False
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return root
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,180 @@
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from ib_insync.util import getLoop
+
+from .log import get_logger
+
+log = get_logger("pacing")
+
+# Lanes in Sendereihenfolge: Stornos/Flatten vor neuen Orders vor Daten-Requests
+LANES = ("cancel", "order", "data")
+
+# Ausgehende IB-Message-IDs (erstes Feld) -> Lane, alles andere ist "data"
+MESSAGE_LANES = {
+    "4": "cancel",    # cancelOrder
+    "58": "cancel",   # reqGlobalCancel
+    "3": "order",     # placeOrder
+    "8": "order",     # reqIds
+}
+
+
+class RequestPacer:
+    """
+    Outbound message scheduler of one IB API client.
+
+    IB disconnects clients that send more than 50 messages per second. The
+    pacer replaces the client's sendMsg: every message passes a token bucket
+    (rate per second, burst tokens) and, while the bucket is empty, waits in
+    one of three priority lanes - cancels (and anything sent inside urgent(),
+    e.g. flatten orders) before new orders before data requests. Within a
+    lane the order is kept; a cancel never overtakes the still queued
+    placeOrder of the same order. rate + burst <= 50 keeps every one-second
+    window under IB's limit.
+
+    With metrics (AlertMetrics) the queue depth per lane and the time every
+    message waited are exported.
+    """
+
+    def __init__(self, client, role, rate=40.0, burst=10, metrics=None):
+        self.client = client
+        self.role = role
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.metrics = metrics
+        self.tokens = self.burst
+        self.sent = dict.fromkeys(LANES, 0)
+        self.max_wait = 0.0
+        self._queues = {lane: deque() for lane in LANES}   # (eingereiht um, Message)
+        self._queued_orders = {}   # orderId -> Anzahl wartender placeOrder
+        self._updated = time.monotonic()
+        self._override = None
+        self._timer = None
+        client.sendMsg = self.send
+
+    def configure(self, settings):
+        """Apply config.yaml's `connection.pacing` section."""
+        settings = settings or {}
+        self.rate = float(settings.get("rate", self.rate))
+        self.burst = float(settings.get("burst", self.burst))
+        if self.rate <= 0 or self.burst < 1:
+            raise ValueError(f"connection.pacing: rate must be > 0 and burst >= 1, got {self.rate}/{self.burst}")
+        if self.rate + self.burst > 50:
+            log.warning("connection.pacing: rate %s + burst %s exceeds IB's 50 messages per second",
+                        self.rate, self.burst)
+        self.tokens = min(self.tokens, self.burst)
+
+    @contextmanager
+    def urgent(self):
+        """Messages sent inside this block use the cancel lane (e.g. orders that flatten a position)."""
+        previous, self._override = self._override, "cancel"
+        try:
+            yield
+        finally:
+            self._override = previous
+
+    def depth(self, lane=None):
+        if lane is not None:
+            return len(self._queues[lane])
+        return sum(len(queue) for queue in self._queues.values())
+
+    def stats(self):
+        self._refill()
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "tokens": round(self.tokens, 2),
+            "queued": {lane: len(queue) for lane, queue in self._queues.items()},
+            "sent": dict(self.sent),
+            "maxWaitMs": round(self.max_wait * 1000, 1),
+        }
+
+    def send(self, msg):
+        """Replacement for Client.sendMsg: send now if a token is free, otherwise queue."""
+        lane = self._override or self._lane(msg)
+        self._refill()
+        if self.tokens >= 1 and not self.depth():
+            self._write(lane, msg, 0.0)
+            return
+        self._queues[lane].append((time.monotonic(), msg))
+        if msg.startswith("3\0"):
+            order_id = msg.split("\0", 2)[1]
+            self._queued_orders[order_id] = self._queued_orders.get(order_id, 0) + 1
+        self._update_depth(lane)
+        if self._timer is None:
+            self.client.throttleStart.emit()
+            log.debug("IB %s: throttling requests", self.role, extra={"role": self.role})
+            self._schedule()
+
+    def clear(self):
+        """Drop queued messages (connection lost; the orders would be sent to a dead session)."""
+        dropped = self.depth()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for lane, queue in self._queues.items():
+            queue.clear()
+            self._update_depth(lane)
+        self._queued_orders.clear()
+        self.tokens = self.burst
+        if dropped:
+            log.warning("IB %s: %d queued request(s) dropped after disconnect", self.role, dropped,
+                        extra={"role": self.role})
+
+    def _lane(self, msg):
+        lane = MESSAGE_LANES.get(msg[:msg.find("\0")], "data")
+        if lane == "cancel" and msg.startswith("4\0") and self._queued_orders:
+            # Storno einer Order, deren placeOrder noch wartet: dahinter einreihen
+            if msg.split("\0", 3)[2] in self._queued_orders:
+                return "order"
+        return lane
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _schedule(self):
+        loop = getLoop()
+        self._timer = loop.call_later(max(0.0, (1 - self.tokens) / self.rate), self._drain)
+
+    def _drain(self):
+        self._timer = None
+        self._refill()
+        while self.tokens >= 1:
+            lane = next((lane for lane in LANES if self._queues[lane]), None)
+            if lane is None:
+                break
+            queued_at, msg = self._queues[lane].popleft()
+            if msg.startswith("3\0"):
+                order_id = msg.split("\0", 2)[1]
+                if self._queued_orders.get(order_id, 0) <= 1:
+                    self._queued_orders.pop(order_id, None)
+                else:
+                    self._queued_orders[order_id] -= 1
+            self._update_depth(lane)
+            if not self.client.isConnected():
+                continue
+            self._write(lane, msg, time.monotonic() - queued_at)
+        if self.depth():
+            self._schedule()
+        else:
+            self.client.throttleEnd.emit()
+            log.debug("IB %s: stopped throttling", self.role, extra={"role": self.role})
+
+    def _write(self, lane, msg, waited):
+        client = self.client
+        client.conn.sendMsg(client._prefix(msg.encode()))
+        self.tokens -= 1
+        self.sent[lane] += 1
+        self.max_wait = max(self.max_wait, waited)
+        if self.metrics is not None:
+            self.metrics.ib_queue_wait.observe(waited, role=self.role, lane=lane)
+        if client._logger.isEnabledFor(logging.DEBUG):
+            client._logger.debug(">>> %s", msg[:-1].replace("\0", ","))
+
+    def _update_depth(self, lane):
+        if self.metrics is not None:
+            self.metrics.ib_queue_depth.set(len(self._queues[lane]), role=self.role, lane=lane)
@@ -0,0 +1,85 @@
+from dataclasses import dataclass, fields
+from typing import NamedTuple, Optional
+
+
+class ResolvedOrder(NamedTuple):
+    """Effective order values after applying the config overrides to an alert."""
+    quantity: int
+    trail_amt: float
+    stop_loss: float
+    take_profit: float
+    tp_quantity: int
+    ts_quantity: int
+
+
+@dataclass(frozen=True)
+class OrderSettings:
+    """
+    Immutable, validated snapshot of config.yaml's order_settings.
+
+    A new snapshot is compiled on every config reload and swapped in as a
+    whole, so a webhook always sees one consistent version. Override fields
+    are None when the alert's own value should be used.
+    """
+    version: int = 0
+    use_take_profit: bool = True
+    use_trailing_stop: bool = True
+    quantity: Optional[int] = None
+    trail_amount: Optional[float] = None
+    stop_loss: Optional[float] = None
+    take_profit: Optional[float] = None
+    tp_quantity: Optional[int] = None
+    ts_quantity: Optional[int] = None
+    fill_timeout: float = 10.0
+    bracket_timeout: float = 3600.0
+
+    @classmethod
+    def from_config(cls, config, version=0):
+        """Compile the order_settings section. Raises ValueError on invalid values."""
+        settings = (config or {}).get('order_settings') or {}
+        overrides = settings.get('overrides') or {}
+        timeouts = settings.get('timeouts') or {}
+
+        # "use_trail_stop" ist der ältere Schlüssel in config.yaml
+        use_trailing_stop = settings.get('use_trailing_stop', settings.get('use_trail_stop', True))
+
+        compiled = cls(
+            version=version,
+            use_take_profit=bool(settings.get('use_take_profit', True)),
+            use_trailing_stop=bool(use_trailing_stop),
+            quantity=_optional(overrides, 'quantity', int),
+            trail_amount=_optional(overrides, 'trail_amount', float),
+            stop_loss=_optional(overrides, 'stop_loss', float),
+            take_profit=_optional(overrides, 'take_profit', float),
+            tp_quantity=_optional(overrides, 'tp_quantity', int),
+            ts_quantity=_optional(overrides, 'ts_quantity', int),
+            fill_timeout=float(timeouts.get('fill_or_cancel') or cls.fill_timeout),
+            bracket_timeout=float(timeouts.get('bracket_fill') or cls.bracket_timeout),
+        )
+        for f in fields(compiled):
+            value = getattr(compiled, f.name)
+            if f.name != 'version' and isinstance(value, (int, float)) and not isinstance(value, bool) and value <= 0:
+                raise ValueError(f"order_settings: {f.name} must be positive, got {value}")
+        return compiled
+
+    def apply(self, order):
+        """Resolve the effective order values for an incoming alert."""
+        quantity = self.quantity if self.quantity is not None else order.quantity
+        return ResolvedOrder(
+            quantity=quantity,
+            trail_amt=self.trail_amount if self.trail_amount is not None else order.trailAmt,
+            stop_loss=self.stop_loss if self.stop_loss is not None else order.stopLoss,
+            take_profit=self.take_profit if self.take_profit is not None else order.takeProfit,
+            tp_quantity=self.tp_quantity if self.tp_quantity is not None else quantity,
+            ts_quantity=self.ts_quantity if self.ts_quantity is not None else quantity,
+        )
+
+
+def _optional(section, key, cast):
+    value = section.get(key)
+    if value is None:
+        return None
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"order_settings.overrides.{key}: invalid value {value!r}")
@@ -0,0 +1,133 @@
+import importlib.abc
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Profilmodus: python main.py --profile-startup oder TVBOT_PROFILE_STARTUP=1
+PROFILE_FLAG = "--profile-startup"
+PROFILE_ENV = "TVBOT_PROFILE_STARTUP"
+
+
+def _process_start():
+    """Wall clock time the process was started (Linux /proc, else now)."""
+    try:
+        with open("/proc/self/stat", encoding="ascii") as f:
+            ticks = int(f.read().rsplit(")", 1)[1].split()[19])   # Feld 22: starttime
+        with open("/proc/uptime", encoding="ascii") as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - (uptime - ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return time.time()
+
+
+class _ImportTimer(importlib.abc.MetaPathFinder):
+    """
+    Times the execution of every module imported after install(): self time
+    and cumulative time including the module's own imports. The finder only
+    wraps exec_module of the loader the regular finders return.
+    """
+
+    def __init__(self):
+        self.times = {}   # Modulname -> (self, kumuliert) in Sekunden
+        self._local = threading.local()
+
+    def install(self):
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def find_spec(self, name, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        loader = spec.loader
+        # Builtin-/Frozen-Loader sind Klassen, die für alle Module gelten -> nicht anfassen
+        if loader is not None and not isinstance(loader, type) and hasattr(loader, "exec_module"):
+            try:
+                loader.exec_module = self._timed(name, loader.exec_module)
+            except AttributeError:
+                pass
+        return spec
+
+    def _timed(self, name, exec_module):
+        def timed(module):
+            stack = self._local.__dict__.setdefault("stack", [])
+            stack.append(0.0)
+            started = time.perf_counter()
+            try:
+                exec_module(module)
+            finally:
+                total = time.perf_counter() - started
+                children = stack.pop()
+                if stack:
+                    stack[-1] += total
+                self.times[name] = (total - children, total)
+        return timed
+
+
+class StartupProfile:
+    """
+    Milestones and initialization phases of the service, in milliseconds
+    since process start. Phases and milestones are always recorded (cheap);
+    with profiling enabled every import is timed as well and format() prints
+    the slowest modules.
+    """
+
+    def __init__(self, profiling=False):
+        self.started = _process_start()
+        self.profiling = profiling
+        self.phases = []       # (Name, Start ms, Dauer ms)
+        self.milestones = {}   # Name -> ms seit Prozessstart
+        self.imports = _ImportTimer() if profiling else None
+        if self.imports:
+            self.imports.install()
+
+    def elapsed(self):
+        """Milliseconds since process start."""
+        return (time.time() - self.started) * 1000
+
+    def mark(self, name):
+        self.milestones.setdefault(name, round(self.elapsed(), 1))
+
+    @contextmanager
+    def phase(self, name):
+        start = self.elapsed()
+        try:
+            yield
+        finally:
+            self.phases.append((name, round(start, 1), round(self.elapsed() - start, 1)))
+
+    def slowest_imports(self, top=20):
+        """[(module, self ms, cumulative ms)] of the slowest imports by self time."""
+        if not self.imports:
+            return []
+        ranked = sorted(self.imports.times.items(), key=lambda item: item[1][0], reverse=True)[:top]
+        return [(name, round(own * 1000, 1), round(total * 1000, 1)) for name, (own, total) in ranked]
+
+    def summary(self):
+        result = {
+            "milestones": dict(self.milestones),
+            "phases": [{"name": n, "startMs": s, "ms": d} for n, s, d in self.phases],
+        }
+        if self.imports:
+            result["imports"] = [{"module": n, "selfMs": s, "cumulativeMs": c} for n, s, c in self.slowest_imports()]
+        return result
+
+    def format(self, top=20):
+        lines = ["Startup profile (ms since process start)",
+                 "  milestones: " + ", ".join(f"{n} {t:.0f}" for n, t in self.milestones.items()),
+                 f"  {'phase':<28}{'start':>10}{'duration':>10}"]
+        lines += [f"  {name:<28}{start:>10.1f}{duration:>10.1f}" for name, start, duration in self.phases]
+        if self.imports:
+            lines.append(f"  {'import (top ' + str(top) + ' by self time)':<44}{'self':>10}{'cumulative':>12}")
+            lines += [f"  {name:<44}{own:>10.1f}{total:>12.1f}" for name, own, total in self.slowest_imports(top)]
+        return "\n".join(lines)
+
+
+startup = StartupProfile(profiling=PROFILE_FLAG in sys.argv or os.environ.get(PROFILE_ENV, "") not in ("", "0"))
@@ -0,0 +1,5 @@
+import contextvars
+
+# Trace des gerade verarbeiteten Alerts (wird in Hintergrund-Tasks mitkopiert).
+# Liegt in app.core, damit das Logging die Trace-ID ohne Abhängigkeit von app.services lesen kann
+current_trace = contextvars.ContextVar("current_trace", default=None)
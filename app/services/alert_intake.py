@@ -0,0 +1,109 @@
+import json
+import os
+import time
+import uuid
+from typing import NamedTuple, Optional
+
+from ..core.log import get_logger
+
+log = get_logger("intake")
+
+
+class IntakeRecord(NamedTuple):
+    id: str
+    received: float               # Epoch-Sekunden
+    payload: dict                 # Alert wie vom Webhook empfangen
+    received_at: Optional[float]  # perf_counter im selben Prozess, None nach einem Neustart
+
+    @property
+    def age(self):
+        return time.time() - self.received
+
+
+class AlertIntake:
+    """
+    Durable queue for alerts that arrive while the order path is not ready
+    yet (IB connection and prewarm still running after a (re)start).
+
+    accept() appends the alert as one JSON line and fsyncs the file before
+    the webhook answers; done() appends a completion line. open() reads the
+    file back, so alerts accepted before a crash are still pending after the
+    restart, and compacts it to the pending ones. Alerts older than max_age
+    seconds are dropped instead of placed.
+    """
+
+    def __init__(self, path="data/intake.jsonl", max_age=60.0, fsync=True):
+        self.path = path
+        self.max_age = max_age
+        self.fsync = fsync
+        self._pending = {}   # id -> IntakeRecord, in Eingangsreihenfolge
+        self._file = None
+
+    def configure(self, settings):
+        """Apply config.yaml's `intake` section (before open())."""
+        settings = settings or {}
+        self.path = settings.get("path", self.path)
+        self.max_age = float(settings.get("max_age", self.max_age))
+        self.fsync = bool(settings.get("fsync", self.fsync))
+
+    @property
+    def pending_count(self):
+        return len(self._pending)
+
+    def open(self):
+        """Load unfinished alerts from the file and open it for appending."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue   # unvollständige letzte Zeile nach einem Absturz
+                    if "payload" in entry:
+                        self._pending[entry["id"]] = IntakeRecord(entry["id"], entry["received"], entry["payload"], None)
+                    else:
+                        self._pending.pop(entry.get("id"), None)
+            if self._pending:
+                log.warning("%d alert(s) accepted before the restart are still pending", len(self._pending))
+        # Nur die offenen Alerts behalten
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for record in self._pending.values():
+                f.write(self._line({"id": record.id, "received": record.received, "payload": record.payload}))
+        os.replace(tmp, self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def accept(self, payload, received_at=None):
+        """Persist an alert. Returns the webhook response for it."""
+        record = IntakeRecord(uuid.uuid4().hex[:12], time.time(), payload, received_at)
+        self._write({"id": record.id, "received": record.received, "payload": payload})
+        self._pending[record.id] = record
+        log.info("Alert queued until the order path is ready: %s", record.id, extra={"intakeId": record.id})
+        return {"status": "queued", "intakeId": record.id, "bracketId": None, "traceId": None}
+
+    def pending(self):
+        """Pending records, oldest first."""
+        return list(self._pending.values())
+
+    def done(self, record_id, **result):
+        """Mark a record as processed (result fields go into the file, e.g. bracketId or error)."""
+        if self._pending.pop(record_id, None) is not None:
+            self._write({"id": record_id, "done": time.time(), **result})
+
+    def _write(self, entry):
+        self._file.write(self._line(entry))
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    @staticmethod
+    def _line(entry):
+        return json.dumps(entry, separators=(",", ":"), default=str) + "\n"
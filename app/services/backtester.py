@@ -0,0 +1,362 @@
+import csv
+import json
+from datetime import datetime, timezone
+
+import numpy as np
+
+from ..api.models import BracketOrderModel
+from ..core.settings import OrderSettings
+
+
+class Bars:
+    """
+    Columnar price series: time (epoch seconds of the bar open) and float64
+    open/high/low/close arrays. Tick data is stored as bars with
+    open == high == low == close.
+    """
+
+    __slots__ = ("time", "open", "high", "low", "close")
+
+    def __init__(self, time, open, high, low, close):
+        self.time = np.ascontiguousarray(time, dtype=np.float64)
+        self.open = np.ascontiguousarray(open, dtype=np.float64)
+        self.high = np.ascontiguousarray(high, dtype=np.float64)
+        self.low = np.ascontiguousarray(low, dtype=np.float64)
+        self.close = np.ascontiguousarray(close, dtype=np.float64)
+        if np.any(np.diff(self.time) < 0):
+            order = np.argsort(self.time, kind="stable")
+            for name in self.__slots__:
+                setattr(self, name, getattr(self, name)[order])
+
+    def __len__(self):
+        return len(self.time)
+
+    @classmethod
+    def from_ticks(cls, time, price):
+        price = np.asarray(price, dtype=np.float64)
+        return cls(time, price, price, price, price)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read bars from .npz (arrays time, open, high, low, close or time, price)
+        or CSV with a header: time/date/datetime, open, high, low, close - or
+        time, price for ticks. Times are epoch seconds or ISO timestamps (UTC
+        unless an offset is given).
+        """
+        if path.endswith(".npz"):
+            with np.load(path) as data:
+                if "price" in data:
+                    return cls.from_ticks(data["time"], data["price"])
+                return cls(data["time"], data["open"], data["high"], data["low"], data["close"])
+
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = [h.strip().lower() for h in next(reader)]
+            rows = list(reader)
+        columns = {name: i for i, name in enumerate(header)}
+        time_column = next((columns[c] for c in ("time", "timestamp", "datetime", "date") if c in columns), 0)
+        time = np.array([_parse_time(row[time_column]) for row in rows])
+
+        def column(name):
+            return np.array([row[columns[name]] for row in rows], dtype=np.float64)
+
+        if "open" in columns:
+            return cls(time, column("open"), column("high"), column("low"), column("close"))
+        return cls.from_ticks(time, column("price" if "price" in columns else "last"))
+
+
+def _parse_time(value):
+    try:
+        return float(value)
+    except ValueError:
+        parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+
+
+def load_alerts(paths):
+    """Parse TradingView alert log CSVs into [(datetime, BracketOrderModel)] sorted by time."""
+    alerts = []
+    for path in paths:
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                order = BracketOrderModel(**json.loads(row["Beschreibung"]))
+                alerts.append((datetime.fromisoformat(row["Zeit"].replace("Z", "+00:00")), order))
+    alerts.sort(key=lambda a: a[0])
+    return alerts
+
+
+class AlertArrays:
+    """Alert values as arrays, prepared once and shared by all simulated parameter sets."""
+
+    def __init__(self, alerts, spec):
+        orders = [order for _, order in alerts]
+        relative_types = {order.relativeType.lower() for order in orders}
+        if not relative_types <= {"ticks", "percent"}:
+            raise ValueError(f"Unsupported relativeType(s): {relative_types - {'ticks', 'percent'}}")
+        self.orders = orders
+        self.time = np.array([t.timestamp() for t, _ in alerts], dtype=np.float64)
+        self.side = np.array([1.0 if o.action.upper() == "BUY" else -1.0 for o in orders])
+        self.percent = np.array([o.relativeType.lower() == "percent" for o in orders])
+        self.quantity = np.array([o.quantity for o in orders], dtype=np.float64)
+        self.take_profit = np.array([o.takeProfit for o in orders], dtype=np.float64)
+        self.stop_loss = np.array([o.stopLoss for o in orders], dtype=np.float64)
+        self.trail = np.array([o.trailAmt for o in orders], dtype=np.float64)
+        # Basispreis wie im Webhook auf das Tick-Raster gerundet
+        self.base = np.array([spec.round_price(o.limitPrice) for o in orders], dtype=np.float64)
+        self.tick = np.array([spec.tick_size(b) for b in self.base], dtype=np.float64)
+
+    def __len__(self):
+        return len(self.time)
+
+
+def _snap(prices, tick):
+    return np.round(np.round(prices / tick) * tick, 10)
+
+
+def bracket_prices(alerts, settings):
+    """
+    Vectorized version of the webhook's price math (settings.apply + spec.offset):
+    returns quantity, tp/ts quantity, take profit, initial stop, trailing
+    distance and TRAIL LIMIT offset per alert.
+    """
+    def override(value, alert_values):
+        return np.full(len(alerts), float(value)) if value is not None else alert_values
+
+    quantity = override(settings.quantity, alerts.quantity)
+    take_profit = override(settings.take_profit, alerts.take_profit)
+    stop_loss = override(settings.stop_loss, alerts.stop_loss)
+    trail = override(settings.trail_amount, alerts.trail)
+    tp_quantity = override(settings.tp_quantity, quantity) if settings.use_take_profit else np.zeros(len(alerts))
+    ts_quantity = override(settings.ts_quantity, quantity) if settings.use_trailing_stop else np.zeros(len(alerts))
+
+    base, tick, side, percent = alerts.base, alerts.tick, alerts.side, alerts.percent
+    tp_distance = np.where(percent, base * take_profit / 100, take_profit * tick)
+    sl_distance = np.where(percent, base * stop_loss / 100, stop_loss * tick)
+    tp_price = _snap(base + side * tp_distance, tick)
+    stop_price = _snap(base - side * sl_distance, tick)
+    # Trailing-Abstand: in Ticks auf volle Ticks aufgerundet, in Prozent relativ zum Basispreis
+    trail_distance = np.where(percent, base * trail / 100,
+                              np.maximum(1, np.ceil(trail / tick - 1e-9)) * tick)
+    return quantity, tp_quantity, ts_quantity, tp_price, stop_price, trail_distance, 4 * tick
+
+
+def _first(hits):
+    """Index of the first True per row and whether there is one."""
+    return hits.argmax(axis=1), hits.any(axis=1)
+
+
+def simulate(bars, alerts, settings, chunk_elements=8_000_000):
+    """
+    Simulate the bracket of every alert on the bars, exactly as place_bracket_order submits it:
+
+      parent   LMT at the rounded limit price, cancelled if no bar opening within
+               fill_timeout after the alert trades through it
+      child 1  LMT take profit (tp_quantity)
+      child 2  TRAIL LIMIT (ts_quantity) starting at the stop-loss price,
+               trailing by trail_amt, limit offset 4 ticks
+
+    Children are evaluated from the bar after the entry fill; when both would
+    fill in the same bar the stop is assumed first. Children act as one OCA
+    group: the first fill exits up to its quantity, the other child covers
+    the rest. Whatever is still open after bracket_timeout is marked to the
+    last close (status expired).
+
+    Shorts are mirrored onto longs (prices negated, high/low swapped), so one
+    long-only path evaluation covers both sides. Returns a dict of per-alert arrays.
+    """
+    n = len(alerts)
+    quantity, tp_qty, ts_qty, tp_price, stop_price, trail, lmt_offset = bracket_prices(alerts, settings)
+    side = alerts.side
+    # Long-normalisierte Preise
+    base_n, tp_n, stop_n = alerts.base * side, tp_price * side, stop_price * side
+
+    def gather(idx, valid, short):
+        idx = np.minimum(idx, len(bars) - 1)
+        o, h, l, c = bars.open[idx], bars.high[idx], bars.low[idx], bars.close[idx]
+        o = np.where(short, -o, o)
+        h, l = np.where(short, -l, h), np.where(short, -h, l)
+        c = np.where(short, -c, c)
+        h = np.where(valid, h, -np.inf)
+        l = np.where(valid, l, np.inf)
+        return o, h, l, c
+
+    result = {
+        "filled": np.zeros(n, dtype=bool), "entry_index": np.zeros(n, dtype=np.int64),
+        "entry_price": np.full(n, np.nan), "exit_index": np.zeros(n, dtype=np.int64),
+        "hit_type": np.zeros(n, dtype=np.int8),  # 0 keiner/expired, 1 takeProfit, 2 trailingStop
+        "first_exit_price": np.full(n, np.nan), "points": np.zeros(n),
+        "leg_quantity": np.zeros((n, 3)),  # erster Child-Fill, zweiter Child-Fill, Rest bei Ablauf
+        "quantity": quantity, "side": side,
+    }
+
+    # 1) Parent: erster Bar im Fill-Fenster, der durch das Limit handelt
+    start = np.searchsorted(bars.time, alerts.time, "left")
+    stop_idx = np.searchsorted(bars.time, alerts.time + settings.fill_timeout, "left")
+    width = int(max(1, (stop_idx - start).max(initial=1)))
+    for rows in _chunks(n, width, chunk_elements):
+        idx = start[rows, None] + np.arange(width)
+        valid = idx < stop_idx[rows, None]
+        o, _, l, _ = gather(idx, valid, side[rows, None] < 0)
+        k, filled = _first(l <= base_n[rows, None])
+        take = np.arange(len(k))
+        result["filled"][rows] = filled
+        result["entry_index"][rows] = np.where(filled, idx[take, k], 0)
+        entry_n = np.minimum(o[take, k], base_n[rows])
+        result["entry_price"][rows] = np.where(filled, entry_n * side[rows], np.nan)
+
+    filled = np.flatnonzero(result["filled"])
+    if not len(filled):
+        return result
+
+    # 2) Kinder ab dem Bar nach dem Entry bis bracket_timeout
+    entry_idx = result["entry_index"][filled]
+    child_start = entry_idx + 1
+    child_end = np.searchsorted(bars.time, bars.time[entry_idx] + settings.bracket_timeout, "right")
+    child_end = np.maximum(child_end, child_start)
+    horizon = int(max(1, (child_end - child_start).max(initial=1)))
+    for chunk in _chunks(len(filled), horizon, chunk_elements):
+        rows = filled[chunk]
+        short = side[rows, None] < 0
+        idx = child_start[chunk, None] + np.arange(horizon)
+        valid = idx < child_end[chunk, None]
+        o, h, l, c = gather(idx, valid, short)
+        take = np.arange(len(rows))
+        entry_n = result["entry_price"][rows] * side[rows]
+
+        # Take Profit: Limit, Fill zum Limit oder besser bei Gap
+        tp_k, tp_hit = _first(h >= tp_n[rows, None])
+        tp_hit &= tp_qty[rows] > 0
+        tp_fill = np.maximum(o[take, tp_k], tp_n[rows])
+
+        # Trailing Stop: Referenz = Hoch seit Entry (vor dem Bar) bzw. Eröffnung des Bars
+        prior_high = np.maximum.accumulate(np.concatenate([entry_n[:, None], h[:, :-1]], axis=1), axis=1)
+        reference = np.maximum(prior_high, np.where(valid, o, -np.inf))
+        stop = np.maximum(stop_n[rows, None], reference - trail[rows, None])
+        trig_k, triggered = _first(l <= stop)
+        triggered &= ts_qty[rows] > 0
+        trig_stop = stop[take, trig_k]
+        limit = trig_stop - lmt_offset[rows]
+        # Im Trigger-Bar zum Stop (bei Gap zur Eröffnung), nie unter dem Limit; sonst ruht das Limit
+        same_bar = h[take, trig_k] >= limit
+        later_k, later_hit = _first((np.arange(horizon) > trig_k[:, None]) & (h >= limit[:, None]))
+        ts_k = np.where(same_bar, trig_k, later_k)
+        ts_hit = triggered & (same_bar | later_hit)
+        ts_fill = np.where(same_bar, np.maximum(np.minimum(o[take, trig_k], trig_stop), limit),
+                           np.maximum(o[take, later_k], limit))
+
+        # OCA: erster Fill schließt bis zu seiner Menge, der andere Child den Rest
+        big = horizon + 1
+        tp_at = np.where(tp_hit, tp_k, big)
+        ts_at = np.where(ts_hit, ts_k, big)
+        tp_first = tp_at < ts_at
+        qty = quantity[rows]
+        first_qty = np.minimum(np.where(tp_first, tp_qty[rows], ts_qty[rows]), qty)
+        first_qty = np.where(np.minimum(tp_at, ts_at) < big, first_qty, 0)
+        second_hit = np.where(tp_first, ts_hit, tp_hit)
+        second_qty = np.where(second_hit, np.minimum(np.where(tp_first, ts_qty[rows], tp_qty[rows]),
+                                                     qty - first_qty), 0)
+        rest_qty = qty - first_qty - second_qty
+        first_fill = np.where(tp_first, tp_fill, ts_fill)
+        second_fill = np.where(tp_first, ts_fill, tp_fill)
+        last_close = c[take, np.maximum(child_end[chunk] - child_start[chunk] - 1, 0)]
+
+        points = (np.where(first_qty > 0, (first_fill - entry_n) * first_qty, 0)
+                  + np.where(second_qty > 0, (second_fill - entry_n) * second_qty, 0)
+                  + np.where(rest_qty > 0, (last_close - entry_n) * rest_qty, 0))
+        any_exit = first_qty > 0
+        result["hit_type"][rows] = np.where(any_exit, np.where(tp_first, 1, 2), 0)
+        result["first_exit_price"][rows] = np.where(any_exit, first_fill, last_close) * side[rows]
+        last_k = np.where(rest_qty > 0, child_end[chunk] - child_start[chunk] - 1,
+                          np.maximum(np.where(first_qty > 0, np.minimum(tp_at, ts_at), 0),
+                                     np.where(second_qty > 0, np.maximum(tp_at, ts_at), 0)))
+        result["exit_index"][rows] = np.minimum(child_start[chunk] + last_k, len(bars) - 1)
+        result["points"][rows] = points  # Punkte x Kontrakte über alle Legs
+        result["leg_quantity"][rows] = np.stack([first_qty, second_qty, rest_qty], axis=1)
+    return result
+
+
+def _chunks(rows, width, chunk_elements):
+    step = max(1, chunk_elements // max(1, width))
+    for begin in range(0, rows, step):
+        yield slice(begin, min(rows, begin + step))
+
+
+class BracketBacktester:
+    """
+    Offline backtest of the webhook's bracket orders on historical bars.
+
+    Uses the same OrderSettings (overrides, fill_or_cancel, bracket_fill) and
+    InstrumentSpec (tick grid, multiplier, commission) as the live bot and
+    produces trade records in the shape of the live trade log.
+    """
+
+    HIT_TYPES = (None, "takeProfit", "trailingStop")
+
+    def __init__(self, bars, spec, settings=None):
+        self.bars = bars
+        self.spec = spec
+        self.settings = settings or OrderSettings()
+
+    def run(self, alerts, settings=None):
+        """Simulate all alerts. Returns (trade records, summary)."""
+        settings = settings or self.settings
+        arrays = alerts if isinstance(alerts, AlertArrays) else AlertArrays(alerts, self.spec)
+        sim = simulate(self.bars, arrays, settings)
+        profit = self.net_profit(sim)
+        records = []
+        for i in np.flatnonzero(sim["filled"]):
+            order = arrays.orders[i]
+            hit_type = self.HIT_TYPES[sim["hit_type"][i]] or "expired"
+            records.append({
+                "timestamp": datetime.fromtimestamp(self.bars.time[sim["exit_index"][i]], timezone.utc).isoformat(),
+                "symbol": order.symbol,
+                "side": order.action.upper(),
+                "contracts": int(sim["quantity"][i]),
+                "parentFillPrice": float(sim["entry_price"][i]),
+                "childFillPrice": float(sim["first_exit_price"][i]),
+                "commision_per_contract": self.spec.commission,
+                "timeframe": order.timeframe,
+                "hitType": hit_type,
+                "profit": float(profit[i]),
+                "result": "Profit" if sim["points"][i] > 0 else "Loss" if sim["points"][i] < 0 else "Neutral",
+            })
+        return records, summarize(sim, profit)
+
+    def net_profit(self, sim):
+        """Net P&L per alert (0 for unfilled parents): points x point value minus commission per order."""
+        return net_profit(sim, self.spec.point_value, self.spec.commission, self.spec.min_commission)
+
+
+def net_profit(sim, point_value, commission, min_commission=0.0):
+    """Net P&L per alert: entry and every exit leg pay commission like spec.commission_for()."""
+    legs = sim["leg_quantity"]
+    exits = np.where(legs > 0, np.maximum(commission * legs, min_commission), 0).sum(axis=1)
+    entry = np.maximum(commission * sim["quantity"], min_commission)
+    gross = sim["points"] * point_value
+    return np.round(np.where(sim["filled"], gross - entry - exits, 0), 2)
+
+
+def summarize(sim, profit):
+    """Aggregate metrics of one simulation: net P&L, win rate, max drawdown, counts."""
+    filled = sim["filled"]
+    trades = profit[filled]
+    order = np.argsort(sim["exit_index"][filled], kind="stable")
+    equity = np.cumsum(trades[order])
+    drawdown = float((np.maximum.accumulate(np.concatenate([[0.0], equity]))[1:] - equity).max(initial=0.0))
+    wins = int((trades > 0).sum())
+    return {
+        "alerts": int(len(filled)),
+        "trades": int(filled.sum()),
+        "cancelled": int((~filled).sum()),
+        "takeProfit": int((sim["hit_type"][filled] == 1).sum()),
+        "trailingStop": int((sim["hit_type"][filled] == 2).sum()),
+        "expired": int((sim["hit_type"][filled] == 0).sum()),
+        "netProfit": round(float(trades.sum()), 2),
+        "winRate": round(wins / len(trades), 4) if len(trades) else 0.0,
+        "maxDrawdown": round(drawdown, 2),
+        "profitFactor": round(float(trades[trades > 0].sum() / -trades[trades < 0].sum()), 3)
+        if (trades < 0).any() else None,
+    }
@@ -0,0 +1,284 @@
+import asyncio
+import json
+import os
+import re
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+from .backtester import Bars
+from ..core.log import get_logger
+
+log = get_logger("history")
+
+# barSizeSetting von reqHistoricalData -> Sekunden pro Bar
+BAR_SECONDS = {
+    "1 secs": 1, "5 secs": 5, "10 secs": 10, "15 secs": 15, "30 secs": 30,
+    "1 min": 60, "2 mins": 120, "3 mins": 180, "5 mins": 300, "10 mins": 600, "15 mins": 900,
+    "20 mins": 1200, "30 mins": 1800, "1 hour": 3600, "2 hours": 7200, "3 hours": 10800,
+    "4 hours": 14400, "8 hours": 28800, "1 day": 86400,
+}
+
+COLUMNS = ("time", "open", "high", "low", "close", "volume")
+
+# Bars pro Request: bleibt unter den IB-Grenzen für durationStr je Bargröße
+BARS_PER_REQUEST = 1800
+
+
+class BarSeries:
+    """
+    Bars of one contract, bar size and data type on disk.
+
+    Every column is a raw float64 file (time.f8, open.f8, ...), sorted by
+    time, plus meta.json with the time ranges already requested from IB
+    (including ranges without bars, e.g. weekends). New bars after the last
+    stored one are appended; older history is merged in by rewriting the
+    columns. Reads map the files, slices by time range are views, not copies.
+    """
+
+    def __init__(self, path, meta=None):
+        self.path = path
+        self._maps = None
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                self.meta = json.load(f)
+        else:
+            self.meta = dict(meta or {}, coverage=[])
+
+    def __len__(self):
+        return len(self._columns()["time"])
+
+    @property
+    def coverage(self):
+        return [tuple(r) for r in self.meta["coverage"]]
+
+    def missing(self, start, end):
+        """Sub-ranges of [start, end) (epoch seconds) that were never requested."""
+        gaps, cursor = [], start
+        for lo, hi in self.coverage:
+            if hi <= cursor:
+                continue
+            if lo >= end:
+                break
+            if lo > cursor:
+                gaps.append((cursor, lo))
+            cursor = max(cursor, hi)
+        if cursor < end:
+            gaps.append((cursor, end))
+        return gaps
+
+    def slice(self, start=None, end=None):
+        """Bars with start <= time < end as views on the mapped files."""
+        columns, lo, hi = self._range(start, end)
+        return Bars(*(columns[name][lo:hi] for name in COLUMNS[:5]))
+
+    def volume(self, start=None, end=None):
+        """Volume column of the same range as slice()."""
+        columns, lo, hi = self._range(start, end)
+        return columns["volume"][lo:hi]
+
+    def _range(self, start, end):
+        columns = self._columns()
+        times = columns["time"]
+        lo = 0 if start is None else int(np.searchsorted(times, start, "left"))
+        hi = len(times) if end is None else int(np.searchsorted(times, end, "left"))
+        return columns, lo, hi
+
+    def add(self, data, covered):
+        """
+        Store fetched bars (dict of column arrays) and mark the range
+        `covered` as requested. Bars at already stored times are ignored.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        data = {name: np.asarray(data[name], dtype=np.float64) for name in COLUMNS}
+        order = np.argsort(data["time"], kind="stable")
+        data = {name: values[order] for name, values in data.items()}
+        times = self._columns()["time"]
+        last = times[-1] if len(times) else -np.inf
+
+        if len(data["time"]) and data["time"][0] > last:
+            # Normalfall: nur neuere Bars -> an die Dateien anhängen
+            keep = np.concatenate([[True], np.diff(data["time"]) > 0])
+            self._maps = None
+            for name in COLUMNS:
+                with open(self._file(name), "ab") as f:
+                    data[name][keep].tofile(f)
+        elif len(data["time"]):
+            # Lücke vor oder zwischen gespeicherten Bars -> Spalten neu schreiben
+            current = self._columns()
+            merged = {name: np.concatenate([current[name], data[name]]) for name in COLUMNS}
+            _, first = np.unique(merged["time"], return_index=True)  # vorhandene Bars gewinnen
+            self._maps = None
+            for name in COLUMNS:
+                tmp = self._file(name) + ".tmp"
+                merged[name][first].tofile(tmp)
+                os.replace(tmp, self._file(name))
+
+        self.meta["coverage"] = _merge_ranges(self.coverage + [tuple(covered)])
+        tmp = os.path.join(self.path, "meta.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, indent=1)
+        os.replace(tmp, os.path.join(self.path, "meta.json"))
+
+    def _file(self, name):
+        return os.path.join(self.path, f"{name}.f8")
+
+    def _columns(self):
+        if self._maps is None:
+            maps = {}
+            for name in COLUMNS:
+                path = self._file(name)
+                size = os.path.getsize(path) if os.path.exists(path) else 0
+                # np.memmap kann keine leeren Dateien mappen
+                maps[name] = np.memmap(path, dtype=np.float64, mode="r") if size else np.empty(0)
+            self._maps = maps
+        return self._maps
+
+
+def _merge_ranges(ranges):
+    merged = []
+    for lo, hi in sorted(ranges):
+        if merged and lo <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], hi)
+        else:
+            merged.append([lo, hi])
+    return merged
+
+
+class BarStore:
+    """
+    Local cache for reqHistoricalData.
+
+    fetch() requests only the parts of a time range that were never loaded
+    before (newest first, BARS_PER_REQUEST bars per request) and stores them
+    per contract, bar size, whatToShow and useRTH (see BarSeries). load()
+    reads from disk only - no IB connection needed, e.g. for backtests.
+    """
+
+    def __init__(self, ib=None, root="data/bars", what_to_show="TRADES", use_rth=False, timeout=60.0):
+        self.ib = ib
+        self.root = root
+        self.what_to_show = what_to_show
+        self.use_rth = use_rth
+        self.timeout = timeout
+        self._series = {}
+        self._locks = {}   # pro Serie: parallele fetch() laden dieselbe Lücke nur einmal
+
+    def configure(self, settings):
+        """Apply config.yaml's `history` section."""
+        settings = settings or {}
+        self.root = settings.get("path", self.root)
+        self.what_to_show = settings.get("what_to_show", self.what_to_show)
+        self.use_rth = bool(settings.get("use_rth", self.use_rth))
+        self.timeout = float(settings.get("timeout", self.timeout))
+        self._series.clear()
+
+    @staticmethod
+    def key(contract):
+        """Directory name of a contract: local symbol plus conId (stable across rolls)."""
+        if isinstance(contract, str):
+            return contract
+        name = re.sub(r"[^A-Za-z0-9.-]+", "", contract.localSymbol or contract.symbol) or "contract"
+        return f"{name}_{contract.conId}"
+
+    def keys(self):
+        """Contracts with stored bars."""
+        return sorted(os.listdir(self.root)) if os.path.isdir(self.root) else []
+
+    def series(self, contract, bar_size="1 min", what_to_show=None, use_rth=None):
+        if bar_size not in BAR_SECONDS:
+            raise ValueError(f"Unsupported bar size {bar_size!r}, supported: {', '.join(BAR_SECONDS)}")
+        what_to_show = what_to_show or self.what_to_show
+        use_rth = self.use_rth if use_rth is None else use_rth
+        key = self.key(contract)
+        name = f"{bar_size.replace(' ', '')}_{what_to_show}_{'rth' if use_rth else 'all'}"
+        path = os.path.join(self.root, key, name)
+        series = self._series.get(path)
+        if series is None:
+            series = self._series[path] = BarSeries(path, {
+                "contract": key, "barSize": bar_size, "whatToShow": what_to_show, "useRTH": use_rth})
+        return series
+
+    def load(self, contract, bar_size="1 min", start=None, end=None, **kwargs):
+        """Stored bars with start <= time < end (datetimes or epoch seconds), without network access."""
+        return self.series(contract, bar_size, **kwargs).slice(_epoch(start), _epoch(end))
+
+    async def fetch(self, contract, bar_size="1 min", start=None, end=None, **kwargs):
+        """
+        Bars of [start, end) (default end: now); missing ranges are requested
+        from IB first. The still open current bar is not stored.
+        """
+        series = self.series(contract, bar_size, **kwargs)
+        step = BAR_SECONDS[bar_size]
+        now = datetime.now(timezone.utc).timestamp()
+        end = min(_epoch(end) if end is not None else now, now // step * step)
+        start = _epoch(start) if start is not None else end - step * BARS_PER_REQUEST
+        lock = self._locks.setdefault(series.path, asyncio.Lock())
+        async with lock:
+            for gap_start, gap_end in reversed(series.missing(start, end)):
+                await self._fill(contract, series, step, gap_start, gap_end)
+        return series.slice(start, end)
+
+    async def _fill(self, contract, series, step, start, end):
+        """
+        Request [start, end) backwards from end in chunks and store it in one
+        go: a gap at the end is appended, a gap before stored bars costs one rewrite.
+        """
+        meta = series.meta
+        span = step * BARS_PER_REQUEST
+        chunks, cursor = [], end
+        try:
+            while cursor > start:
+                duration = _duration(min(span, cursor - start), step)
+                requested = time.monotonic()
+                bars = await self.ib.reqHistoricalDataAsync(
+                    contract, datetime.fromtimestamp(cursor, timezone.utc), duration, meta["barSize"],
+                    meta["whatToShow"], meta["useRTH"], formatDate=2, timeout=self.timeout)
+                # ib_insync liefert bei Timeout eine leere Liste - die darf nicht als "keine Daten" gelten
+                if not bars and time.monotonic() - requested >= self.timeout:
+                    raise TimeoutError(f"reqHistoricalData for {meta['contract']} timed out")
+                rows = [(t, bar.open, bar.high, bar.low, bar.close, bar.volume)
+                        for bar in bars for t in (_bar_time(bar.date),) if start <= t < cursor]
+                chunks.append(rows)
+                # Auch leere Antworten zählen als abgedeckt (Wochenende, Feiertag, vor Listing)
+                count, unit = duration.split()
+                earliest = cursor - _DURATION_SECONDS[unit] * int(count)
+                log.info("History %s %s: %d bars until %s", meta["contract"], meta["barSize"], len(rows),
+                         datetime.fromtimestamp(cursor, timezone.utc).isoformat())
+                cursor = max(start, min([earliest] + [row[0] for row in rows[:1]]))
+        finally:
+            # Auch nach einem Fehler bleibt das bereits Geladene erhalten
+            if chunks:
+                rows = [row for chunk in reversed(chunks) for row in chunk]
+                data = dict(zip(COLUMNS, np.array(rows, dtype=np.float64).reshape(-1, len(COLUMNS)).T))
+                series.add(data, (cursor, end))
+
+
+_DURATION_SECONDS = {"S": 1, "D": 86400, "Y": 365 * 86400}
+
+
+def _duration(seconds, step):
+    """durationStr for reqHistoricalData covering at least `seconds` (IB accepts S only up to a day)."""
+    seconds = max(int(np.ceil(seconds)), step, 30)
+    if seconds <= 86400:
+        return f"{seconds} S"
+    days = int(np.ceil(seconds / 86400))
+    return f"{days} D" if days < 365 else "1 Y"
+
+
+def _bar_time(value):
+    if isinstance(value, datetime):
+        return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp()
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day, tzinfo=timezone.utc).timestamp()
+    return float(value)
+
+
+def _epoch(value):
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, timedelta):
+        return datetime.now(timezone.utc).timestamp() - value.total_seconds()
+    return _bar_time(value)
@@ -0,0 +1,299 @@
+import asyncio
+import time
+import uuid
+from datetime import datetime
+from typing import NamedTuple
+from ..utils.helpers import wait_for_fill_or_cancel, wait_for_bracket_fill
+from .instrument_registry import InstrumentSpec
+from ..core.log import get_logger
+
+log = get_logger("brackets")
+
+ORDER_REF_PREFIX = "tvbot"
+
+
+class BracketRef(NamedTuple):
+    """Contents of a bracket leg's orderRef, see order_ref()."""
+    bracket_id: str
+    leg: str          # "P" Parent, "TP" Take Profit, "TS" Trailing Stop
+    created: float    # Epoch-Sekunden der Platzierung
+    timeframe: str
+    symbol: str       # Alert-Symbol, z.B. "NQ1!"
+
+
+def order_ref(bracket_id, leg, order, created=None):
+    """
+    orderRef of a bracket leg. IB keeps it with the order and its executions,
+    so a restarted bot can regroup and resume its brackets (see BracketReconciler).
+    """
+    created = int(created if created is not None else time.time())
+    return "|".join((ORDER_REF_PREFIX, bracket_id, leg, str(created), order.timeframe, order.symbol))
+
+
+def parse_order_ref(ref):
+    """BracketRef of an orderRef written by order_ref(), None for foreign orders."""
+    parts = (ref or "").split("|", 5)
+    if len(parts) != 6 or parts[0] != ORDER_REF_PREFIX:
+        return None
+    try:
+        created = float(parts[3])
+    except ValueError:
+        return None
+    return BracketRef(parts[1], parts[2], created, parts[4], parts[5])
+
+
+class BracketSupervisor:
+    """
+    Owns submitted bracket orders after the webhook has returned: waits for the
+    parent and child fills in a background task, computes P&L and hands the
+    finished log entry to on_trade.
+
+    Bracket states: submitted -> working -> closed, or cancelled / expired / error.
+    An optional AlertTrace gets the parent/child fill stages and the final status.
+    P&L comes from the bracket's ledger in the PnLEngine (executions and
+    commission reports per leg). After the first child fill the remaining exit
+    leg is awaited until the position is flat, at most until bracket_timeout.
+    """
+
+    ACTIVE_STATES = ("submitted", "working")
+
+    def __init__(self, tracker, pnl, on_trade=None, on_update=None, max_history=500):
+        self.tracker = tracker
+        self.pnl = pnl
+        self.on_trade = on_trade
+        self.on_update = on_update
+        self.max_history = max_history
+        self.brackets = {}
+        self._tasks = {}
+        self._traces = {}
+
+    @staticmethod
+    def new_id():
+        return uuid.uuid4().hex[:12]
+
+    def submit(self, order, parent_trade, tp_trade, ts_trade, fill_timeout, bracket_timeout, trace=None, spec=None):
+        """
+        Register a placed bracket and start supervising it. Returns the bracket
+        handle; its ID is taken from the parent's orderRef if it has one.
+        """
+        ref = parse_order_ref(parent_trade.order.orderRef)
+        bracket_id = ref.bracket_id if ref else self.new_id()
+        self._register(bracket_id, order, parent_trade, tp_trade, ts_trade, trace)
+        return self._start(bracket_id, order, parent_trade, tp_trade, ts_trade, fill_timeout, bracket_timeout,
+                           spec or InstrumentSpec(order.symbol))
+
+    def resume(self, bracket_id, order, parent_trade, tp_trade, ts_trade, fill_timeout, bracket_timeout, spec):
+        """
+        Supervise a bracket found at IB after a restart (see BracketReconciler).
+        A filled parent is passed as a Trade in status Filled; the timeouts are
+        what is left of the original ones.
+        """
+        self._register(bracket_id, order, parent_trade, tp_trade, ts_trade, None, restored=True)
+        return self._start(bracket_id, order, parent_trade, tp_trade, ts_trade,
+                           max(fill_timeout, 0), max(bracket_timeout, 0), spec)
+
+    async def record_closed(self, bracket_id, order, fills, child_type, spec, timestamp=None):
+        """
+        Log a bracket that finished while the bot was down (backfill) from its
+        executions (leg -> [Fill]). Returns the log entry.
+        """
+        self._register(bracket_id, order, None, None, None, None, restored=True)
+        ledger = self.pnl.open(bracket_id, order.action, spec)
+        try:
+            for leg, leg_fills in fills.items():
+                self.pnl.add_fills(bracket_id, leg, leg_fills)
+            await ledger.wait_settled(self.pnl.commission_wait)
+            log_entry = self._build_log_entry(order, ledger, child_type, spec, bracket_id, timestamp)
+        finally:
+            self.pnl.close(bracket_id)
+        if self.on_trade:
+            self.on_trade(log_entry)
+        self._update(bracket_id, status="closed", parentFillPrice=log_entry["parentFillPrice"],
+                     childOrderType=child_type, childFillPrice=log_entry["childFillPrice"], logEntry=log_entry)
+        return log_entry
+
+    def _register(self, bracket_id, order, parent_trade, tp_trade, ts_trade, trace, restored=False):
+        now = datetime.now().isoformat()
+        self.brackets[bracket_id] = {
+            "id": bracket_id,
+            "traceId": trace.id if trace else None,
+            "status": "submitted",
+            "symbol": order.symbol,
+            "side": order.action.upper(),
+            "timeframe": order.timeframe,
+            "parentOrderId": parent_trade.order.orderId if parent_trade else None,
+            "takeProfitOrderId": tp_trade.order.orderId if tp_trade else None,
+            "trailingStopOrderId": ts_trade.order.orderId if ts_trade else None,
+            "parentFillPrice": None,
+            "childOrderType": None,
+            "childFillPrice": None,
+            "createdAt": now,
+            "updatedAt": now,
+            "detail": None,
+            "logEntry": None,
+            "restored": restored,
+        }
+        if trace is not None:
+            self._traces[bracket_id] = trace
+
+    def _start(self, bracket_id, order, parent_trade, tp_trade, ts_trade, fill_timeout, bracket_timeout, spec):
+        self.pnl.open(bracket_id, order.action, spec, {"P": parent_trade, "TP": tp_trade, "TS": ts_trade})
+        task = asyncio.create_task(
+            self._supervise(bracket_id, order, parent_trade, tp_trade, ts_trade, fill_timeout, bracket_timeout, spec)
+        )
+        self._tasks[bracket_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(bracket_id, None))
+        if self.on_update:
+            self.on_update(self.brackets[bracket_id])
+        return self.brackets[bracket_id]
+
+    def get(self, bracket_id):
+        return self.brackets.get(bracket_id)
+
+    def list(self, status=None):
+        return [b for b in self.brackets.values() if status is None or b["status"] == status]
+
+    async def stop(self):
+        """Cancel all supervision tasks (orders at IB stay untouched)."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _update(self, bracket_id, **fields):
+        bracket = self.brackets[bracket_id]
+        bracket.update(fields)
+        bracket["updatedAt"] = datetime.now().isoformat()
+        if self.on_update:
+            self.on_update(bracket)
+        if bracket["status"] not in self.ACTIVE_STATES:
+            trace = self._traces.pop(bracket_id, None)
+            if trace is not None:
+                trace.finish(bracket["status"])
+            self._prune()
+        return bracket
+
+    def _mark(self, bracket_id, stage):
+        trace = self._traces.get(bracket_id)
+        if trace is not None:
+            trace.mark(stage)
+
+    def _prune(self):
+        # Nur abgeschlossene Brackets verwerfen, älteste zuerst
+        excess = len(self.brackets) - self.max_history
+        if excess <= 0:
+            return
+        for bracket_id in [b["id"] for b in self.brackets.values() if b["status"] not in self.ACTIVE_STATES][:excess]:
+            del self.brackets[bracket_id]
+
+    async def _supervise(self, bracket_id, order, parent_trade, tp_trade, ts_trade, fill_timeout, bracket_timeout, spec):
+        try:
+            parent_filled, parent_fill_price = await wait_for_fill_or_cancel(self.tracker, parent_trade, timeout=fill_timeout)
+            if not parent_filled:
+                self._update(bracket_id, status="cancelled",
+                             detail=f"❌ Parent Order wurde nicht innerhalb von {fill_timeout} Sekunden ausgeführt.")
+                return
+
+            log.info("Parent order filled at price: %s", parent_fill_price, extra={"bracketId": bracket_id})
+            self._mark(bracket_id, "parent_filled")
+            self._update(bracket_id, status="working", parentFillPrice=parent_fill_price)
+
+            # Warten, bis einer der Child Orders gefüllt wird
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + bracket_timeout
+            parentFilled, childType, parentFill, childFill = await wait_for_bracket_fill(
+                self.tracker, parent_trade, tp_trade, ts_trade, timeout=bracket_timeout
+            )
+            if not parentFilled or childType is None:
+                self._update(bracket_id, status="expired",
+                             detail="❌ Order wurde nicht innerhalb des Zeitlimits vollständig gefüllt.")
+                return
+
+            self._mark(bracket_id, "child_filled")
+            log.info("Bracket order filled. ParentFill: %s, Child '%s' Fill: %s", parentFill, childType, childFill,
+                     extra={"bracketId": bracket_id})
+            ledger = self.pnl.get(bracket_id)
+            trades = {"P": parent_trade, "TP": tp_trade, "TS": ts_trade}
+            flat = await self._wait_flat(ledger, trades, deadline - loop.time())
+            if not flat:
+                log.warning("Bracket %s: exit legs left %s of the position open", bracket_id, ledger.open_quantity,
+                            extra={"bracketId": bracket_id})
+            await ledger.wait_settled(self.pnl.commission_wait)
+            log_entry = self._build_log_entry(order, ledger, childType, spec, bracket_id)
+            if self.on_trade:
+                self.on_trade(log_entry)
+            log.info("Logged trade entry", extra={"bracketId": bracket_id, "trade": log_entry})
+            self._update(bracket_id, status="closed", parentFillPrice=log_entry["parentFillPrice"],
+                         childOrderType=childType, childFillPrice=log_entry["childFillPrice"], logEntry=log_entry)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.exception("Error supervising bracket %s: %s", bracket_id, e, extra={"bracketId": bracket_id})
+            self._update(bracket_id, status="error", detail=str(e))
+        finally:
+            self.pnl.close(bracket_id)
+            # Auch aufgegebene Legs (expired, cancelled, error) nicht weiter beobachten
+            for trade in (parent_trade, tp_trade, ts_trade):
+                if trade is not None:
+                    self.tracker.untrack(trade)
+
+    async def _wait_flat(self, ledger, trades, timeout):
+        """
+        Wait until the exits cover the entry quantity or no exit leg is left
+        working. Returns True if the position is flat.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max(timeout, 0)
+        while True:
+            for leg, trade in trades.items():
+                ledger.apply_status(leg, trade)
+            if ledger.open_quantity <= 0:
+                return True
+            working = [trades[leg] for leg in ("TP", "TS") if trades[leg] is not None and not trades[leg].isDone()]
+            remaining = deadline - loop.time()
+            if not working or remaining <= 0:
+                return False
+            # Nächste Änderung abwarten: weiterer (Teil-)Fill oder Leg beendet
+            filled = {t.order.orderId: t.orderStatus.filled for t in working}
+            await self.tracker.wait_for_any(
+                working, lambda t: t.isDone() or t.orderStatus.filled != filled[t.order.orderId], remaining)
+
+    @staticmethod
+    def _build_log_entry(order, ledger, childType, spec, bracket_id=None, timestamp=None):
+        # Gewinn/Verlust aus dem Ledger: tatsächliche Fills je Leg und Kommissionen laut Commission Report
+        summary = ledger.summary()
+        child_leg = "TP" if childType == "takeProfit" else "TS"
+        parentFill = ledger.entry.avg_price
+        childFill = ledger.legs[child_leg].avg_price
+        points = summary["gross"]
+
+        if points > 0:
+            result_flag = "Profit"
+        elif points < 0:
+            result_flag = "Loss"
+        else:
+            result_flag = "Neutral"
+
+        # Log-Eintrag erstellen – nur die wichtigsten Daten
+        return {
+            "timestamp": timestamp or datetime.now().isoformat(),
+            "symbol": order.symbol,
+            "side": order.action.upper(),
+            "contracts": _quantity(ledger.entry.quantity) or order.quantity,   # tatsächlich gefüllt
+            "parentFillPrice": parentFill,
+            "childFillPrice": childFill,
+            "commision_per_contract" : spec.commission,
+            "timeframe": order.timeframe,
+            "hitType": childType,        # "takeProfit" oder "trailingStop" (zuerst gefüllt)
+            "profit": summary["net"],    # netto, auf 2 Nachkommastellen gerundet
+            "grossProfit": summary["gross"],
+            "fees": summary["fees"],     # Summe der Commission Reports (fehlende geschätzt)
+            "legs": summary["legs"],     # Menge, Durchschnittspreis und Kommission je Leg
+            "openQuantity": _quantity(summary["openQuantity"]),
+            "result": result_flag,        # "Profit", "Loss" oder "Neutral"
+            "bracketId": bracket_id,      # Abgleich nach Neustart (kein doppelter Backfill)
+        }
+
+
+def _quantity(value):
+    return int(value) if float(value).is_integer() else value
@@ -0,0 +1,145 @@
+import asyncio
+import re
+from datetime import datetime, timedelta
+from ib_insync import Future, Stock
+from ..core.log import get_logger
+
+log = get_logger("contracts")
+
+# TradingView Kontinuierliche Symbole, z.B. "CME_MINI:NQ1!" -> ("NQ", 1)
+CONTINUOUS_SYMBOL = re.compile(r"^(?:[A-Z_]+:)?([A-Z0-9]+?)(\d+)!$")
+
+
+class ContractResolver:
+    """
+    Maps alert symbols to qualified IB futures contracts and caches them until
+    the contract rolls.
+
+    Continuous TradingView symbols ("NQ1!", "NQ2!") resolve to the n-th
+    non-expired contract month from reqContractDetails. A cache entry is valid
+    until roll_days before its last trade date, so the order hot path only
+    reads the cache once prewarm() has run. Roots listed as STK in sec_types
+    (config.yaml contracts.sec_types) resolve to SMART-routed stocks, which
+    never roll.
+    """
+
+    def __init__(self, ib, exchange="CME", currency="USD", roll_days=0, sec_types=None):
+        self.ib = ib
+        self.exchange = exchange
+        self.currency = currency
+        self.roll_days = roll_days
+        self.sec_types = {k.upper(): v.upper() for k, v in (sec_types or {}).items()}   # Root -> secType
+        self._cache = {}     # symbol -> (ContractDetails, valid_until)
+        self._pending = {}   # symbol -> Future, dedupliziert parallele Auflösungen
+
+    @staticmethod
+    def parse_symbol(symbol):
+        """Split an alert symbol into (root, contract index). Plain roots map to the front month."""
+        symbol = symbol.strip().upper()
+        match = CONTINUOUS_SYMBOL.match(symbol)
+        if match:
+            return match.group(1), int(match.group(2))
+        return symbol.split(":")[-1], 1
+
+    def get(self, symbol):
+        """Return the cached contract or None if it is missing or due to roll."""
+        entry = self._cache.get(symbol)
+        if entry is None or datetime.now() >= entry[1]:
+            return None
+        return entry[0].contract
+
+    def details(self, symbol):
+        """Return the cached ContractDetails of a symbol, if any."""
+        entry = self._cache.get(symbol)
+        return entry[0] if entry else None
+
+    async def resolve(self, symbol):
+        """Return the qualified contract for symbol, querying IB only on a cache miss."""
+        contract = self.get(symbol)
+        if contract is not None:
+            return contract
+
+        pending = self._pending.get(symbol)
+        if pending is None:
+            pending = asyncio.ensure_future(self._fetch(symbol))
+            self._pending[symbol] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(symbol, None))
+        return await asyncio.shield(pending)
+
+    async def prewarm(self, symbols):
+        """Resolve all symbols concurrently; failures are reported but not raised."""
+        results = await asyncio.gather(*(self.resolve(s) for s in symbols), return_exceptions=True)
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, Exception):
+                log.error("Could not resolve contract for %s: %s", symbol, result)
+            else:
+                log.info("Contract cached: %s -> %s (%s)", symbol, result.localSymbol, result.lastTradeDateOrContractMonth)
+
+    async def refresh_expiring(self, horizon=timedelta(hours=1)):
+        """
+        Roll cached symbols whose contract rolls within horizon to the contract
+        that is still valid after it. An entry is only replaced when the
+        re-qualification succeeds; on failure the old contract stays cached
+        (and usable until its valid_until).
+        """
+        limit = datetime.now() + horizon
+        symbols = [s for s, (_, valid_until) in self._cache.items() if valid_until <= limit]
+        # Nur Kontrakte, die über den Horizont hinaus gültig sind: der auslaufende wird vorab ersetzt
+        results = await asyncio.gather(*(self._fetch(s, valid_after=limit) for s in symbols),
+                                       return_exceptions=True)
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, Exception):
+                log.error("Could not refresh contract for %s, keeping the cached one: %s", symbol, result)
+            else:
+                log.info("Contract refreshed: %s -> %s (%s)", symbol, result.localSymbol,
+                         result.lastTradeDateOrContractMonth)
+
+    async def run_refresh(self, interval=3600):
+        """Roll cached contracts ahead of expiry so alerts never wait on a re-qualification."""
+        while True:
+            await self.refresh_expiring(timedelta(seconds=interval))
+            await asyncio.sleep(interval)
+
+    def sec_type(self, root):
+        return self.sec_types.get(root.upper(), "FUT")
+
+    async def _fetch(self, symbol, valid_after=None):
+        root, index = self.parse_symbol(symbol)
+        if self.sec_type(root) == "STK":
+            return await self._fetch_stock(symbol, root, index)
+        query = Future(symbol=root, exchange=self.exchange, currency=self.currency)
+        details = await self.ib.reqContractDetailsAsync(query)
+        if not details:
+            raise ValueError(f"No contract details for {root} on {self.exchange}")
+
+        valid_after = valid_after or datetime.now()
+        candidates = []
+        for d in details:
+            valid_until = self._expiry(d.contract) - timedelta(days=self.roll_days)
+            if valid_until > valid_after:
+                candidates.append((valid_until, d))
+        candidates.sort(key=lambda c: c[0])
+        if len(candidates) < index:
+            raise ValueError(f"No contract month #{index} available for {root}")
+
+        valid_until, detail = candidates[index - 1]
+        self._cache[symbol] = (detail, valid_until)
+        return detail.contract
+
+    async def _fetch_stock(self, symbol, root, index):
+        if index != 1:
+            raise ValueError(f"{root} is a stock, {symbol} has no contract month #{index}")
+        details = await self.ib.reqContractDetailsAsync(Stock(root, "SMART", self.currency))
+        if not details:
+            raise ValueError(f"No contract details for stock {root} ({self.currency})")
+        # Aktien laufen nicht aus: Eintrag bleibt bis zum Neustart gültig
+        self._cache[symbol] = (details[0], datetime.max)
+        return details[0].contract
+
+    @staticmethod
+    def _expiry(contract):
+        date = contract.lastTradeDateOrContractMonth
+        if len(date) >= 8:
+            return datetime.strptime(date[:8], "%Y%m%d")
+        # Nur Kontraktmonat bekannt: Ablauf konservativ auf den Monatsanfang legen
+        return datetime.strptime(date[:6], "%Y%m")
@@ -0,0 +1,55 @@
+import asyncio
+import json
+
+
+class EventBus:
+    """
+    In-process fan-out of dashboard events as Server-Sent Events.
+
+    Each event is serialized once in publish() and queued for every
+    subscriber. Idle subscribers only wake up for a heartbeat; a subscriber
+    whose queue overflows is disconnected and resyncs when EventSource
+    reconnects.
+    """
+
+    def __init__(self, max_queue=256, heartbeat=15.0):
+        self.max_queue = max_queue
+        self.heartbeat = heartbeat
+        self._subscribers = set()
+
+    @staticmethod
+    def format(event, data):
+        return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+    def publish(self, event, data):
+        """Queue an event for all subscribers. Must be called from the event loop."""
+        if not self._subscribers:
+            return
+        message = self.format(event, data)
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Zu langsamer Client: Verbindung beenden statt unbegrenzt zu puffern
+                self._subscribers.discard(queue)
+                queue.get_nowait()
+                queue.put_nowait(None)
+
+    async def stream(self, snapshot=()):
+        """Yield SSE messages: first the (event, data) snapshot, then live events."""
+        queue = asyncio.Queue(maxsize=self.max_queue)
+        self._subscribers.add(queue)
+        try:
+            for event, data in snapshot:
+                yield self.format(event, data)
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    break
+                yield message
+        finally:
+            self._subscribers.discard(queue)
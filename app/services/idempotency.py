@@ -0,0 +1,115 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+
+
+class IdempotencyCache:
+    """
+    Deduplicates webhook alerts (TradingView retries slow endpoints).
+
+    Every alert is keyed on an explicit idempotency key or on a hash of its
+    payload plus the alert timestamp. The first request for a key runs the
+    handler, every duplicate within `ttl` seconds gets the original response
+    back - also while the first one is still in flight. Entries live in a
+    bounded LRU (OrderedDict), lookups and inserts are O(1). Failed handlers
+    are not cached, so a retry after an error is processed again.
+    """
+
+    def __init__(self, max_entries=10000, ttl=120.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires, future)
+        self._inflight = {}            # key -> future, bis complete()/fail() (auch nach Verdrängung)
+
+    def configure(self, settings):
+        """Apply config.yaml's `idempotency` section."""
+        settings = settings or {}
+        self.ttl = float(settings.get("ttl", self.ttl))
+        self.max_entries = int(settings.get("max_entries", self.max_entries))
+        self._evict()
+
+    @staticmethod
+    def key_for(payload, timestamp=None, explicit_key=None):
+        if explicit_key:
+            return f"key:{explicit_key}"
+        body = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+        return "sha256:" + hashlib.sha256(f"{timestamp or ''}\0{body}".encode()).hexdigest()
+
+    async def run(self, key, handler):
+        """
+        Run handler() at most once per key. Returns (result, duplicate).
+        """
+        while True:
+            existing = self.claim(key)
+            if existing is None:
+                break
+            # shield: ein abgebrochener Retry darf das Original nicht abbrechen
+            result = await asyncio.shield(existing)
+            if result is not None:
+                return result, True
+            # Original ist fehlgeschlagen -> dieser Request übernimmt
+
+        try:
+            result = await handler()
+        except BaseException:
+            self.fail(key)
+            raise
+        self.complete(key, result)
+        return result, False
+
+    def claim(self, key):
+        """
+        Reserve key for the caller. Returns None if the caller now owns it
+        (and must call complete() or fail()), otherwise the future of the
+        original request, which yields its result or None if it failed.
+        """
+        existing = self._inflight.get(key) or self._lookup(key)
+        if existing is not None:
+            self.hits += 1
+            return existing
+        self.misses += 1
+        future = self._inflight[key] = asyncio.get_running_loop().create_future()
+        self._entries[key] = (time.monotonic() + self.ttl, future)
+        self._evict()
+        return None
+
+    def complete(self, key, result):
+        """Store the result of a claimed key and wake up waiting duplicates."""
+        future = self._inflight.pop(key, None)
+        if future is not None:
+            future.set_result(result)
+
+    def fail(self, key):
+        """Drop a claimed key (failures are not cached); waiting duplicates get None."""
+        future = self._inflight.pop(key, None)
+        if future is not None:
+            if self._entries.get(key, (None, None))[1] is future:
+                del self._entries[key]
+            future.set_result(None)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, future = entry
+        if expires <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return future
+
+    def _evict(self):
+        now = time.monotonic()
+        # Abgelaufene Einträge vorne abräumen, danach auf max_entries begrenzen
+        while self._entries:
+            key, (expires, _) = next(iter(self._entries.items()))
+            if expires > now and len(self._entries) <= self.max_entries:
+                break
+            del self._entries[key]
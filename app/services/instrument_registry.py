@@ -0,0 +1,188 @@
+import asyncio
+import dataclasses
+import math
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from ..core.log import get_logger
+
+log = get_logger("instruments")
+
+# Kommission je Kontrakt/Aktie und Seite, falls config.yaml nichts anderes vorgibt
+DEFAULT_COMMISSIONS = {
+    "FUT": {"per_unit": 2.25},
+    "STK": {"per_unit": 0.005, "minimum": 1.0},
+}
+
+
+@dataclass(frozen=True)
+class InstrumentSpec:
+    """
+    Immutable price grid and contract economics of one instrument.
+
+    increments are the (lowEdge, increment) pairs of the IB market rule; when
+    no rule is known the grid is min_tick everywhere. Prices are snapped to
+    multiples of the increment valid at that price. P&L uses
+    multiplier / price_magnifier per point, since IB reports magnified prices.
+    """
+    symbol: str
+    sec_type: str = "FUT"
+    min_tick: float = 0.01
+    multiplier: float = 1.0
+    price_magnifier: int = 1
+    increments: tuple = ()
+    commission: float = 0.0          # je Kontrakt/Aktie und Seite
+    min_commission: float = 0.0      # Mindestkommission je Order
+    _edges: tuple = field(init=False, repr=False, compare=False)
+    _steps: tuple = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        increments = tuple(sorted(self.increments)) or ((0.0, self.min_tick),)
+        # Raster vorberechnen: Kanten für bisect, Schrittweite und Nachkommastellen je Bereich
+        object.__setattr__(self, "increments", increments)
+        object.__setattr__(self, "_edges", tuple(edge for edge, _ in increments))
+        object.__setattr__(self, "_steps", tuple(
+            (step, max(0, -Decimal(str(step)).normalize().as_tuple().exponent)) for _, step in increments))
+
+    @property
+    def point_value(self):
+        return self.multiplier / self.price_magnifier
+
+    def tick_size(self, price=None):
+        """Price increment valid at price (the smallest one if price is None)."""
+        if price is None:
+            return self._steps[0][0]
+        return self._steps[max(0, bisect_right(self._edges, abs(price)) - 1)][0]
+
+    def round_price(self, price, mode="nearest"):
+        """Snap price onto the grid; mode is 'nearest', 'up' or 'down'."""
+        step, decimals = self._steps[max(0, bisect_right(self._edges, abs(price)) - 1)]
+        units = price / step
+        if mode == "up":
+            units = math.ceil(units - 1e-9)
+        elif mode == "down":
+            units = math.floor(units + 1e-9)
+        else:
+            units = round(units)
+        return round(units * step, decimals)
+
+    def round_distance(self, distance, price):
+        """Snap a price distance (e.g. a trailing amount) up to whole ticks valid at price, at least one."""
+        step, decimals = self._steps[max(0, bisect_right(self._edges, abs(price)) - 1)]
+        return round(max(1, math.ceil(distance / step - 1e-9)) * step, decimals)
+
+    def offset(self, price, amount, relative_type="ticks"):
+        """price moved by amount ticks or percent, snapped onto the grid."""
+        relative_type = relative_type.lower()
+        if relative_type == "ticks":
+            return self.round_price(price + amount * self.tick_size(price))
+        if relative_type == "percent":
+            return self.round_price(price * (1 + amount / 100))
+        raise ValueError(f"Unknown relativeType {relative_type!r}, allowed are 'ticks' or 'percent'")
+
+    def commission_for(self, quantity):
+        """Commission of one side (one order) over quantity contracts/shares."""
+        return max(self.commission * abs(quantity), self.min_commission)
+
+    def pnl(self, side, entry, exit, quantity):
+        """Net P&L of a round trip in account currency (both commissions deducted)."""
+        points = exit - entry if side.upper() == "BUY" else entry - exit
+        gross = round(points, 8) * quantity * self.point_value
+        return round(gross - 2 * self.commission_for(quantity), 2)
+
+
+class InstrumentRegistry:
+    """
+    Caches an InstrumentSpec per contract (conId), built from the
+    ContractDetails the ContractResolver already holds plus the IB market
+    rule of the contract's exchange. Market rules are shared between
+    contracts and requested once per rule ID. Commission schedules are not
+    available through the API and come from config.yaml's `instruments`
+    section (per symbol root, then per secType).
+    """
+
+    def __init__(self, resolver, commissions=None, timeout=4.0):
+        self.resolver = resolver
+        self.timeout = timeout
+        self.commissions = {**DEFAULT_COMMISSIONS, **(commissions or {})}
+        self._specs = {}     # conId -> InstrumentSpec
+        self._rules = {}     # marketRuleId -> Future mit ((lowEdge, increment), ...)
+
+    def configure(self, settings):
+        """Apply config.yaml's `instruments` section; cached specs get the new commissions."""
+        settings = settings or {}
+        commissions = {**DEFAULT_COMMISSIONS}
+        for key, value in (settings.get("commissions") or {}).items():
+            commissions[str(key).upper()] = value if isinstance(value, dict) else {"per_unit": value}
+        for key, value in commissions.items():
+            if float(value.get("per_unit", 0)) < 0 or float(value.get("minimum", 0)) < 0:
+                raise ValueError(f"instruments.commissions.{key}: commission must not be negative")
+        self.commissions = commissions
+        self._specs = {con_id: dataclasses.replace(spec, **self.commission_schedule(spec.symbol, spec.sec_type))
+                       for con_id, spec in self._specs.items()}
+
+    def get(self, contract):
+        """Return the cached spec of a qualified contract, or None."""
+        return self._specs.get(contract.conId)
+
+    async def load(self, symbol):
+        """Return the spec of the contract an alert symbol resolves to, building it on a cache miss."""
+        contract = await self.resolver.resolve(symbol)
+        spec = self._specs.get(contract.conId)
+        if spec is None:
+            spec = await self._build(self.resolver.details(symbol))
+            self._specs[contract.conId] = spec
+        return spec
+
+    async def prewarm(self, symbols):
+        """Build the specs of all symbols concurrently; failures are reported but not raised."""
+        results = await asyncio.gather(*(self.load(s) for s in symbols), return_exceptions=True)
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, Exception):
+                log.error("Could not load instrument spec for %s: %s", symbol, result)
+            else:
+                log.info("Instrument spec cached: %s -> tick %s, multiplier %g, commission %g",
+                         symbol, result.tick_size(), result.multiplier, result.commission)
+
+    async def _build(self, details):
+        contract = details.contract
+        return InstrumentSpec(
+            symbol=contract.symbol,
+            sec_type=contract.secType,
+            min_tick=details.minTick or 0.01,
+            multiplier=float(contract.multiplier or 1),
+            price_magnifier=details.priceMagnifier or 1,
+            increments=await self._market_rule(details),
+            **self.commission_schedule(contract.symbol, contract.secType),
+        )
+
+    async def _market_rule(self, details):
+        # marketRuleIds gehören positionsweise zu validExchanges
+        rule_ids = [r for r in (details.marketRuleIds or "").split(",") if r]
+        if not rule_ids:
+            return ()
+        exchanges = (details.validExchanges or "").split(",")
+        exchange = details.contract.exchange
+        rule_id = int(rule_ids[exchanges.index(exchange)] if exchange in exchanges[:len(rule_ids)] else rule_ids[0])
+
+        pending = self._rules.get(rule_id)
+        if pending is None:
+            pending = self._rules[rule_id] = asyncio.ensure_future(self._fetch_rule(rule_id))
+        return await asyncio.shield(pending)
+
+    async def _fetch_rule(self, rule_id):
+        try:
+            increments = await asyncio.wait_for(self.resolver.ib.reqMarketRuleAsync(rule_id), self.timeout)
+        except Exception as e:
+            # Ohne Market Rule bleibt minTick das Raster, beim nächsten Kontrakt neu versuchen
+            log.warning("Market rule %s unavailable, falling back to minTick: %s", rule_id, e or type(e).__name__)
+            self._rules.pop(rule_id, None)
+            return ()
+        return tuple((i.lowEdge, i.increment) for i in increments or ())
+
+    def commission_schedule(self, symbol, sec_type="FUT"):
+        """Configured commission of a symbol root (or its secType) as InstrumentSpec fields."""
+        schedule = self.commissions.get(symbol.upper()) or self.commissions.get(sec_type) or {}
+        return {"commission": float(schedule.get("per_unit", 0.0)),
+                "min_commission": float(schedule.get("minimum", 0.0))}
@@ -0,0 +1,233 @@
+import math
+import time
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from ..core.log import get_logger
+
+log = get_logger("market_data")
+
+FIELDS = ("time", "bid", "ask", "last", "bidSize", "askSize", "lastSize")
+
+
+class Quote(NamedTuple):
+    """Latest top of book of a contract; time is the local receive time (epoch seconds)."""
+    time: float
+    bid: float
+    ask: float
+    last: float
+    bidSize: float
+    askSize: float
+    lastSize: float
+
+    @property
+    def age(self):
+        return time.time() - self.time
+
+    @property
+    def mid(self):
+        return (self.bid + self.ask) / 2 if self.bid > 0 and self.ask > 0 else self.last
+
+    def reference(self, action):
+        """Price a marketable order of this side would trade at: ask for BUY, bid for SELL, else last."""
+        price = self.ask if action.upper() == "BUY" else self.bid
+        return price if price > 0 else self.last
+
+
+class QuoteCheck(NamedTuple):
+    ok: bool
+    reason: Optional[str] = None       # "stale", "deviation" oder None
+    detail: str = ""
+    quote: Optional[Quote] = None
+    deviation_ticks: Optional[float] = None
+
+
+class TickRing:
+    """
+    Fixed-size ring buffer of quote updates (one row per FIELDS). append()
+    and latest() are O(1) and allocation free; recent() copies the last n
+    rows in chronological order.
+    """
+
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self._data = np.full((capacity, len(FIELDS)), np.nan)
+        self._count = 0
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    def append(self, row):
+        self._data[self._count % self.capacity] = row
+        self._count += 1
+
+    def latest(self):
+        if not self._count:
+            return None
+        return Quote(*self._data[(self._count - 1) % self.capacity].tolist())
+
+    def recent(self, n=None):
+        """The last n rows (default: all buffered) as (n, len(FIELDS)) array, oldest first."""
+        n = len(self) if n is None else min(n, len(self))
+        end = self._count % self.capacity
+        if n <= end:
+            return self._data[end - n:end].copy()
+        return np.concatenate([self._data[self.capacity - (n - end):], self._data[:end]])
+
+    def since(self, timestamp):
+        """All buffered rows with time >= timestamp, oldest first."""
+        rows = self.recent()
+        return rows[np.searchsorted(rows[:, 0], timestamp, "left"):]
+
+
+class Subscription:
+    """One reqMktData line shared by all holders of the same contract."""
+
+    def __init__(self, contract, ticker, capacity):
+        self.contract = contract
+        self.ticker = ticker
+        self.ticks = TickRing(capacity)
+        self.refs = 0
+
+
+class MarketDataManager:
+    """
+    Shared, reference-counted market data subscriptions.
+
+    subscribe() opens one reqMktData line per contract no matter how many
+    components hold it, unsubscribe() cancels it with the last holder. All
+    updates arrive through one pendingTickersEvent handler and are written
+    to a TickRing per contract, so quote() is a dict lookup plus the last
+    ring row. check() compares an alert's limit price with the live quote
+    (staleness and deviation in ticks) before an order goes out.
+    """
+
+    def __init__(self, ib, capacity=4096, stale_after=10.0, max_deviation_ticks=None, on_violation="warn"):
+        self.ib = ib
+        self.capacity = capacity
+        self.stale_after = stale_after
+        self.max_deviation_ticks = max_deviation_ticks
+        self.on_violation = on_violation
+        self.data_type = 1
+        self._subscriptions = {}   # conId -> Subscription
+        self._held = set()         # conIds, die der Bot selbst dauerhaft abonniert hat
+        ib.pendingTickersEvent += self._on_tickers
+        ib.connectedEvent += self._resubscribe
+
+    def configure(self, settings):
+        """Apply config.yaml's `market_data` section."""
+        settings = settings or {}
+        self.capacity = int(settings.get("buffer_size", self.capacity))
+        self.stale_after = float(settings.get("stale_after", self.stale_after))
+        deviation = settings.get("max_deviation_ticks", self.max_deviation_ticks)
+        self.max_deviation_ticks = float(deviation) if deviation is not None else None
+        self.on_violation = settings.get("on_violation", self.on_violation)
+        if self.on_violation not in ("warn", "reject"):
+            raise ValueError(f"market_data.on_violation: expected 'warn' or 'reject', got {self.on_violation!r}")
+        self.data_type = int(settings.get("data_type", self.data_type))
+
+    def subscribe(self, contract):
+        """Add a holder for contract's market data; requests the line on the first one."""
+        subscription = self._subscriptions.get(contract.conId)
+        if subscription is None:
+            ticker = self._request(contract)
+            subscription = self._subscriptions[contract.conId] = Subscription(contract, ticker, self.capacity)
+            log.info("Market data subscribed: %s", contract.localSymbol or contract.symbol)
+        subscription.refs += 1
+        return subscription
+
+    def unsubscribe(self, contract):
+        """Drop a holder; the line is cancelled when nobody holds it anymore."""
+        subscription = self._subscriptions.get(contract.conId)
+        if subscription is None:
+            return
+        subscription.refs -= 1
+        if subscription.refs <= 0:
+            del self._subscriptions[contract.conId]
+            self._held.discard(contract.conId)
+            if self.ib.isConnected():
+                self.ib.cancelMktData(subscription.contract)
+            log.info("Market data cancelled: %s", contract.localSymbol or contract.symbol)
+
+    def ensure(self, contract):
+        """Hold a subscription for the bot itself (once per contract, kept until shutdown)."""
+        if contract.conId not in self._held and self.ib.isConnected():
+            self._held.add(contract.conId)
+            self.subscribe(contract)
+
+    def quote(self, contract):
+        """Latest quote of a subscribed contract or None."""
+        subscription = self._subscriptions.get(contract.conId)
+        return subscription.ticks.latest() if subscription else None
+
+    def ticks(self, contract, n=None):
+        """Recent quote updates of a subscribed contract as (n, len(FIELDS)) array."""
+        subscription = self._subscriptions.get(contract.conId)
+        return subscription.ticks.recent(n) if subscription else np.empty((0, len(FIELDS)))
+
+    def quotes(self):
+        """Latest quote per subscribed contract, keyed by local symbol."""
+        result = {}
+        for subscription in self._subscriptions.values():
+            quote = subscription.ticks.latest()
+            contract = subscription.contract
+            values = {k: None if isinstance(v, float) and math.isnan(v) else v
+                      for k, v in (quote._asdict() if quote else {}).items()}
+            result[contract.localSymbol or contract.symbol] = {
+                **values, "age": quote.age if quote else None, "refs": subscription.refs}
+        return result
+
+    def check(self, contract, action, limit_price, spec):
+        """
+        Compare an order's limit price with the live quote. Passes when there
+        is no quote (not subscribed, no market data permission).
+        """
+        quote = self.quote(contract)
+        if quote is None:
+            return QuoteCheck(True)
+        age = quote.age
+        if age > self.stale_after:
+            return QuoteCheck(False, "stale", f"last quote {age:.1f}s old", quote)
+        reference = quote.reference(action)
+        if not reference > 0:
+            return QuoteCheck(True, quote=quote)
+        deviation = (limit_price - reference) / spec.tick_size(reference)
+        if self.max_deviation_ticks is not None and abs(deviation) > self.max_deviation_ticks:
+            return QuoteCheck(False, "deviation",
+                              f"limit {limit_price} is {deviation:+.0f} ticks from {reference}", quote, deviation)
+        return QuoteCheck(True, quote=quote, deviation_ticks=deviation)
+
+    def stop(self):
+        for subscription in list(self._subscriptions.values()):
+            subscription.refs = 0
+            self.unsubscribe(subscription.contract)
+
+    def _request(self, contract):
+        if self.ib.isConnected():
+            self.ib.reqMarketDataType(self.data_type)
+            return self.ib.reqMktData(contract, "", False, False)
+        return None   # wird nach dem (Re-)Connect angefragt
+
+    def _resubscribe(self):
+        # Nach einem Reconnect sind alle Marktdaten-Zeilen weg
+        for subscription in self._subscriptions.values():
+            subscription.ticker = self._request(subscription.contract)
+
+    def _on_tickers(self, tickers):
+        now = time.time()
+        for ticker in tickers:
+            subscription = self._subscriptions.get(ticker.contract.conId)
+            if subscription is None:
+                continue
+            subscription.ticks.append((now, _price(ticker.bid), _price(ticker.ask), _price(ticker.last),
+                                       _size(ticker.bidSize), _size(ticker.askSize), _size(ticker.lastSize)))
+
+
+def _price(value):
+    # IB meldet -1 bzw. 0, wenn es keinen Bid/Ask gibt
+    return value if value is not None and value > 0 else math.nan
+
+
+def _size(value):
+    return math.nan if value is None else value
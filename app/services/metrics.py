@@ -0,0 +1,242 @@
+import math
+import time
+import uuid
+from bisect import bisect_left
+
+from ..core.trace import current_trace
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = [*zip(labelnames, values), *extra]
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels."""
+
+    type = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def collect(self):
+        for key, value in self.values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge:
+    """Value that can go up and down, optionally split by labels."""
+
+    type = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+
+    def set(self, value, **labels):
+        self.values[tuple(str(labels.get(name, "")) for name in self.labelnames)] = value
+
+    def collect(self):
+        for key, value in self.values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram as in the Prometheus client libraries."""
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}  # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def collect(self):
+        for key, series in self.series.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), series):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, (("le", _format_value(bound)),))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(series[-1])}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class MetricsRegistry:
+    """Holds all metrics and renders them in the Prometheus text exposition format."""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self.metrics = {}
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+class AlertMetrics:
+    """
+    Latency metrics of the webhook order path.
+
+    Every alert gets an AlertTrace; each stage it reaches is recorded as the
+    span since the previous stage in tradingbot_stage_seconds{stage=...}.
+    Alert-to-fill and submit-to-ack are kept as separate histograms.
+    """
+
+    STAGES = ("received", "contract_resolved", "order_id_assigned", "parent_placed",
+              "children_transmitted", "parent_filled", "child_filled")
+
+    def __init__(self, registry=None):
+        self.registry = registry or MetricsRegistry()
+        self.requests = self.registry.counter(
+            "tradingbot_webhook_requests_total", "Webhook requests by HTTP status", ("status",))
+        self.stage_seconds = self.registry.histogram(
+            "tradingbot_stage_seconds", "Time spent reaching each order-path stage from the previous one", ("stage",))
+        self.alert_to_fill = self.registry.histogram(
+            "tradingbot_alert_to_fill_seconds", "Webhook receipt to fill, per bracket leg", ("leg",))
+        self.submit_to_ack = self.registry.histogram(
+            "tradingbot_submit_to_ack_seconds", "Parent placeOrder until the broker acknowledged it")
+        self.brackets = self.registry.counter(
+            "tradingbot_brackets_total", "Finished brackets by final status", ("status",))
+        self.duplicates = self.registry.counter(
+            "tradingbot_webhook_duplicates_total", "Duplicate alerts answered from the idempotency cache")
+        self.quote_violations = self.registry.counter(
+            "tradingbot_quote_violations_total", "Alerts whose limit price failed the live quote check", ("reason",))
+        # IB-Pacing (app.core.pacing): wartende Messages und Wartezeit je Verbindung und Lane
+        self.ib_queue_depth = self.registry.gauge(
+            "tradingbot_ib_queue_depth", "Outbound IB messages waiting for a pacing token", ("role", "lane"))
+        self.ib_queue_wait = self.registry.histogram(
+            "tradingbot_ib_queue_wait_seconds", "Time an outbound IB message waited for the pacer", ("role", "lane"))
+
+    def start(self, received_at=None):
+        """Open a trace for a new alert and make it the current trace."""
+        trace = AlertTrace(self, received_at)
+        current_trace.set(trace)
+        return trace
+
+    def render(self):
+        return self.registry.render()
+
+
+class AlertTrace:
+    """Stage timestamps (perf_counter) of one alert, tagged with a trace ID."""
+
+    ACK_PENDING = ("", "PendingSubmit", "ApiPending")
+
+    def __init__(self, metrics, received_at=None):
+        self.metrics = metrics
+        self.id = uuid.uuid4().hex[:16]
+        self.received_at = received_at if received_at is not None else time.perf_counter()
+        self.marks = {}
+        self._last = self.received_at
+        self._finished = False
+
+    def mark(self, stage):
+        """Record that the alert reached a stage. Repeated marks of a stage are ignored."""
+        if stage in self.marks:
+            return
+        now = time.perf_counter()
+        self.marks[stage] = now
+        self.metrics.stage_seconds.observe(now - self._last, stage=stage)
+        self._last = now
+        if stage in ("parent_filled", "child_filled"):
+            self.metrics.alert_to_fill.observe(now - self.received_at, leg=stage.split("_")[0])
+
+    def watch_ack(self, trade):
+        """Measure submit-to-ack on the first broker status beyond PendingSubmit."""
+        submitted = time.perf_counter()
+
+        def on_status(trade):
+            if trade.orderStatus.status not in self.ACK_PENDING:
+                trade.statusEvent -= on_status
+                self.marks["ack"] = time.perf_counter()
+                self.metrics.submit_to_ack.observe(self.marks["ack"] - submitted)
+
+        if trade.orderStatus.status in self.ACK_PENDING:
+            trade.statusEvent += on_status
+
+    def finish(self, status):
+        if not self._finished:
+            self._finished = True
+            self.metrics.brackets.inc(status=status)
+
+    def timings(self):
+        """Milliseconds since webhook receipt per reached stage."""
+        return {stage: round((t - self.received_at) * 1000, 3) for stage, t in self.marks.items()}
+
+
+class WebhookTimingMiddleware:
+    """
+    ASGI middleware stamping the arrival time of webhook requests into
+    request.state.received_at (before the body is read and validated) and
+    counting responses by status code.
+    """
+
+    def __init__(self, app, metrics, paths=("/webhook",)):
+        self.app = app
+        self.metrics = metrics
+        self.paths = paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            return await self.app(scope, receive, send)
+        scope.setdefault("state", {})["received_at"] = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                self.metrics.requests.inc(status=message["status"])
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,217 @@
+import itertools
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import replace
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .backtester import Bars, net_profit, simulate, summarize
+
+# Durchsuchbare OrderSettings-Felder -> Abschnitt und Schlüssel in config.yaml
+SWEEP_FIELDS = {
+    "stop_loss": ("overrides", "stop_loss"),
+    "take_profit": ("overrides", "take_profit"),
+    "trail_amount": ("overrides", "trail_amount"),
+    "tp_quantity": ("overrides", "tp_quantity"),
+    "ts_quantity": ("overrides", "ts_quantity"),
+    "fill_timeout": ("timeouts", "fill_or_cancel"),
+    "bracket_timeout": ("timeouts", "bracket_fill"),
+}
+
+# Rangfolge-Metriken aus summarize(): True = größer ist besser
+RANK_METRICS = {"netProfit": True, "maxDrawdown": False, "winRate": True, "profitFactor": True, "trades": True}
+
+_INT_FIELDS = {"tp_quantity", "ts_quantity"}
+
+
+def parameter_grid(space):
+    """All combinations of a {field: [values]} space as a list of dicts."""
+    names = _check_space(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def parameter_samples(space, count, seed=None):
+    """
+    `count` distinct random combinations of the space, drawn without
+    building the full grid (indices into the product are decoded digit by digit).
+    """
+    names = _check_space(space)
+    sizes = [len(space[name]) for name in names]
+    total = int(np.prod(sizes, dtype=object))
+    if count >= total:
+        return parameter_grid(space)
+    rng = np.random.default_rng(seed)
+    combinations = []
+    for index in rng.choice(total, size=count, replace=False).tolist():
+        combination = {}
+        for name, size in zip(reversed(names), reversed(sizes)):
+            index, digit = divmod(index, size)
+            combination[name] = space[name][digit]
+        combinations.append({name: combination[name] for name in names})
+    return combinations
+
+
+def _check_space(space):
+    unknown = set(space) - set(SWEEP_FIELDS)
+    if unknown:
+        raise ValueError(f"Cannot sweep {sorted(unknown)}, supported: {sorted(SWEEP_FIELDS)}")
+    for name, values in space.items():
+        if not len(values):
+            raise ValueError(f"No values for {name}")
+        if min(values) <= 0:
+            raise ValueError(f"{name}: values must be positive, got {min(values)}")
+    return list(space)
+
+
+class SharedBars:
+    """
+    The bar arrays of a Bars instance in one shared memory block (5 x n
+    float64), so pool workers map them instead of unpickling a copy each.
+    Use as context manager in the parent; workers call attach(handle).
+    """
+
+    COLUMNS = ("time", "open", "high", "low", "close")
+
+    def __init__(self, bars):
+        self._shm = shared_memory.SharedMemory(create=True, size=max(1, 5 * len(bars) * 8))
+        block = np.ndarray((5, len(bars)), dtype=np.float64, buffer=self._shm.buf)
+        for row, name in enumerate(self.COLUMNS):
+            block[row] = getattr(bars, name)
+        self.handle = (self._shm.name, len(bars))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    @staticmethod
+    def attach(handle):
+        """Map the block in a worker. Returns (shm, Bars); keep shm alive as long as the Bars are used."""
+        name, length = handle
+        # Worker teilen den Resource Tracker des Parents, der auch das Unlink macht
+        shm = shared_memory.SharedMemory(name=name, track=False) if sys.version_info >= (3, 13) \
+            else shared_memory.SharedMemory(name=name)
+        block = np.ndarray((5, length), dtype=np.float64, buffer=shm.buf)
+        return shm, Bars(*block)
+
+
+# Zustand der Pool-Worker, einmal pro Prozess über den Initializer gesetzt
+_worker = {}
+
+
+def _init_worker(handle, alerts, spec, settings):
+    shm, bars = SharedBars.attach(handle)
+    _worker.update(shm=shm, bars=bars, alerts=alerts, spec=spec, settings=settings)
+
+
+def _evaluate(combinations):
+    return [evaluate(_worker["bars"], _worker["alerts"], _worker["spec"], _worker["settings"], params)
+            for params in combinations]
+
+
+def evaluate(bars, alerts, spec, settings, params):
+    """Backtest one parameter combination. Returns (params, summary)."""
+    params = {name: int(value) if name in _INT_FIELDS else float(value) for name, value in params.items()}
+    sim = simulate(bars, alerts, replace(settings, **params))
+    profit = net_profit(sim, spec.point_value, spec.commission, spec.min_commission)
+    return params, summarize(sim, profit)
+
+
+class ParameterSweep:
+    """
+    Backtests many order_settings combinations in parallel.
+
+    The alerts are prepared once (AlertArrays), the bars are placed in
+    shared memory, and the combinations are sent in batches to a process
+    pool. Each worker simulates with replace(settings, **combination), so
+    every field that is not swept keeps its value from `settings`.
+    """
+
+    def __init__(self, bars, alerts, spec, settings, workers=None, batch_size=None):
+        self.bars = bars
+        self.alerts = alerts
+        self.spec = spec
+        self.settings = settings
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+
+    def run(self, combinations, progress=None):
+        """Evaluate all combinations. Returns [(params, summary)]; progress(done, total) after each batch."""
+        total = len(combinations)
+        if self.workers <= 1:
+            results = []
+            for params in combinations:
+                results.append(evaluate(self.bars, self.alerts, self.spec, self.settings, params))
+                if progress:
+                    progress(len(results), total)
+            return results
+
+        # ~8 Batches pro Worker: wenig Overhead, aber gleichmäßige Auslastung
+        batch_size = self.batch_size or max(1, -(-total // (self.workers * 8)))
+        batches = [combinations[i:i + batch_size] for i in range(0, total, batch_size)]
+        results = []
+        with SharedBars(self.bars) as shared, ProcessPoolExecutor(
+                self.workers, initializer=_init_worker,
+                initargs=(shared.handle, self.alerts, self.spec, self.settings)) as pool:
+            for future in as_completed([pool.submit(_evaluate, batch) for batch in batches]):
+                results.extend(future.result())
+                if progress:
+                    progress(len(results), total)
+        return results
+
+
+def rank(results, by=("netProfit", "maxDrawdown", "winRate"), min_trades=1):
+    """
+    Sort (params, summary) results best first: by the first metric, ties
+    broken by the following ones. Combinations with fewer than min_trades
+    filled trades are dropped.
+    """
+    unknown = set(by) - set(RANK_METRICS)
+    if unknown:
+        raise ValueError(f"Unknown rank metric(s) {sorted(unknown)}, supported: {sorted(RANK_METRICS)}")
+
+    def key(result):
+        summary = result[1]
+        values = []
+        for metric in by:
+            value = summary[metric]
+            if value is None:  # profitFactor ohne Verlusttrade
+                value = float("inf")
+            values.append(-value if RANK_METRICS[metric] else value)
+        return values
+
+    return sorted((r for r in results if r[1]["trades"] >= min_trades), key=key)
+
+
+def config_fragment(params, settings):
+    """
+    The order_settings section of config.yaml for one result: the swept
+    values plus the overrides and timeouts of `settings` that were not swept.
+    """
+    values = {
+        "quantity": settings.quantity, "stop_loss": settings.stop_loss, "take_profit": settings.take_profit,
+        "trail_amount": settings.trail_amount, "tp_quantity": settings.tp_quantity,
+        "ts_quantity": settings.ts_quantity, "fill_timeout": settings.fill_timeout,
+        "bracket_timeout": settings.bracket_timeout,
+    }
+    values.update(params)
+    section = {
+        "overrides": {},
+        "timeouts": {},
+        "use_take_profit": settings.use_take_profit,
+        "use_trail_stop": settings.use_trailing_stop,
+    }
+    for name, value in values.items():
+        group, key = SWEEP_FIELDS.get(name, ("overrides", name))
+        if value is not None:
+            section[group][key] = int(value) if float(value).is_integer() else float(value)
+    return {"order_settings": section}
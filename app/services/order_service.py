@@ -2,39 +2,31 @@ from fastapi import HTTPException
 from ib_insync import *
 from ..utils.helpers import wait_for_order_id, wait_for_fill_or_cancel, wait_for_bracket_fill
 from ..core import config
+from ..core.log import get_logger
+
+log = get_logger("orders")
 
 class OrderService:
     def __init__(self, ib_connection):
         self.ib = ib_connection.ib
+        self.order_tracker = ib_connection.order_tracker
+        self.contract_resolver = ib_connection.contract_resolver
         
     @app.post("/webhook")
     async def place_bracket_order(order: BracketOrderModel):
-        # Load settings from YAML
-        settings = config.get('order_settings', {})
-        overrides = settings.get('overrides', {})
-        timeouts = settings.get('timeouts', {})
-        
-        # Apply overrides if they exist
-        quantity = overrides.get('quantity', order.quantity) if overrides.get('quantity') is not None else order.quantity
-        trail_amt = overrides.get('trail_amount', order.trailAmt) if overrides.get('trail_amount') is not None else order.trailAmt
-        stop_loss = overrides.get('stop_loss', order.stopLoss) if overrides.get('stop_loss') is not None else order.stopLoss 
-        take_profit = overrides.get('take_profit', order.takeProfit) if overrides.get('take_profit') is not None else order.takeProfit
-        tp_quantity = overrides.get('tp_quantity', quantity) if overrides.get('tp_quantity') is not None else quantity
-        ts_quantity = overrides.get('ts_quantity', quantity) if overrides.get('ts_quantity') is not None else quantity
-
-        # Get timeouts from YAML or use defaults
-        fill_timeout = timeouts.get('fill_or_cancel', 10.0)
-        bracket_timeout = timeouts.get('bracket_fill', 3600.0)
+        # Vorkompilierter, unveränderlicher Settings-Snapshot (Overrides bereits validiert)
+        settings = config.settings
+        quantity, trail_amt, stop_loss, take_profit, tp_quantity, ts_quantity = settings.apply(order)
+        fill_timeout = settings.fill_timeout
+        bracket_timeout = settings.bracket_timeout
 
-        print("✅ Received order:", order.model_dump())
-        # 1) Vertrag erstellen und qualifizieren (hier z. B. als US-Aktie)
-        
-        if order.symbol == "NQ1!":
-            contract = Future(symbol="NQ", lastTradeDateOrContractMonth="202503", exchange="CME", currency="USD")
-        else:
-            contract = Future(symbol=order.symbol, lastTradeDateOrContractMonth="202503", exchange="CME", currency="USD")
-        self.ib.qualifyContracts(contract)
-        print("✅ Contract qualified:", contract)
+        log.info("Received order", extra={"order": order.model_dump()})
+        # 1) Vertrag aus dem Cache holen (Front Month, beim Start vorgewärmt)
+        try:
+            contract = await self.contract_resolver.resolve(order.symbol)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"❌ Kein Kontrakt für {order.symbol} gefunden: {e}")
+        log.debug("Contract resolved: %s", contract)
         
         # 2) Berechne die absoluten Zielpreise aus den relativen Werten.
         basePrice = round(order.limitPrice * 4, 0)/4  # Basis für die Umrechnung, muss gerundet werden auf Vielfaches von 0.25
@@ -50,12 +42,10 @@ class OrderService:
         else:
             raise HTTPException(status_code=400, detail="❌ Ungültiger relativeType. Erlaubt sind 'ticks' oder 'percent'.")
         
-        print(f"⚙️ Base price: {basePrice}")
-        print(f"⚙️ Calculated absolute takeProfit: {absTakeProfit}")     
-        print(f"⚙️ Calculated absolute stopLoss (target): {absStopLoss}")
+        log.info("Bracket prices: base %s, takeProfit %s, stopLoss %s", basePrice, absTakeProfit, absStopLoss)
 
         # Runden auf Vielfaches der Tick-Größe:
-        print(f"⚙️ Trailing amount (rounded): {trail_amt}")
+        log.debug("Trailing amount (rounded): %s", trail_amt)
         
         # 3) Parent Order erstellen: Limit Order
         parent = Order(
@@ -66,32 +56,33 @@ class OrderService:
             transmit=False,
             outsideRth=True
         )
-        print("🔄 Creating parent order:", parent)
+        log.debug("Creating parent order: %s", parent)
         
         # 4) Parent Order platzieren und auf gültige OrderID warten
         parent_trade = ib.placeOrder(contract, parent)
-        parent_id = await wait_for_order_id(parent_trade, timeout=5.0)
+        parent_id = await wait_for_order_id(self.order_tracker, parent_trade, timeout=5.0)
         if parent_id == 0:
             raise HTTPException(status_code=500, detail="❌ Parent Order hat keine gültige OrderID erhalten.")
-        print("✅ Parent order placed. OrderID:", parent_id)
+        log.info("Parent order placed. OrderID: %s", parent_id)
         
         tp_trade = None
-        if settings.get("use_take_profit", True):
+        ts_trade = None
+        if settings.use_take_profit:
             # 5) Child Order für Take Profit erstellen (Limit Order)
             takeprofit = Order(
                 action="SELL" if order.action.upper() == "BUY" else "BUY",
                 totalQuantity=tp_quantity,
                 orderType="LMT",
                 lmtPrice=absTakeProfit,
-                transmit= not settings.get("use_trailing_stop", True),  # Nicht sofort senden
+                transmit= not settings.use_trailing_stop,  # Nicht sofort senden
                 outsideRth=True,
                 parentId=parent_id
             )
             tp_trade = ib.placeOrder(contract, takeprofit)
-            print("✅ Created and placed take profit order:", takeprofit)
+            log.debug("Created and placed take profit order: %s", takeprofit)
         
         # 6) Child Order für Trailing Stop erstellen (Trailing Stop Order)
-        if settings.get("use_trailing_stop", True):
+        if settings.use_trailing_stop:
             trailing_stop = Order(
                 action="SELL" if order.action.upper() == "BUY" else "BUY",
                 totalQuantity=ts_quantity,
@@ -104,9 +95,9 @@ class OrderService:
                 parentId=parent_id
             )
             ts_trade = ib.placeOrder(contract, trailing_stop)
-            print("✅ Created trailing stop order:", trailing_stop)
+            log.debug("Created trailing stop order: %s", trailing_stop)
         
-        parent_filled, parent_fill_price = await wait_for_fill_or_cancel(parent_trade, timeout=fill_timeout)
+        parent_filled, parent_fill_price = await wait_for_fill_or_cancel(self.order_tracker, parent_trade, timeout=fill_timeout)
         
         if not parent_filled:
             raise HTTPException(
@@ -114,15 +105,15 @@ class OrderService:
                 detail=f"❌ Parent Order wurde nicht innerhalb von {fill_timeout} Sekunden ausgeführt."
             )
         
-        print(f"✅ Parent order filled at price: {parent_fill_price}")
+        log.info("Parent order filled at price: %s", parent_fill_price)
 
         # 8) Warten, bis der Parent gefüllt wird und einer der Child Orders ebenfalls gefüllt wird
-        parentFilled, childType, parentFill, childFill = await wait_for_bracket_fill(parent_trade, tp_trade if tp_trade else None, ts_trade if ts_trade else None, timeout=bracket_timeout)
+        parentFilled, childType, parentFill, childFill = await wait_for_bracket_fill(self.order_tracker, parent_trade, tp_trade, ts_trade, timeout=bracket_timeout)
         
         if not parentFilled or childType is None:
             raise HTTPException(status_code=500, detail="❌ Order wurde nicht innerhalb des Zeitlimits vollständig gefüllt.")
         
-        print(f"✅ Bracket order filled. ParentFill: {parentFill}, Child '{childType}' Fill: {childFill}")
+        log.info("Bracket order filled. ParentFill: %s, Child '%s' Fill: %s", parentFill, childType, childFill)
         
         # 9) Gewinn/Verlust berechnen
         if parentFill is not None and childFill is not None:
@@ -0,0 +1,95 @@
+import asyncio
+from ib_insync import OrderStatus
+
+
+class OrderTracker:
+    """
+    Resolves asyncio futures from ib_insync order events instead of polling
+    trade.orderStatus in a sleep loop.
+
+    Waiters are keyed by orderId, so a status update is matched even when it
+    arrives on a different Trade object (e.g. after a reconnect).
+    """
+
+    def __init__(self, ib):
+        self.ib = ib
+        self._waiters = {}   # orderId -> [(predicate, future)]
+        self._tracked = {}   # orderId -> Trade with subscribed events
+        self.ib.orderStatusEvent += self._on_trade_event
+
+    def track(self, trade):
+        """Subscribe to the status and fill events of a trade."""
+        order_id = trade.order.orderId
+        if order_id in self._tracked:
+            return
+        trade.statusEvent += self._on_trade_event
+        trade.fillEvent += self._on_trade_event
+        self._tracked[order_id] = trade
+
+    def untrack(self, trade):
+        """Drop the event subscriptions of a trade."""
+        tracked = self._tracked.pop(trade.order.orderId, None)
+        if tracked is not None:
+            tracked.statusEvent -= self._on_trade_event
+            tracked.fillEvent -= self._on_trade_event
+
+    def _on_trade_event(self, trade, *args):
+        for predicate, future in self._waiters.get(trade.order.orderId, ()):
+            if not future.done() and predicate(trade):
+                future.set_result(trade)
+        if trade.order.orderId not in self._waiters and trade.orderStatus.status in OrderStatus.DoneStates:
+            self.untrack(trade)
+
+    async def wait_for_any(self, trades, predicate, timeout):
+        """
+        Wait until predicate(trade) holds for one of the given trades.
+        Returns that trade, or None if the timeout expires first.
+        """
+        trades = [t for t in trades if t is not None]
+        for trade in trades:
+            if predicate(trade):
+                return trade
+
+        future = asyncio.get_running_loop().create_future()
+        keys = [trade.order.orderId for trade in trades]
+        for trade, key in zip(trades, keys):
+            self.track(trade)
+            self._waiters.setdefault(key, []).append((predicate, future))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            for key in keys:
+                waiters = self._waiters.get(key, [])
+                waiters[:] = [w for w in waiters if w[1] is not future]
+                if not waiters:
+                    self._waiters.pop(key, None)
+            for trade in trades:
+                if trade.order.orderId not in self._waiters and trade.orderStatus.status in OrderStatus.DoneStates:
+                    self.untrack(trade)
+
+    async def wait_for_order_id(self, trade, timeout):
+        """Wait until the trade carries a valid orderId. Returns 0 on timeout."""
+        if trade.order.orderId == 0:
+            try:
+                await asyncio.wait_for(trade.statusEvent, timeout)
+            except asyncio.TimeoutError:
+                pass
+        return trade.order.orderId
+
+    async def wait_for(self, trade, predicate, timeout):
+        """Wait until predicate(trade) holds. Returns True on success."""
+        return await self.wait_for_any([trade], predicate, timeout) is not None
+
+    async def wait_for_fill(self, trade, timeout):
+        """Wait until the trade reports status 'Filled'."""
+        return await self.wait_for(trade, is_filled, timeout)
+
+    async def wait_for_any_fill(self, trades, timeout):
+        """Wait until one of the trades is filled. Returns that trade or None."""
+        return await self.wait_for_any(trades, is_filled, timeout)
+
+
+def is_filled(trade):
+    return trade.orderStatus.status == "Filled"
@@ -0,0 +1,261 @@
+import asyncio
+import math
+
+from .bracket_supervisor import parse_order_ref
+from ..core.log import get_logger
+
+log = get_logger("pnl")
+
+LEGS = ("P", "TP", "TS")
+
+
+class LegFills:
+    """Executions of one bracket leg, aggregated as they arrive (deduplicated by execId)."""
+
+    __slots__ = ("quantity", "notional", "commission", "fills", "pending", "last_time", "estimated")
+
+    def __init__(self):
+        self.quantity = 0.0
+        self.notional = 0.0
+        self.commission = 0.0
+        self.fills = {}        # execId -> Fill
+        self.pending = set()   # execIds ohne Commission Report
+        self.last_time = None
+        self.estimated = False
+
+    @property
+    def avg_price(self):
+        return self.notional / self.quantity if self.quantity else None
+
+    def add(self, fill):
+        """Add an execution; False if it was seen before."""
+        execution = fill.execution
+        if execution.execId in self.fills:
+            return False
+        if self.estimated:
+            # Echte Executions ersetzen die Schätzung aus dem orderStatus
+            self.quantity = self.notional = 0.0
+            self.estimated = False
+        self.fills[execution.execId] = fill
+        self.quantity += execution.shares
+        self.notional += execution.shares * execution.price
+        if fill.time and (self.last_time is None or fill.time > self.last_time):
+            self.last_time = fill.time
+        self.pending.add(execution.execId)
+        self.report(fill.commissionReport)
+        return True
+
+    def report(self, report):
+        """Book a commission report; False if it is unknown or already booked."""
+        if report is None or report.execId not in self.pending:
+            return False
+        self.pending.discard(report.execId)
+        self.commission += report.commission
+        return True
+
+    def collect(self):
+        # Reports zu Executions aus reqExecutions kommen ohne Event, ib_insync trägt sie im Fill nach
+        for exec_id in list(self.pending):
+            self.report(self.fills[exec_id].commissionReport)
+
+
+class BracketLedger:
+    """
+    Fills and fees of one bracket. Realized P&L is booked per exit leg
+    against the average entry price, so take profit and trailing stop with
+    different quantities (tp_quantity / ts_quantity) and partial fills are
+    priced exactly. Fees are the commission reports; executions whose report
+    is still missing are estimated with the InstrumentSpec's commission.
+    """
+
+    def __init__(self, bracket_id, action, spec):
+        self.bracket_id = bracket_id
+        self.side = 1 if action.upper() == "BUY" else -1
+        self.spec = spec
+        self.legs = {leg: LegFills() for leg in LEGS}
+        self._changed = asyncio.Event()
+
+    @property
+    def entry(self):
+        return self.legs["P"]
+
+    @property
+    def exit_quantity(self):
+        return self.legs["TP"].quantity + self.legs["TS"].quantity
+
+    @property
+    def open_quantity(self):
+        return self.entry.quantity - self.exit_quantity
+
+    @property
+    def gross(self):
+        """Realized P&L before fees in account currency."""
+        entry = self.entry.avg_price
+        if entry is None:
+            return 0.0
+        return sum(self.side * round(leg.avg_price - entry, 8) * leg.quantity * self.spec.point_value
+                   for leg in (self.legs["TP"], self.legs["TS"]) if leg.quantity)
+
+    @property
+    def fees(self):
+        total = 0.0
+        for leg in self.legs.values():
+            leg.collect()
+            total += leg.commission
+            if leg.estimated:
+                total += self.spec.commission_for(leg.quantity)
+            total += sum(self.spec.commission_for(leg.fills[e].execution.shares) for e in leg.pending)
+        return total
+
+    @property
+    def net(self):
+        return round(self.gross - self.fees, 2)
+
+    @property
+    def settled(self):
+        """True when every execution has its commission report."""
+        for leg in self.legs.values():
+            leg.collect()
+        return not any(leg.pending for leg in self.legs.values())
+
+    def add(self, leg, fill):
+        if self.legs[leg].add(fill):
+            self._changed.set()
+            return True
+        return False
+
+    def report(self, leg, report):
+        if self.legs[leg].report(report):
+            self._changed.set()
+            return True
+        return False
+
+    def apply_status(self, leg, trade):
+        """
+        Fall back to a leg's orderStatus when no execution details arrived for
+        it (e.g. a parent filled before the bot restarted, or a broker stand-in
+        without execDetails). Fees of such a leg are estimated.
+        """
+        fills = self.legs[leg]
+        if fills.fills or trade is None:
+            return
+        status = trade.orderStatus
+        if status.filled and status.avgFillPrice and not math.isnan(status.avgFillPrice):
+            fills.quantity = status.filled
+            fills.notional = status.filled * status.avgFillPrice
+            fills.estimated = True
+
+    async def wait_settled(self, timeout):
+        """Wait up to timeout seconds for the outstanding commission reports. Returns settled."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while not self.settled:
+            self._changed.clear()
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            try:
+                await asyncio.wait_for(self._changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                return self.settled
+        return True
+
+    def summary(self):
+        """Per-leg quantities, prices and fees for the trade log."""
+        fees = self.fees
+        legs = {}
+        for leg, fills in self.legs.items():
+            if fills.quantity:
+                legs[leg] = {"quantity": fills.quantity, "avgPrice": round(fills.avg_price, 8),
+                             "commission": round(fills.commission, 2), "executions": len(fills.fills),
+                             "estimated": fills.estimated or bool(fills.pending)}
+        gross = self.gross
+        return {"bracketId": self.bracket_id, "legs": legs, "gross": round(gross, 2), "fees": round(fees, 2),
+                "net": round(gross - fees, 2), "openQuantity": self.open_quantity}
+
+
+class PnLEngine:
+    """
+    Realized P&L per bracket from the execution stream.
+
+    execDetailsEvent and commissionReportEvent of the orders connection are
+    routed to the BracketLedger of their bracket: by the bracket ID in the
+    execution's orderRef (see bracket_supervisor.order_ref), or by orderId
+    for legs placed without one. Partial fills update the ledger as they
+    arrive; nothing is polled. on_update(summary) is called after every
+    booked execution and commission report.
+    """
+
+    def __init__(self, ib, on_update=None, commission_wait=2.0):
+        self.ib = ib
+        self.on_update = on_update
+        self.commission_wait = commission_wait
+        self._ledgers = {}    # bracket_id -> BracketLedger
+        self._orders = {}     # orderId -> (bracket_id, leg)
+        self._execs = {}      # execId -> (bracket_id, leg)
+        ib.execDetailsEvent += self._on_execution
+        ib.commissionReportEvent += self._on_commission
+
+    def open(self, bracket_id, action, spec, trades=None):
+        """Start a ledger for a bracket; trades maps leg -> Trade of the placed legs."""
+        ledger = self._ledgers.get(bracket_id)
+        if ledger is None:
+            ledger = self._ledgers[bracket_id] = BracketLedger(bracket_id, action, spec)
+        for leg, trade in (trades or {}).items():
+            if trade is not None and trade.order.orderId:
+                self._orders[trade.order.orderId] = (bracket_id, leg)
+            # Executions vor dem Öffnen (z.B. nach einem Neustart) aus dem Trade übernehmen
+            for fill in trade.fills if trade is not None else ():
+                self._add(bracket_id, leg, fill)
+        return ledger
+
+    def get(self, bracket_id):
+        return self._ledgers.get(bracket_id)
+
+    def add_fills(self, bracket_id, leg, fills):
+        """Feed executions from reqExecutions into an open ledger."""
+        # reqExecutions liefert Kopien bereits bekannter Fills; die Commission Reports landen im Original
+        known = {f.execution.execId: f for f in self.ib.fills()}
+        for fill in fills:
+            self._add(bracket_id, leg, known.get(fill.execution.execId, fill))
+
+    def close(self, bracket_id):
+        """Forget a bracket's ledger and routing entries."""
+        ledger = self._ledgers.pop(bracket_id, None)
+        self._orders = {k: v for k, v in self._orders.items() if v[0] != bracket_id}
+        self._execs = {k: v for k, v in self._execs.items() if v[0] != bracket_id}
+        return ledger
+
+    def _route(self, trade, fill):
+        ref = parse_order_ref(fill.execution.orderRef)
+        if ref and ref.bracket_id in self._ledgers and ref.leg in LEGS:
+            return ref.bracket_id, ref.leg
+        return self._orders.get(fill.execution.orderId) or self._orders.get(trade.order.orderId if trade else 0)
+
+    def _add(self, bracket_id, leg, fill):
+        ledger = self._ledgers.get(bracket_id)
+        if ledger is not None and ledger.add(leg, fill):
+            self._execs[fill.execution.execId] = (bracket_id, leg)
+            log.debug("Execution %s %s %s@%s", bracket_id, leg, fill.execution.shares, fill.execution.price,
+                      extra={"bracketId": bracket_id, "leg": leg, "execId": fill.execution.execId})
+            self._publish(ledger)
+
+    def _on_execution(self, trade, fill):
+        route = self._route(trade, fill)
+        if route:
+            self._add(*route, fill)
+
+    def _on_commission(self, trade, fill, report):
+        bracket_id, leg = self._execs.get(report.execId) or self._route(trade, fill) or (None, None)
+        ledger = self._ledgers.get(bracket_id)
+        if ledger is None:
+            return
+        if report.execId not in ledger.legs[leg].fills:
+            # Report vor der Execution geroutet (sollte nicht vorkommen) -> Execution zuerst buchen
+            self._add(bracket_id, leg, fill)
+        if ledger.report(leg, report):
+            self._publish(ledger)
+
+    def _publish(self, ledger):
+        if self.on_update:
+            self.on_update(ledger.summary())
@@ -0,0 +1,221 @@
+import asyncio
+import time
+
+from ib_insync import Order, OrderStatus, Trade
+
+from ..api.models import BracketOrderModel
+from .bracket_supervisor import parse_order_ref
+from .instrument_registry import InstrumentSpec
+from ..core.log import get_logger
+
+log = get_logger("reconcile")
+
+CHILD_TYPES = {"TP": "takeProfit", "TS": "trailingStop"}
+
+
+class _Group:
+    """Legs of one bracket as found at IB: open trades and executions per leg."""
+
+    def __init__(self, key):
+        self.key = key
+        self.ref = None
+        self.trades = {}   # leg -> Trade (noch offen)
+        self.fills = {"P": [], "TP": [], "TS": []}
+
+    @property
+    def contract(self):
+        for trade in self.trades.values():
+            return trade.contract
+        for fills in self.fills.values():
+            for fill in fills:
+                return fill.contract
+        return None
+
+    def filled(self, leg):
+        """(quantity, average price, time of the last execution) of a leg, or None."""
+        fills = self.fills[leg]
+        if not fills:
+            return None
+        quantity = sum(f.execution.shares for f in fills)
+        price = sum(f.execution.shares * f.execution.price for f in fills) / quantity
+        return quantity, price, max(f.execution.time for f in fills)
+
+
+class BracketReconciler:
+    """
+    Picks up the bot's brackets at IB after a restart.
+
+    Open orders, executions and positions are requested concurrently.
+    Orders are grouped by parentId, and by the bracket ID in their orderRef
+    (see bracket_supervisor.order_ref), which executions carry as well. Then:
+
+      - brackets with open legs are handed back to the BracketSupervisor
+        with the rest of their timeouts,
+      - brackets whose parent and a child filled while the bot was down are
+        written to the trade log (unless the journal already has them),
+      - filled parents without an open or filled child are reported, as are
+        positions that do not match the open brackets.
+
+    Executions only reach back as far as IB reports them (the current day by
+    default); brackets placed before orderRefs were set are only found while
+    they have open orders.
+    """
+
+    def __init__(self, ib, supervisor, journal, instruments=None):
+        self.ib = ib
+        self.supervisor = supervisor
+        self.journal = journal
+        self.instruments = instruments
+
+    async def run(self, settings, timeout=15.0):
+        """Reconcile once. Returns a summary dict."""
+        started = time.perf_counter()
+        open_trades, fills, positions = await asyncio.wait_for(asyncio.gather(
+            self.ib.reqAllOpenOrdersAsync(), self.ib.reqExecutionsAsync(), self.ib.reqPositionsAsync()), timeout)
+
+        client_id = self.ib.client.clientId
+        groups = self._group([t for t in open_trades if t.order.clientId == client_id],
+                             [f for f in fills if f.execution.clientId == client_id])
+        known = await self.journal.known_brackets(list(groups))
+        now = time.time()
+        summary = {"openOrders": len(open_trades), "executions": len(fills), "positions": len(positions),
+                   "resumed": [], "backfilled": [], "orphaned": []}
+        exposure = {}   # conId -> erwartete Position aus offenen Brackets
+
+        for key, group in groups.items():
+            if key in self.supervisor.brackets or key in known:
+                continue
+            parent = group.filled("P")
+            children = {leg: group.filled(leg) for leg in CHILD_TYPES}
+            child_leg = min((leg for leg, fill in children.items() if fill), key=lambda leg: children[leg][2],
+                            default=None)
+            active = {leg: t for leg, t in group.trades.items() if not t.isDone()}
+            try:
+                order, spec = await self._order_and_spec(group, parent)
+            except Exception as e:
+                log.error("Bracket %s: could not rebuild order: %s", key, e)
+                continue
+            side = 1 if order.action == "BUY" else -1
+
+            if parent and child_leg and not active:
+                # Während der Downtime abgeschlossen -> aus den Executions nachtragen
+                child_time = max(children[leg][2] for leg in children if children[leg])
+                await self.supervisor.record_closed(
+                    key, order, group.fills, CHILD_TYPES[child_leg], spec,
+                    timestamp=child_time.astimezone().replace(tzinfo=None).isoformat())
+                summary["backfilled"].append(key)
+            elif active:
+                age = now - group.ref.created if group.ref else 0.0
+                parent_trade = active.get("P") or group.trades.get("P") or \
+                    self._filled_parent(group, order, parent, positions)
+                self.supervisor.resume(key, order, parent_trade, active.get("TP"), active.get("TS"),
+                                       settings.fill_timeout - age, settings.bracket_timeout - age, spec)
+                # Executions von vor dem Neustart gehören ins Ledger des Brackets
+                for leg, leg_fills in group.fills.items():
+                    self.supervisor.pnl.add_fills(key, leg, leg_fills)
+                summary["resumed"].append(key)
+                if parent:
+                    exposure[group.contract.conId] = exposure.get(group.contract.conId, 0) + side * parent[0]
+            elif parent:
+                log.warning("Bracket %s: parent filled (%s @ %s) but no child order is open or filled",
+                            key, parent[0], parent[1], extra={"bracketId": key})
+                summary["orphaned"].append(key)
+                exposure[group.contract.conId] = exposure.get(group.contract.conId, 0) + side * parent[0]
+
+        summary["mismatches"] = self._check_positions(positions, exposure)
+        summary["seconds"] = round(time.perf_counter() - started, 3)
+        log.info("Reconciled %d resumed, %d backfilled, %d orphaned brackets in %.2fs",
+                 len(summary["resumed"]), len(summary["backfilled"]), len(summary["orphaned"]), summary["seconds"],
+                 extra={"reconciliation": summary})
+        return summary
+
+    @staticmethod
+    def _group(trades, fills):
+        groups, by_order_id = {}, {}
+        # Offene Orders: Kinder über parentId, der Bracket-Schlüssel kommt aus dem orderRef, falls vorhanden
+        for trade in sorted(trades, key=lambda t: t.order.parentId != 0):
+            order = trade.order
+            ref = parse_order_ref(order.orderRef)
+            parent_id = order.parentId or order.orderId
+            key = ref.bracket_id if ref else by_order_id.get(parent_id, str(parent_id))
+            group = groups.setdefault(key, _Group(key))
+            group.ref = group.ref or ref
+            leg = ref.leg if ref else "P" if not order.parentId else "TP" if order.orderType == "LMT" else "TS"
+            group.trades[leg] = trade
+            by_order_id[order.orderId] = key
+        for fill in fills:
+            ref = parse_order_ref(fill.execution.orderRef)
+            key = ref.bracket_id if ref else by_order_id.get(fill.execution.orderId)
+            if key is None:
+                continue   # keine Bracket-Order des Bots
+            group = groups.setdefault(key, _Group(key))
+            group.ref = group.ref or ref
+            leg = ref.leg if ref else next(l for l, t in group.trades.items()
+                                           if t.order.orderId == fill.execution.orderId)
+            group.fills[leg].append(fill)
+        # Einzelne Orders ohne Kinder und ohne orderRef sind keine Brackets (z.B. manuell in TWS)
+        return {k: g for k, g in groups.items() if g.ref or set(g.trades) - {"P"}}
+
+    async def _order_and_spec(self, group, parent):
+        trades = group.trades
+        contract = group.contract
+        if "P" in trades:
+            action = trades["P"].order.action
+        elif group.fills["P"]:
+            action = "BUY" if group.fills["P"][0].execution.side == "BOT" else "SELL"
+        else:
+            child = next(iter(trades.values()))
+            action = "SELL" if child.order.action == "BUY" else "BUY"
+        quantity = parent[0] if parent else max(t.order.totalQuantity for t in trades.values())
+        symbol = group.ref.symbol if group.ref else contract.symbol
+        order = BracketOrderModel(
+            symbol=symbol, action=action, quantity=int(quantity),
+            limitPrice=trades["P"].order.lmtPrice if "P" in trades else (parent[1] if parent else 0.0),
+            takeProfit=0, trailAmt=0, timeframe=group.ref.timeframe if group.ref else "None")
+
+        spec = self.instruments.get(contract) if self.instruments else None
+        if spec is None and self.instruments is not None:
+            try:
+                spec = await self.instruments.load(symbol)
+            except Exception as e:
+                log.warning("No instrument spec for %s, using contract multiplier: %s", symbol, e)
+        if spec is None:
+            schedule = self.instruments.commission_schedule(contract.symbol, contract.secType) \
+                if self.instruments else {}
+            spec = InstrumentSpec(contract.symbol, contract.secType or "FUT",
+                                  multiplier=float(contract.multiplier or 1), **schedule)
+        return order, spec
+
+    @staticmethod
+    def _filled_parent(group, order, parent, positions):
+        """
+        Stand-in Trade of a parent that filled before the restart (it is no
+        longer an open order). Without its executions (older than IB reports)
+        the fill price comes from the position's average cost.
+        """
+        contract = group.contract
+        if parent:
+            quantity, price = parent[0], parent[1]
+        else:
+            position = next((p for p in positions if p.contract.conId == contract.conId), None)
+            quantity = order.quantity
+            price = position.avgCost / float(contract.multiplier or 1) if position else None
+        status = OrderStatus(status=OrderStatus.Filled, filled=quantity, remaining=0, avgFillPrice=price)
+        parent_order = Order(orderId=next(iter(group.trades.values())).order.parentId, action=order.action,
+                             totalQuantity=order.quantity, orderType="LMT", lmtPrice=order.limitPrice)
+        return Trade(contract, parent_order, status, [], [])
+
+    def _check_positions(self, positions, exposure):
+        mismatches = []
+        held = {p.contract.conId: p for p in positions}
+        for con_id in set(held) | set(exposure):
+            position = held[con_id].position if con_id in held else 0
+            expected = exposure.get(con_id, 0)
+            if position != expected:
+                contract = held[con_id].contract if con_id in held else None
+                mismatch = {"conId": con_id, "symbol": contract.localSymbol if contract else None,
+                            "position": position, "brackets": expected}
+                log.warning("Position mismatch for %s: IB %s, open brackets %s", mismatch["symbol"] or con_id,
+                            position, expected, extra=mismatch)
+                mismatches.append(mismatch)
+        return mismatches
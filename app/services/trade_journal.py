@@ -0,0 +1,183 @@
+import asyncio
+import json
+import sqlite3
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from ..core.log import get_logger
+
+log = get_logger("journal")
+
+
+class TradeJournal:
+    """
+    Append-only trade log in SQLite (WAL mode), indexed by timestamp, symbol
+    and timeframe.
+
+    All database access runs on a single writer thread so the event loop never
+    blocks on disk I/O. Only the newest hot_window entries are kept in memory.
+    Every entry gets a monotonically increasing "seq" that can be used as a
+    pagination cursor.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS trades (
+            seq       INTEGER PRIMARY KEY,
+            timestamp TEXT NOT NULL,
+            symbol    TEXT,
+            timeframe TEXT,
+            entry     TEXT NOT NULL,
+            bracket_id TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_trades_timestamp ON trades (timestamp);
+        CREATE INDEX IF NOT EXISTS idx_trades_symbol ON trades (symbol, timestamp);
+        CREATE INDEX IF NOT EXISTS idx_trades_timeframe ON trades (timeframe, timestamp);
+    """
+
+    # Nach dem Anlegen bzw. der Migration älterer Datenbanken
+    BRACKET_INDEX = "CREATE INDEX IF NOT EXISTS idx_trades_bracket ON trades (bracket_id)"
+
+    def __init__(self, path="trade_journal.db", hot_window=500):
+        self.path = path
+        self.hot_window = hot_window
+        self.recent = deque(maxlen=hot_window)
+        self.last_seq = 0
+        self._conn = None
+        self._executor = None
+
+    async def open(self):
+        """Open the database and load the hot window of the newest entries."""
+        # Je open() ein eigener Executor, close() fährt ihn herunter
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="trade-journal")
+        rows = await self._run(self._open)
+        self.recent.clear()
+        self.recent.extend(rows)
+        self.last_seq = rows[-1]["seq"] if rows else 0
+
+    async def close(self):
+        """Flush pending writes and close the database."""
+        await self._run(self._close)
+        self._executor.shutdown(wait=True)
+
+    def append(self, entry):
+        """
+        Assign the next seq, keep the entry in the hot window and schedule the
+        insert on the writer thread. Returns the stored entry.
+        """
+        self.last_seq += 1
+        entry = {"seq": self.last_seq, **entry}
+        self.recent.append(entry)
+        future = asyncio.get_running_loop().run_in_executor(self._executor, self._insert, entry)
+        future.add_done_callback(self._report_write_error)
+        return entry
+
+    async def query(self, start=None, end=None, symbol=None, timeframe=None, after=None, before=None, limit=100):
+        """
+        Return up to limit entries in ascending seq order.
+
+        With an `after` cursor the oldest matching entries newer than it are
+        returned (forward paging); otherwise the newest matching entries,
+        optionally older than `before` (backward paging).
+        """
+        if (start is None and end is None and symbol is None and timeframe is None
+                and before is None and self._in_hot_window(after, limit)):
+            entries = [e for e in self.recent if after is None or e["seq"] > after]
+            return entries[:limit] if after is not None else entries[-limit:]
+        return await self._run(self._select, start, end, symbol, timeframe, after, before, limit)
+
+    async def iterate(self, batch=1000):
+        """Yield all entries in seq order, reading the database in batches."""
+        after = 0
+        while True:
+            entries = await self._run(self._select, None, None, None, None, after, None, batch)
+            for entry in entries:
+                yield entry
+            if len(entries) < batch:
+                return
+            after = entries[-1]["seq"]
+
+    async def known_brackets(self, bracket_ids):
+        """The subset of bracket_ids that already have a journal entry."""
+        bracket_ids = [b for b in bracket_ids if b]
+        if not bracket_ids:
+            return set()
+        return await self._run(self._select_brackets, bracket_ids)
+
+    async def count(self):
+        return await self._run(lambda: self._conn.execute("SELECT COUNT(*) FROM trades").fetchone()[0])
+
+    def _in_hot_window(self, after, limit):
+        if not self.recent:
+            return self.last_seq == 0
+        oldest = self.recent[0]["seq"]
+        if after is not None:
+            return after >= oldest - 1
+        return limit <= len(self.recent) or oldest == 1
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    @staticmethod
+    def _report_write_error(future):
+        if future.exception() is not None:
+            log.error("Error writing trade journal: %s", future.exception())
+
+    # --- Writer thread ---
+
+    def _open(self):
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(trades)")}
+        if "bracket_id" not in columns:
+            self._conn.execute("ALTER TABLE trades ADD COLUMN bracket_id TEXT")
+        self._conn.execute(self.BRACKET_INDEX)
+        rows = self._conn.execute(
+            "SELECT seq, entry FROM trades ORDER BY seq DESC LIMIT ?", (self.hot_window,)
+        ).fetchall()
+        return [self._decode(row) for row in reversed(rows)]
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _insert(self, entry):
+        payload = {k: v for k, v in entry.items() if k != "seq"}
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO trades (seq, timestamp, symbol, timeframe, entry, bracket_id) VALUES (?, ?, ?, ?, ?, ?)",
+                (entry["seq"], entry.get("timestamp"), entry.get("symbol"), entry.get("timeframe"),
+                 json.dumps(payload), entry.get("bracketId")),
+            )
+
+    def _select_brackets(self, bracket_ids):
+        found = set()
+        for begin in range(0, len(bracket_ids), 500):   # SQLite-Limit für Parameter
+            chunk = bracket_ids[begin:begin + 500]
+            rows = self._conn.execute(
+                f"SELECT bracket_id FROM trades WHERE bracket_id IN ({','.join('?' * len(chunk))})", chunk)
+            found.update(row[0] for row in rows)
+        return found
+
+    def _select(self, start, end, symbol, timeframe, after, before, limit):
+        clauses, params = [], []
+        for clause, value in (("timestamp >= ?", start), ("timestamp <= ?", end),
+                              ("symbol = ?", symbol), ("timeframe = ?", timeframe),
+                              ("seq > ?", after), ("seq < ?", before)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        order = "ASC" if after is not None else "DESC"
+        rows = self._conn.execute(
+            f"SELECT seq, entry FROM trades {where} ORDER BY seq {order} LIMIT ?", (*params, limit)
+        ).fetchall()
+        if order == "DESC":
+            rows.reverse()
+        return [self._decode(row) for row in rows]
+
+    @staticmethod
+    def _decode(row):
+        return {"seq": row[0], **json.loads(row[1])}
@@ -1,8 +1,14 @@
 from datetime import datetime
+from .trade_journal import TradeJournal
 
 class TradeLogger:
-    def __init__(self):
-        self.logs = []
+    def __init__(self, journal=None):
+        self.journal = journal or TradeJournal()
+
+    @property
+    def logs(self):
+        """Hot window of the newest trades; older entries are queried from the journal."""
+        return list(self.journal.recent)
 
     def log_trade(self, order, parent_fill, child_fill, child_type):
         log_entry = {
@@ -20,5 +26,4 @@ class TradeLogger:
             "result": result_flag         # "Profit", "Loss" oder "Neutral"
         }
         
-        self.logs.append(log_entry)
-        return log_entry
\ No newline at end of file
+        return self.journal.append(log_entry)
\ No newline at end of file
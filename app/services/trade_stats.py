@@ -0,0 +1,121 @@
+from array import array
+from datetime import datetime
+
+
+class StatsAggregate:
+    """Running performance figures of one group of trades, updated in O(1) per trade."""
+
+    __slots__ = ("trades", "wins", "losses", "gross_profit", "gross_loss", "equity", "peak", "max_drawdown")
+
+    def __init__(self):
+        self.trades = 0
+        self.wins = 0
+        self.losses = 0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+        self.equity = 0.0
+        self.peak = 0.0
+        self.max_drawdown = 0.0
+
+    def add(self, profit):
+        self.trades += 1
+        if profit > 0:
+            self.wins += 1
+            self.gross_profit += profit
+        elif profit < 0:
+            self.losses += 1
+            self.gross_loss += profit
+        self.equity += profit
+        self.peak = max(self.peak, self.equity)
+        self.max_drawdown = max(self.max_drawdown, self.peak - self.equity)
+
+    def summary(self):
+        return {
+            "trades": self.trades,
+            "wins": self.wins,
+            "losses": self.losses,
+            "winRate": round(self.wins / self.trades * 100, 1) if self.trades else 0.0,
+            "netProfit": round(self.equity, 2),
+            "grossProfit": round(self.gross_profit, 2),
+            "grossLoss": round(self.gross_loss, 2),
+            "profitFactor": round(self.gross_profit / -self.gross_loss, 2) if self.gross_loss else None,
+            "avgWin": round(self.gross_profit / self.wins, 2) if self.wins else 0.0,
+            "avgLoss": round(self.gross_loss / self.losses, 2) if self.losses else 0.0,
+            "maxDrawdown": round(self.max_drawdown, 2),
+        }
+
+
+class TradeStats:
+    """
+    Server-side performance statistics over all logged trades.
+
+    Aggregates (overall, per symbol, per timeframe) are updated incrementally
+    from each new log entry; the equity curve is kept as compact arrays so
+    /equity can downsample it without touching the journal.
+    """
+
+    def __init__(self):
+        self.total = StatsAggregate()
+        self.by_symbol = {}
+        self.by_timeframe = {}
+        self.curve_time = array("d")
+        self.curve_equity = array("d")
+
+    def add(self, entry):
+        profit = entry.get("profit") or 0.0
+        self.total.add(profit)
+        self.by_symbol.setdefault(entry.get("symbol"), StatsAggregate()).add(profit)
+        self.by_timeframe.setdefault(entry.get("timeframe"), StatsAggregate()).add(profit)
+        self.curve_time.append(datetime.fromisoformat(entry["timestamp"]).timestamp())
+        self.curve_equity.append(self.total.equity)
+
+    def summary(self):
+        return {
+            **self.total.summary(),
+            "bySymbol": {k: v.summary() for k, v in self.by_symbol.items()},
+            "byTimeframe": {k: v.summary() for k, v in self.by_timeframe.items()},
+        }
+
+    def equity(self, points=500):
+        """Cumulative profit curve, downsampled to at most `points` points with LTTB."""
+        indices = lttb_indices(self.curve_time, self.curve_equity, points)
+        return [
+            {"timestamp": datetime.fromtimestamp(self.curve_time[i]).isoformat(), "equity": round(self.curve_equity[i], 2)}
+            for i in indices
+        ]
+
+
+def lttb_indices(xs, ys, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling. Returns the indices of the
+    points to keep; first and last point are always kept.
+    """
+    n = len(xs)
+    if threshold >= n or threshold < 3:
+        return list(range(n)) if threshold >= n else [0, n - 1][:n]
+
+    selected = [0]
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+
+        # Mittelwert des nächsten Buckets als dritter Dreieckspunkt
+        next_start = end
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+        span = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / span
+        avg_y = sum(ys[next_start:next_end]) / span
+
+        ax, ay = xs[a], ys[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+
+    selected.append(n - 1)
+    return selected
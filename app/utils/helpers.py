@@ -1,19 +1,16 @@
 import asyncio
-import time
+from ..core.log import get_logger
 
-async def wait_for_order_id(trade, timeout=5.0):
+log = get_logger("orders")
+
+async def wait_for_order_id(tracker, trade, timeout=5.0):
     """
     Wartet asynchron darauf, dass die platzierte Order eine gültige OrderID erhält.
     """
-    start = time.time()
-    while time.time() - start < timeout:
-        if trade.order.orderId != 0:
-            return trade.order.orderId
-        await asyncio.sleep(0.2)
-    return 0
+    return await tracker.wait_for_order_id(trade, timeout)
 
 # Add this new function near your other wait_for functions
-async def wait_for_fill_or_cancel(trade, timeout=10.0):
+async def wait_for_fill_or_cancel(tracker, trade, timeout=10.0):
     """
     Wartet maximal timeout Sekunden auf die Ausführung einer Order.
     Storniert die Order, falls sie nicht innerhalb des Timeouts ausgeführt wird.
@@ -22,18 +19,15 @@ async def wait_for_fill_or_cancel(trade, timeout=10.0):
         - filled: True wenn Order ausgeführt wurde, False wenn storniert
         - avgFillPrice: Durchschnittlicher Ausführungspreis oder None
     """
-    start = time.time()
-    while time.time() - start < timeout:
-        if trade.orderStatus.status == "Filled":
-            return True, trade.orderStatus.avgFillPrice
-        await asyncio.sleep(0.1)
-    
+    if await tracker.wait_for_fill(trade, timeout):
+        return True, trade.orderStatus.avgFillPrice
+
     # Timeout erreicht - Order stornieren
-    print(f"⚠️ Timeout erreicht für Order {trade.order.orderId} nach {timeout} Sekunden, storniere...")
-    ib.cancelOrder(trade.order)
+    log.warning("Timeout erreicht für Order %s nach %s Sekunden, storniere...", trade.order.orderId, timeout)
+    tracker.ib.cancelOrder(trade.order)
     return False, None
 
-async def wait_for_bracket_fill(parent_trade, tp_trade, ts_trade, timeout=3600.0):
+async def wait_for_bracket_fill(tracker, parent_trade, tp_trade, ts_trade, timeout=3600.0):
     """
     Wartet darauf, dass zunächst die Parent-Order gefüllt wird und danach mindestens
     eine der Child-Orders (Take Profit oder Trailing Stop) gefüllt wird.
@@ -42,28 +36,21 @@ async def wait_for_bracket_fill(parent_trade, tp_trade, ts_trade, timeout=3600.0
       - childType: "takeProfit" oder "trailingStop", je nachdem, welcher zuerst gefüllt wurde
       - childFill: Fill Price der gefüllten Child-Order
     """
-    start = time.time()
-    parentFilled = False
-    parentFill = None
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
     childType = None
     childFill = None
 
-    while time.time() - start < timeout:
-        # Parent füllt sich
-        if not parentFilled:
-            parentFill = parent_trade.orderStatus.avgFillPrice
-            if parent_trade.orderStatus.status == "Filled":
-                parentFilled = True
-                print("✅ Parent Order gefüllt zum Preis:", parentFill)
-        else:
-            # Prüfe, ob eine der Child-Orders gefüllt wurde
-            if tp_trade and tp_trade.orderStatus.status == "Filled":
-                childType = "takeProfit"
-                childFill = tp_trade.orderStatus.avgFillPrice
-                break
-            elif ts_trade and ts_trade.orderStatus.status == "Filled":
-                childType = "trailingStop"
-                childFill = ts_trade.orderStatus.avgFillPrice
-                break
-        await asyncio.sleep(0.5)
-    return parentFilled, childType, parentFill, childFill
\ No newline at end of file
+    # Parent füllt sich
+    parentFilled = await tracker.wait_for_fill(parent_trade, timeout)
+    parentFill = parent_trade.orderStatus.avgFillPrice
+    if not parentFilled:
+        return parentFilled, childType, parentFill, childFill
+    log.debug("Parent Order gefüllt zum Preis: %s", parentFill)
+
+    # Warte, bis eine der Child-Orders gefüllt wurde
+    filled = await tracker.wait_for_any_fill([tp_trade, ts_trade], max(deadline - loop.time(), 0))
+    if filled is not None:
+        childType = "takeProfit" if tp_trade and filled.order.orderId == tp_trade.order.orderId else "trailingStop"
+        childFill = filled.orderStatus.avgFillPrice
+    return parentFilled, childType, parentFill, childFill
@@ -1,17 +1,32 @@
 # -*- coding: utf-8 -*-
+# Zuerst: misst Import- und Init-Zeiten ab Prozessstart (--profile-startup für die Import-Tabelle)
+from app.core.startup import startup
 
 import asyncio
+import importlib
+import os
 import time
 import yaml
 from datetime import datetime
 from fastapi import FastAPI, HTTPException, Response, Request
+from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 from contextlib import asynccontextmanager
 from pydantic import BaseModel
-from ib_insync import *
-import uvicorn
-from config_watcher import ConfigWatcher
+from typing import List, Optional
+from app.core.config import ConfigWatcher
+from app.services.bracket_supervisor import BracketSupervisor, order_ref
+from app.services.instrument_registry import InstrumentRegistry
+from app.services.pnl_engine import PnLEngine
+from app.services.alert_intake import AlertIntake
+from app.services.trade_journal import TradeJournal
+from app.services.event_bus import EventBus
+from app.services.trade_stats import TradeStats
+from app.services.metrics import AlertMetrics, MetricsRegistry, WebhookTimingMiddleware, current_trace
+from app.services.idempotency import IdempotencyCache
+from app.core.log import get_logger, setup_logging
+
+log = get_logger("main")
 
 # --- YAML-Konfiguration laden (optional) ---
 config = {}
@@ -19,51 +34,260 @@ try:
     with open('config.yaml', 'r') as f:
         config = yaml.safe_load(f)
 except Exception as e:
-    print("❌ Keine YAML-Konfiguration gefunden, Standardwerte werden verwendet.")
     config = {}
 
+# Strukturiertes Logging (JSON-Zeilen, Schreiben im Hintergrund-Thread)
+setup_logging((config or {}).get('logging'))
+if not config:
+    log.warning("Keine YAML-Konfiguration gefunden, Standardwerte werden verwendet.")
+
+
+# Persistentes Trade-Journal (SQLite), nur die neuesten Einträge bleiben im Speicher
+trade_journal = TradeJournal('trade_journal.db', hot_window=500)
+trade_stats = TradeStats()
+
+# Server-Sent Events für das Dashboard
+event_bus = EventBus()
+
+# Latenz-Metriken je Alert (Prometheus unter /metrics)
+alert_metrics = AlertMetrics()
+
+# Doppelte Alerts (TradingView-Retries) bekommen die ursprüngliche Bracket-Antwort
+idempotency = IdempotencyCache()
+
+# Alerts, die vor Ende des Starts eintreffen: dauerhaft vormerken, danach platzieren
+intake = AlertIntake()
+services_ready = asyncio.Event()
+# Rollen, die für das Platzieren vorgemerkter Alerts verbunden sein müssen (Orders, Kontrakte)
+DRAIN_ROLES = ("orders", "market_data")
+
+# --- IB-Dienste: erst im Hintergrund gebaut, der Import von ib_insync liegt nicht auf dem Startpfad ---
+ib_pool = ib = order_tracker = contract_resolver = instruments = bar_store = market_data = None
+pnl_engine = bracket_supervisor = reconciler = None
+Order = UNSET_DOUBLE = util = None
+contract_refresh_task = None
+templates = None
+
+# Module der IB-Dienste (werden vorab in einem Thread importiert)
+SERVICE_MODULES = ("ib_insync", "app.core.connection_pool", "app.services.order_tracker",
+                   "app.services.contract_resolver", "app.services.bar_store", "app.services.market_data",
+                   "app.services.reconciler")
+
+def import_services(loop):
+    # eventkit merkt sich beim Import die Event-Loop des importierenden Threads
+    asyncio.set_event_loop(loop)
+    for name in SERVICE_MODULES:
+        importlib.import_module(name)
+
+def build_services():
+    """IB-Verbindungen und die davon abhängigen Dienste anlegen (einmalig)."""
+    global ib_pool, ib, order_tracker, contract_resolver, instruments, bar_store, market_data
+    global pnl_engine, bracket_supervisor, reconciler, Order, UNSET_DOUBLE, util
+    if ib_pool is not None:
+        return
+    from ib_insync import Order, util
+    from ib_insync.util import UNSET_DOUBLE
+    from app.core.connection_pool import IBConnectionPool
+    from app.services.order_tracker import OrderTracker
+    from app.services.contract_resolver import ContractResolver
+    from app.services.bar_store import BarStore
+    from app.services.market_data import MarketDataManager
+    from app.services.reconciler import BracketReconciler
+
+    # --- Verbindungen zu Interactive Brokers (je Rolle eine eigene Client-ID) ---
+    # Ausgehende Messages je Rolle über den Pacer (IB-Limit 50/s, Stornos zuerst)
+    ib_pool = IBConnectionPool(metrics=alert_metrics)
+    ib = ib_pool.orders
+    order_tracker = OrderTracker(ib)
+    contract_resolver = ContractResolver(ib_pool.market_data)
+    instruments = InstrumentRegistry(contract_resolver)
+    # Historische Bars: einmal von IB laden, danach aus den lokalen Dateien
+    bar_store = BarStore(ib_pool.market_data)
+    # Geteilte Marktdaten-Abos: letzter Bid/Ask/Last je Kontrakt für den Limitpreis-Check
+    market_data = MarketDataManager(ib_pool.market_data)
+    # Realisierter P&L je Bracket aus execDetails und Commission Reports (kein Polling)
+    pnl_engine = PnLEngine(ib, on_update=lambda summary: event_bus.publish("pnl", summary))
+    bracket_supervisor = BracketSupervisor(order_tracker, pnl_engine, on_trade=on_trade,
+                                           on_update=lambda bracket: event_bus.publish("bracket", bracket))
+    # Nach (Re-)Connect: offene Brackets bei IB wieder aufnehmen, verpasste Trades nachtragen
+    reconciler = BracketReconciler(ib, bracket_supervisor, trade_journal, instruments)
+    ib_pool.on_state_change = lambda _: event_bus.publish("connection", connection_state())
+
+def connection_state():
+    if ib_pool is None:
+        return {"connected": False, "roles": []}
+    return {"connected": ib.isConnected(), "roles": ib_pool.health()}
+
+def require_services():
+    if not services_ready.is_set():
+        raise HTTPException(status_code=503, detail="⏳ Service startet noch (IB-Verbindung und Prewarm).")
+
+def dashboard_templates():
+    # Jinja2 wird erst beim Warmup (oder beim ersten Dashboard-Aufruf) geladen
+    global templates
+    if templates is None:
+        from fastapi.templating import Jinja2Templates
+        templates = Jinja2Templates(directory="templates")
+    return templates
+
+def on_trade(entry):
+    entry = trade_journal.append(entry)
+    trade_stats.add(entry)
+    event_bus.publish("trade", entry)
+    event_bus.publish("stats", trade_stats.total.summary())
+
+reconcile_tasks = set()
+
+async def reconcile_brackets():
+    try:
+        summary = await reconciler.run(config.settings)
+        event_bus.publish("reconciliation", summary)
+    except Exception as e:
+        log.exception("Bracket reconciliation failed: %s", e)
 
-# Globales Log-Array für Trade Logs
-trade_logs = []
-
-# --- Verbindung zu Interactive Brokers aufbauen ---
-ib = IB()
+def schedule_reconciliation():
+    # Läuft im Hintergrund, die App nimmt währenddessen schon Requests an
+    task = asyncio.ensure_future(reconcile_brackets())
+    reconcile_tasks.add(task)
+    task.add_done_callback(reconcile_tasks.discard)
 
 # Create global config instance
 config = ConfigWatcher()
+config.on_change = lambda new_config: event_bus.publish("config", new_config)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    util.patchAsyncio()
-    await ib.connectAsync(host='127.0.0.1', port=7497, clientId=1)
-    print("📡 Connecting to Interactive Brokers...")
-    if ib.isConnected():
-        print("✅ Connection to IB established successfully!")
-    else:
-        print("❌ Failed to connect to IB!")
-    
-    # Start config watcher
-    await config.start_watching()
-
-    async def keep_connection_alive():
-        while True:
-            if not ib.isConnected():
-                print("⚡ Verbindung zu IB verloren, versuche erneut zu verbinden...")
-                await ib.connectAsync(host='127.0.0.1', port=7497, clientId=1)
-                print("✅ Verbindung zu IB wiederhergestellt.")
-            await asyncio.sleep(10)
-    
-    keep_alive_task = asyncio.create_task(keep_connection_alive())
-    
+    # Schneller Teil: danach nimmt der Listener Alerts an (Intake) und /health antwortet
+    with startup.phase("lifespan"):
+        await config.start_watching()
+        idempotency.configure(config.get('idempotency', {}))
+        await trade_journal.open()
+        intake.configure(config.get('intake', {}))
+        intake.open()
+    startup.mark("accepting")
+    log.info("Accepting alerts after %.0f ms, warming up in the background", startup.elapsed())
+    warmup_task = asyncio.create_task(warm_up())
+
     yield
 
+    warmup_task.cancel()
+    await asyncio.gather(warmup_task, return_exceptions=True)
+    services_ready.clear()
     await config.stop_watching()
-    keep_alive_task.cancel()
-    ib.disconnect()
+    if ib_pool is not None:
+        ib.connectedEvent -= schedule_reconciliation
+        for task in list(reconcile_tasks):
+            task.cancel()
+        await bracket_supervisor.stop()
+        if contract_refresh_task is not None:
+            contract_refresh_task.cancel()
+        market_data.stop()
+        await ib_pool.stop()
+    await trade_journal.close()
+    intake.close()
+
+async def warm_up():
+    """
+    Langsamer Teil des Starts im Hintergrund: Statistiken aus dem Journal, IB-Dienste,
+    Verbindung, Prewarm und Templates. Danach werden die vorgemerkten Alerts platziert.
+    """
+    try:
+        await start_services()
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        # Vorgemerkte Alerts bleiben in der Intake-Datei und werden beim nächsten Start platziert
+        startup.mark("failed")
+        log.exception("Warm-up failed, %d queued alert(s) stay pending: %s", intake.pending_count, e)
+
+async def start_services():
+    global contract_refresh_task
+    with startup.phase("stats"):
+        async for entry in trade_journal.iterate():
+            trade_stats.add(entry)
+    with startup.phase("import services"):
+        await asyncio.to_thread(import_services, asyncio.get_running_loop())
+    with startup.phase("build services"):
+        build_services()
+        util.patchAsyncio()
+
+    # Verbindungen aufbauen, jede Rolle verbindet sich bei Abbruch selbstständig neu
+    with startup.phase("connect"):
+        ib_pool.configure(config.get('connection', {}))
+        log.info("Connecting to Interactive Brokers...")
+        ib.connectedEvent += schedule_reconciliation
+        connected = await ib_pool.start()
+        if not (connected["orders"] and connected["market_data"]):
+            # Ohne Verbindung würde Prewarm und Drain jeden vorgemerkten Alert verwerfen
+            log.error("Failed to connect to IB, waiting for the reconnect before warm-up")
+            await ib_pool.wait_connected(*DRAIN_ROLES)
+    log.info("Connection to IB established successfully")
+
+    # Kontrakte vorab qualifizieren, damit der Webhook keine Roundtrips mehr braucht
+    with startup.phase("prewarm"):
+        contract_settings = config.get('contracts', {}) or {}
+        contract_resolver.exchange = contract_settings.get('exchange', 'CME')
+        contract_resolver.currency = contract_settings.get('currency', 'USD')
+        contract_resolver.roll_days = contract_settings.get('roll_days', 0)
+        contract_resolver.sec_types = {str(k).upper(): str(v).upper()
+                                       for k, v in (contract_settings.get('sec_types') or {}).items()}
+        await contract_resolver.prewarm(contract_settings.get('prewarm', ['NQ1!']))
+        # Tick-Raster, Multiplier und Kommission der vorgewärmten Kontrakte
+        instruments.configure(config.get('instruments', {}))
+        await instruments.prewarm(contract_settings.get('prewarm', ['NQ1!']))
+        market_data.configure(config.get('market_data', {}))
+        for symbol in contract_settings.get('prewarm', ['NQ1!']):
+            contract = contract_resolver.get(symbol)
+            if contract is not None:
+                market_data.ensure(contract)
+        bar_store.configure(config.get('history', {}))
+    contract_refresh_task = asyncio.create_task(contract_resolver.run_refresh())
+    with startup.phase("templates"):
+        dashboard_templates()
+
+    with startup.phase("drain intake"):
+        await drain_intake()
+    startup.mark("ready")
+    log.info("Service ready after %.0f ms", startup.elapsed(), extra={"startup": startup.summary()})
+    if startup.profiling:
+        # Import-Tabelle als Text für die Konsole, strukturiert (mit Imports) im JSON-Log
+        log.info("%s", startup.format(), extra={"startup": startup.summary()})
+
+def drain_connected():
+    return all(ib_pool.is_connected(role) for role in DRAIN_ROLES)
+
+async def drain_intake():
+    """Vorgemerkte Alerts der Reihe nach platzieren; ready wird ohne await nach dem letzten gesetzt."""
+    while True:
+        if not drain_connected():
+            log.warning("IB disconnected, %d queued alert(s) wait for the reconnect", intake.pending_count)
+            await ib_pool.wait_connected(*DRAIN_ROLES)
+            continue
+        records = intake.pending()
+        if not records:
+            break
+        for record in records:
+            if record.age > intake.max_age:
+                log.warning("Queued alert %s dropped: %.0fs old (max_age %ss)", record.id, record.age,
+                            intake.max_age, extra={"intakeId": record.id, "order": record.payload})
+                intake.done(record.id, error="expired")
+                continue
+            try:
+                response = await submit_bracket_order(BracketOrderModel(**record.payload), record.received_at)
+                intake.done(record.id, bracketId=response["bracketId"])
+            except Exception as e:
+                detail = getattr(e, "detail", None) or str(e)
+                if not drain_connected():
+                    # Verbindungsfehler: Alert bleibt vorgemerkt und wird nach dem Reconnect platziert
+                    log.warning("Queued alert %s kept pending: %s", record.id, detail, extra={"intakeId": record.id})
+                    break
+                log.error("Queued alert %s failed: %s", record.id, detail, extra={"intakeId": record.id})
+                intake.done(record.id, error=detail)
+    services_ready.set()
 
 app = FastAPI(lifespan=lifespan)
+app.add_middleware(WebhookTimingMiddleware, metrics=alert_metrics, paths=("/webhook", "/webhook/batch"))
 app.mount("/static", StaticFiles(directory="static"), name="static")
-templates = Jinja2Templates(directory="templates")
 
 
 #
@@ -79,126 +303,208 @@ class BracketOrderModel(BaseModel):
     stopLoss: float = 20    # Relativer Wert für Stop Loss (Ticks)
     timeframe: str = "None"         # Zeitrahmen für die Chart-Analyse
     relativeType: str = "ticks"  # 'ticks' oder 'percent'
-
-async def wait_for_order_id(trade, timeout=5.0):
-    """
-    Wartet asynchron darauf, dass die platzierte Order eine gültige OrderID erhält.
-    """
-    start = time.time()
-    while time.time() - start < timeout:
-        if trade.order.orderId != 0:
-            return trade.order.orderId
-        await asyncio.sleep(0.2)
-    return 0
-
-async def wait_for_bracket_fill(parent_trade, tp_trade, ts_trade, timeout=3600.0):
+    timestamp: Optional[str] = None       # Alert-Zeit (z.B. {{timenow}}), Teil des Idempotenz-Schlüssels
+    idempotencyKey: Optional[str] = None  # Expliziter Schlüssel, alternativ Header Idempotency-Key
+
+@app.post("/webhook", status_code=202)
+async def place_bracket_order(order: BracketOrderModel, request: Request):
+    # Retries desselben Alerts erzeugen keine zweite Bracket Order
+    key = idempotency.key_for(order.model_dump(exclude={"timestamp", "idempotencyKey"}), order.timestamp,
+                              order.idempotencyKey or request.headers.get("idempotency-key"))
+    response, duplicate = await idempotency.run(
+        key, lambda: accept_alert(order, getattr(request.state, "received_at", None)))
+    if duplicate:
+        alert_metrics.duplicates.inc()
+        log.info("Duplicate alert ignored, returning bracket %s", response["bracketId"],
+                 extra={"bracketId": response["bracketId"], "originalTraceId": response["traceId"]})
+        return {**response, "duplicate": True}
+    return response
+
+async def accept_alert(order: BracketOrderModel, received_at=None):
+    # Während des Starts: Alert dauerhaft vormerken, warm_up() platziert ihn, sobald IB bereit ist
+    if not services_ready.is_set():
+        return intake.accept(order.model_dump(), received_at)
+    return await submit_bracket_order(order, received_at)
+
+async def submit_bracket_order(order: BracketOrderModel, received_at=None):
+    # Trace-ID und Stage-Zeitstempel für diesen Alert
+    trace = alert_metrics.start(received_at)
+    trace.mark("received")
+
+    # Vorkompilierter, unveränderlicher Settings-Snapshot (Overrides bereits validiert)
+    settings = config.settings
+
+    log.info("Received order %s %s %s @ %s", order.action, order.quantity, order.symbol, order.limitPrice,
+             extra={"order": order.model_dump()})
+    # 1) Vertrag und Instrument-Spezifikation aus dem Cache holen (Front Month, beim Start vorgewärmt)
+    contract, spec = await resolve_instrument(order.symbol)
+    trace.mark("contract_resolved")
+    log.debug("Contract resolved: %s", contract)
+    check_quote(order, contract, spec, trace)
+
+    # 2) + 3) Zielpreise berechnen und Orders erstellen
+    parent, takeprofit, trailing_stop = build_bracket_orders(order, settings, spec)
+    
+    # 4) OrderIDs lokal reservieren, Parent, Take Profit und Trailing Stop ohne await dazwischen senden
+    assign_order_ids(parent, takeprofit, trailing_stop)
+    trace.mark("order_id_assigned")
+    parent_trade = ib.placeOrder(contract, parent)
+    trace.mark("parent_placed")
+    trace.watch_ack(parent_trade)
+    tp_trade = ib.placeOrder(contract, takeprofit) if takeprofit else None
+    # Der Trailing Stop (transmit=True) aktiviert die gesamte Gruppe
+    ts_trade = ib.placeOrder(contract, trailing_stop) if trailing_stop else None
+    trace.mark("children_transmitted")
+    log.info("Bracket placed. Parent OrderID: %s", parent.orderId)
+
+    # 7) Überwachung der Bracket Order im Hintergrund, Webhook antwortet sofort
+    return supervise_bracket(order, settings, spec, trace, parent_trade, tp_trade, ts_trade)
+
+@app.post("/webhook/batch", status_code=202)
+async def place_bracket_batch(orders: List[BracketOrderModel], request: Request):
     """
-    Wartet darauf, dass zunächst die Parent-Order gefüllt wird und danach mindestens
-    eine der Child-Orders (Take Profit oder Trailing Stop) gefüllt wird.
-    Gibt ein Dictionary mit Fill-Preisen zurück:
-      - parentFill: Fill Price der Parent-Order
-      - childType: "takeProfit" oder "trailingStop", je nachdem, welcher zuerst gefüllt wurde
-      - childFill: Fill Price der gefüllten Child-Order
+    Mehrere Alerts (z.B. mehrere Symbole/Timeframes zum selben Bar-Close) in einem Request.
+    Kontrakte werden gebündelt aufgelöst, OrderIDs vorab vergeben und alle placeOrder-Aufrufe
+    ohne Wartezeit direkt hintereinander gesendet. Antwortet mit einem Ergebnis je Eintrag.
     """
-    start = time.time()
-    parentFilled = False
-    parentFill = None
-    childType = None
-    childFill = None
-
-    while time.time() - start < timeout:
-        # Parent füllt sich
-        if not parentFilled:
-            parentFill = parent_trade.orderStatus.avgFillPrice
-            if parent_trade.orderStatus.status == "Filled":
-                parentFilled = True
-                print("✅ Parent Order gefüllt zum Preis:", parentFill)
+    received_at = getattr(request.state, "received_at", None)
+    header_key = request.headers.get("idempotency-key")
+    if not services_ready.is_set():
+        return await queue_batch(orders, received_at, header_key)
+    settings = config.settings
+    results = [None] * len(orders)
+    duplicates = {}
+    claimed = {}   # index -> Idempotenz-Schlüssel der selbst platzierten Einträge
+    for i, order in enumerate(orders):
+        key = idempotency.key_for(order.model_dump(exclude={"timestamp", "idempotencyKey"}), order.timestamp,
+                                  order.idempotencyKey or (f"{header_key}:{i}" if header_key else None))
+        existing = idempotency.claim(key)
+        if existing is None:
+            claimed[i] = key
         else:
-            # Prüfe, ob eine der Child-Orders gefüllt wurde
-            if tp_trade and tp_trade.orderStatus.status == "Filled":
-                childType = "takeProfit"
-                childFill = tp_trade.orderStatus.avgFillPrice
-                break
-            elif ts_trade and ts_trade.orderStatus.status == "Filled":
-                childType = "trailingStop"
-                childFill = ts_trade.orderStatus.avgFillPrice
-                break
-        await asyncio.sleep(0.5)
-    return parentFilled, childType, parentFill, childFill
-
-# Add this new function near your other wait_for functions
-async def wait_for_fill_or_cancel(trade, timeout=10.0):
-    """
-    Wartet maximal timeout Sekunden auf die Ausführung einer Order.
-    Storniert die Order, falls sie nicht innerhalb des Timeouts ausgeführt wird.
-    Returns:
-        tuple: (filled, avgFillPrice)
-        - filled: True wenn Order ausgeführt wurde, False wenn storniert
-        - avgFillPrice: Durchschnittlicher Ausführungspreis oder None
-    """
-    start = time.time()
-    while time.time() - start < timeout:
-        if trade.orderStatus.status == "Filled":
-            return True, trade.orderStatus.avgFillPrice
-        await asyncio.sleep(0.1)
-    
-    # Timeout erreicht - Order stornieren
-    print(f"⚠️ Timeout erreicht für Order {trade.order.orderId} nach {timeout} Sekunden, storniere...")
-    ib.cancelOrder(trade.order)
-    return False, None
-
-# Update the order placement logic in place_bracket_order function
-@app.post("/webhook")
-async def place_bracket_order(order: BracketOrderModel):
-    # Load settings from YAML
-    settings = config.get('order_settings', {})
-    overrides = settings.get('overrides', {})
-    timeouts = settings.get('timeouts', {})
-    
-    # Apply overrides if they exist
-    quantity = overrides.get('quantity', order.quantity) if overrides.get('quantity') is not None else order.quantity
-    trail_amt = overrides.get('trail_amount', order.trailAmt) if overrides.get('trail_amount') is not None else order.trailAmt
-    stop_loss = overrides.get('stop_loss', order.stopLoss) if overrides.get('stop_loss') is not None else order.stopLoss 
-    take_profit = overrides.get('take_profit', order.takeProfit) if overrides.get('take_profit') is not None else order.takeProfit
-    tp_quantity = overrides.get('tp_quantity', quantity) if overrides.get('tp_quantity') is not None else quantity
-    ts_quantity = overrides.get('ts_quantity', quantity) if overrides.get('ts_quantity') is not None else quantity
-
-    # Get timeouts from YAML or use defaults
-    fill_timeout = timeouts.get('fill_or_cancel', 10.0)
-    bracket_timeout = timeouts.get('bracket_fill', 3600.0)
-
-    print("✅ Received order:", order.model_dump())
-    # 1) Vertrag erstellen und qualifizieren (hier z. B. als US-Aktie)
-    
-    if order.symbol == "NQ1!":
-        contract = Future(symbol="NQ", lastTradeDateOrContractMonth="202503", exchange="CME", currency="USD")
-    else:
-        contract = Future(symbol=order.symbol, lastTradeDateOrContractMonth="202503", exchange="CME", currency="USD")
-    ib.qualifyContracts(contract)
-    print("✅ Contract qualified:", contract)
-    
-    # 2) Berechne die absoluten Zielpreise aus den relativen Werten.
-    basePrice = round(order.limitPrice * 4, 0)/4  # Basis für die Umrechnung, muss gerundet werden auf Vielfaches von 0.25
-    tick_size = 0.25  # Tick-Größe (Preise müssen ein Vielfaches von 0.25 sein)
-    
-    if order.relativeType.lower() == "ticks":
-        if order.action.upper() == "BUY":
-            absTakeProfit = basePrice + take_profit * tick_size
-            absStopLoss   = basePrice - stop_loss * tick_size
+            duplicates[i] = existing
+    log.info("Received batch of %d orders (%d duplicates)", len(orders), len(duplicates))
+
+    try:
+        # 1) Jedes Symbol nur einmal auflösen, alle parallel
+        symbols = list({orders[i].symbol for i in claimed})
+        lookups = await asyncio.gather(*(resolve_instrument(s) for s in symbols), return_exceptions=True)
+        instruments_by_symbol = dict(zip(symbols, lookups))
+
+        # 2) Orders aller Einträge bauen
+        prepared = []
+        for i in claimed:
+            order = orders[i]
+            trace = alert_metrics.start(received_at)
+            trace.mark("received")
+            try:
+                lookup = instruments_by_symbol[order.symbol]
+                if isinstance(lookup, Exception):
+                    raise lookup
+                contract, spec = lookup
+                trace.mark("contract_resolved")
+                check_quote(order, contract, spec)
+                prepared.append((i, trace, contract, spec, build_bracket_orders(order, settings, spec)))
+            except Exception as e:
+                results[i] = {"status": "error", "detail": getattr(e, "detail", None) or str(e)}
+                trace.finish("rejected")
+                idempotency.fail(claimed[i])
+
+        # 3) OrderIDs vorab vergeben, Kinder kennen ihre parentId ohne auf IB zu warten
+        for _, trace, _, _, bracket_orders in prepared:
+            assign_order_ids(*bracket_orders)
+            trace.mark("order_id_assigned")
+
+        # 4) Alle Parent- und Child-Orders ohne await dazwischen senden
+        placed = []
+        try:
+            for i, trace, contract, spec, (parent, takeprofit, trailing_stop) in prepared:
+                parent_trade = ib.placeOrder(contract, parent)
+                try:
+                    trace.mark("parent_placed")
+                    trace.watch_ack(parent_trade)
+                    tp_trade = ib.placeOrder(contract, takeprofit) if takeprofit else None
+                    ts_trade = ib.placeOrder(contract, trailing_stop) if trailing_stop else None
+                except Exception:
+                    # Gruppe nicht übertragen (transmit kommt mit dem letzten Leg): Parent verwerfen,
+                    # der Eintrag gilt als nicht gesendet und ein Retry platziert ihn neu
+                    try:
+                        ib.cancelOrder(parent)
+                    except Exception as e:
+                        log.warning("Could not cancel untransmitted parent %s: %s", parent.orderId, e)
+                    raise
+                trace.mark("children_transmitted")
+                placed.append((i, trace, spec, parent_trade, tp_trade, ts_trade))
+        finally:
+            # 5) Überwachung im Hintergrund starten - auch für die bereits gesendeten Brackets, wenn ein
+            # späteres placeOrder fehlschlug, sonst würde ein Retry sie ein zweites Mal platzieren
+            for i, trace, spec, parent_trade, tp_trade, ts_trade in placed:
+                results[i] = supervise_bracket(orders[i], settings, spec, trace, parent_trade, tp_trade, ts_trade)
+                idempotency.complete(claimed[i], results[i])
+            log.info("Batch placed: %d of %d bracket orders", len(placed), len(prepared))
+    finally:
+        # Nicht platzierte Einträge freigeben, damit ein Retry sie erneut verarbeitet
+        for i, key in claimed.items():
+            if results[i] is None:
+                idempotency.fail(key)
+
+    for i, existing in duplicates.items():
+        response = await asyncio.shield(existing)
+        if response is None:
+            results[i] = {"status": "error", "detail": "❌ Ursprünglicher Request ist fehlgeschlagen, bitte erneut senden."}
         else:
-            absTakeProfit = basePrice - take_profit * tick_size
-            absStopLoss   = basePrice + stop_loss * tick_size
-    else:
+            alert_metrics.duplicates.inc()
+            results[i] = {**response, "duplicate": True}
+
+    return {
+        "status": "BatchSubmitted",
+        "submitted": sum(1 for r in results if r.get("bracketId") and not r.get("duplicate")),
+        "results": results
+    }
+
+async def queue_batch(orders, received_at, header_key):
+    """Batch während des Starts: jeden Eintrag einzeln vormerken (gleiche Idempotenz-Schlüssel)."""
+    results = []
+    for i, order in enumerate(orders):
+        key = idempotency.key_for(order.model_dump(exclude={"timestamp", "idempotencyKey"}), order.timestamp,
+                                  order.idempotencyKey or (f"{header_key}:{i}" if header_key else None))
+        response, duplicate = await idempotency.run(key, lambda order=order: accept_alert(order, received_at))
+        results.append({**response, "duplicate": True} if duplicate else response)
+    return {"status": "BatchQueued", "submitted": 0, "results": results}
+
+async def resolve_instrument(symbol):
+    """Qualifizierter Kontrakt und InstrumentSpec eines Alert-Symbols (aus dem Cache, sonst von IB)."""
+    try:
+        contract = await contract_resolver.resolve(symbol)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"❌ Kein Kontrakt für {symbol} gefunden: {e}")
+    # Preisraster, Multiplier und Kommission des Kontrakts (beim Start vorgewärmt)
+    spec = instruments.get(contract) or await instruments.load(symbol)
+    return contract, spec
+
+def build_bracket_orders(order, settings, spec):
+    """Parent-, Take-Profit- und Trailing-Stop-Order eines Alerts (ohne OrderIDs, siehe assign_order_ids)."""
+    quantity, trail_amt, stop_loss, take_profit, tp_quantity, ts_quantity = settings.apply(order)
+
+    # Berechne die absoluten Zielpreise aus den relativen Werten (Ticks oder Prozent).
+    relative_type = order.relativeType.lower()
+    if relative_type not in ("ticks", "percent"):
         raise HTTPException(status_code=400, detail="❌ Ungültiger relativeType. Erlaubt sind 'ticks' oder 'percent'.")
+    basePrice = spec.round_price(order.limitPrice)  # Basis für die Umrechnung, auf das Tick-Raster gerundet
+    tick_size = spec.tick_size(basePrice)
+    direction = 1 if order.action.upper() == "BUY" else -1
+    absTakeProfit = spec.offset(basePrice, direction * take_profit, relative_type)
+    absStopLoss   = spec.offset(basePrice, -direction * stop_loss, relative_type)
     
-    print(f"⚙️ Base price: {basePrice}")
-    print(f"⚙️ Calculated absolute takeProfit: {absTakeProfit}")     
-    print(f"⚙️ Calculated absolute stopLoss (target): {absStopLoss}")
+    log.info("Bracket prices: base %s, takeProfit %s, stopLoss %s (tick %s)", basePrice, absTakeProfit, absStopLoss,
+             tick_size, extra={"basePrice": basePrice, "takeProfit": absTakeProfit, "stopLoss": absStopLoss})
 
-    # Runden auf Vielfaches der Tick-Größe:
-    print(f"⚙️ Trailing amount (rounded): {trail_amt}")
+    # Trailing-Abstand: in Prozent direkt als trailingPercent, sonst auf Vielfaches der Tick-Größe runden
+    if relative_type == "ticks":
+        trail_amt = spec.round_distance(trail_amt, basePrice)
+    log.debug("Trailing amount (rounded): %s%s", trail_amt, " %" if relative_type == "percent" else "")
     
-    # 3) Parent Order erstellen: Limit Order
+    # Parent Order: Limit Order, wird erst mit der letzten Child Order übertragen
     parent = Order(
         action=order.action.upper(),
         totalQuantity=quantity,  # Use potentially overridden quantity
@@ -207,130 +513,217 @@ async def place_bracket_order(order: BracketOrderModel):
         transmit=False,
         outsideRth=True
     )
-    print("🔄 Creating parent order:", parent)
-    
-    # 4) Parent Order platzieren und auf gültige OrderID warten
-    parent_trade = ib.placeOrder(contract, parent)
-    parent_id = await wait_for_order_id(parent_trade, timeout=5.0)
-    if parent_id == 0:
-        raise HTTPException(status_code=500, detail="❌ Parent Order hat keine gültige OrderID erhalten.")
-    print("✅ Parent order placed. OrderID:", parent_id)
+    log.debug("Creating parent order: %s", parent)
     
-    tp_trade = None
-    if settings.get("use_take_profit", True):
-        # 5) Child Order für Take Profit erstellen (Limit Order)
+    takeprofit = None
+    if settings.use_take_profit:
         takeprofit = Order(
             action="SELL" if order.action.upper() == "BUY" else "BUY",
             totalQuantity=tp_quantity,
             orderType="LMT",
             lmtPrice=absTakeProfit,
-            transmit= not settings.get("use_trailing_stop", True),  # Nicht sofort senden
-            outsideRth=True,
-            parentId=parent_id
+            transmit= not settings.use_trailing_stop,  # Nicht sofort senden
+            outsideRth=True
         )
-        tp_trade = ib.placeOrder(contract, takeprofit)
-        print("✅ Created and placed take profit order:", takeprofit)
     
-    # 6) Child Order für Trailing Stop erstellen (Trailing Stop Order)
-    if settings.get("use_trailing_stop", True):
+    trailing_stop = None
+    if settings.use_trailing_stop:
         trailing_stop = Order(
             action="SELL" if order.action.upper() == "BUY" else "BUY",
             totalQuantity=ts_quantity,
             orderType="TRAIL LIMIT",
             trailStopPrice=absStopLoss,  # Trailing Stop-Preis relativ zum Entry
-            auxPrice=trail_amt, 
+            auxPrice=trail_amt if relative_type == "ticks" else UNSET_DOUBLE,
+            trailingPercent=trail_amt if relative_type == "percent" else UNSET_DOUBLE,
             lmtPriceOffset= 4 * tick_size,  # Mindestabstand zum Limit-Preis
             transmit=True,  # Mit dieser Order wird die gesamte Gruppe aktiviert
-            outsideRth=True,
-            parentId=parent_id
+            outsideRth=True
         )
-        ts_trade = ib.placeOrder(contract, trailing_stop)
-        print("✅ Created trailing stop order:", trailing_stop)
-    
-    parent_filled, parent_fill_price = await wait_for_fill_or_cancel(parent_trade, timeout=fill_timeout)
-    
-    if not parent_filled:
-        raise HTTPException(
-            status_code=408,
-            detail=f"❌ Parent Order wurde nicht innerhalb von {fill_timeout} Sekunden ausgeführt."
-        )
-    
-    print(f"✅ Parent order filled at price: {parent_fill_price}")
 
-    # 8) Warten, bis der Parent gefüllt wird und einer der Child Orders ebenfalls gefüllt wird
-    parentFilled, childType, parentFill, childFill = await wait_for_bracket_fill(parent_trade, tp_trade if tp_trade else None, ts_trade if ts_trade else None, timeout=bracket_timeout)
-    
-    if not parentFilled or childType is None:
-        raise HTTPException(status_code=500, detail="❌ Order wurde nicht innerhalb des Zeitlimits vollständig gefüllt.")
-    
-    print(f"✅ Bracket order filled. ParentFill: {parentFill}, Child '{childType}' Fill: {childFill}")
-    
-    # 9) Gewinn/Verlust berechnen
-    if parentFill is not None and childFill is not None:
-        if order.action.upper() == "BUY":
-            profit = childFill - parentFill
-        else:
-            profit = parentFill - childFill
-    else:
-        profit = 0.0
+    # orderRef mit Bracket-ID und Leg: nach einem Neustart findet der Reconciler die Gruppe bei IB wieder
+    bracket_id = BracketSupervisor.new_id()
+    for leg, leg_order in (("P", parent), ("TP", takeprofit), ("TS", trailing_stop)):
+        if leg_order is not None:
+            leg_order.orderRef = order_ref(bracket_id, leg, order)
+    # Take Profit und Trailing Stop als OCA-Gruppe: ein Fill reduziert das Geschwister um die gefüllte
+    # Menge (ocaType 3), bei tp_quantity < ts_quantity schützt der Trailing Stop den Rest weiter
+    for child in (takeprofit, trailing_stop):
+        if child is not None:
+            child.ocaGroup = f"OCA-{bracket_id}"
+            child.ocaType = 3
+    return parent, takeprofit, trailing_stop
+
+def assign_order_ids(parent, takeprofit, trailing_stop):
+    """
+    OrderIDs einer Bracket lokal aus der ID-Folge des Clients reservieren (client.getReqId),
+    die Kinder kennen damit ihre parentId und alle Legs gehen ohne Roundtrip hinaus.
+    """
+    if not ib.isConnected():
+        raise HTTPException(status_code=503, detail="❌ Keine Verbindung zu IB.")
+    try:
+        parent.orderId = ib.client.getReqId()
+        for child in (takeprofit, trailing_stop):
+            if child:
+                child.orderId = ib.client.getReqId()
+                child.parentId = parent.orderId
+    except ConnectionError as e:
+        # nextValidId nach dem (Re-)Connect noch nicht empfangen
+        raise HTTPException(status_code=503, detail=f"❌ Keine OrderID verfügbar: {e}")
+
+def supervise_bracket(order, settings, spec, trace, parent_trade, tp_trade, ts_trade):
+    """Bracket an den Supervisor übergeben und die Webhook-Antwort bauen."""
+    current_trace.set(trace)  # Überwachungs-Task erbt die Trace-ID (wichtig im Batch)
+    bracket = bracket_supervisor.submit(order, parent_trade, tp_trade, ts_trade,
+                                        fill_timeout=settings.fill_timeout, bracket_timeout=settings.bracket_timeout,
+                                        trace=trace, spec=spec)
+    log.info("Bracket submitted, supervising in background: %s", bracket["id"], extra={"bracketId": bracket["id"]})
 
-    if profit > 0:
-        result_flag = "Profit"
-    elif profit < 0:
-        result_flag = "Loss"
-    else:
-        result_flag = "Neutral"
-
-    # 10) Log-Eintrag erstellen – nur die wichtigsten Daten
-    log_entry = {
-        "timestamp": datetime.now().isoformat(),
-        "symbol": order.symbol,
-        "side": order.action.upper(),
-        "contracts": order.quantity,
-        "parentFillPrice": parentFill,
-        "childFillPrice": childFill,
-        "commision_per_contract" : 2.25,
-        "timeframe": order.timeframe,
-        "hitType": childType,        # "takeProfit" oder "trailingStop"
-        "profit": (round(profit, 2) * order.quantity * 20) - (2.25 * order.quantity * 2),   # auf 2 Nachkommastellen gerundet
-        "result": result_flag         # "Profit", "Loss" oder "Neutral"
-    }
-    
-    trade_logs.append(log_entry)
-    print("📝 Logged trade entry:", log_entry)
-    
     return {
-        "status": "BracketOrder with trailing stop fully filled and logged",
-        "parentOrderId": parent.orderId,
-        "parentFillPrice": parentFill,
-        "childOrderType": childType,
-        "childFillPrice": childFill,
-        "logEntry": log_entry
+        "status": "BracketOrder submitted",
+        "bracketId": bracket["id"],
+        "traceId": trace.id,
+        "parentOrderId": parent_trade.order.orderId,
+        "bracket": bracket
     }
 
+@app.get("/brackets")
+async def list_brackets(status: str = None):
+    """Endpoint zum Abrufen aller überwachten Bracket Orders (optional gefiltert nach Status)."""
+    require_services()
+    return {"brackets": bracket_supervisor.list(status)}
+
+@app.get("/brackets/{bracket_id}")
+async def get_bracket(bracket_id: str):
+    """Endpoint zum Abrufen des Status einer Bracket Order."""
+    require_services()
+    bracket = bracket_supervisor.get(bracket_id)
+    if bracket is None:
+        raise HTTPException(status_code=404, detail=f"❌ Bracket {bracket_id} nicht gefunden.")
+    return {"bracket": bracket}
+
+def check_quote(order, contract, spec, trace=None):
+    """
+    Limitpreis des Alerts gegen die Live-Quote prüfen (Alter und Abstand in Ticks).
+    Je nach market_data.on_violation nur Warnung oder Ablehnung mit 409.
+    """
+    market_data.ensure(contract)
+    verdict = market_data.check(contract, order.action, spec.round_price(order.limitPrice), spec)
+    if verdict.ok:
+        return verdict
+    alert_metrics.quote_violations.inc(reason=verdict.reason)
+    log.warning("Quote check failed for %s %s @ %s: %s", order.action, order.symbol, order.limitPrice,
+                verdict.detail, extra={"reason": verdict.reason, "quote": verdict.quote._asdict()})
+    if market_data.on_violation == "reject":
+        if trace is not None:
+            trace.finish("rejected")
+        raise HTTPException(status_code=409, detail=f"❌ Quote-Check fehlgeschlagen: {verdict.detail}")
+    return verdict
+
 @app.get("/reset_orders")
 async def reset_orders():
-    print("Storniere alle offenen Orders...")   
+    require_services()
+    log.warning("Storniere alle offenen Orders...")   
     ib.reqGlobalCancel()
     return {"status": "Remaining orders: " + str(ib.pendingTickers())}
 
 @app.get("/trade_logs")
-async def get_trade_logs():
-    """Endpoint zum Abrufen der gespeicherten Trade-Logs."""
-    return {"trade_logs": trade_logs}
+async def get_trade_logs(request: Request, response: Response, since: int = None, start: str = None, end: str = None,
+                         symbol: str = None, timeframe: str = None, before: int = None, limit: int = 1000):
+    """
+    Endpoint zum Abrufen der gespeicherten Trade-Logs.
+    since liefert nur Einträge mit seq > since (inkrementelles Polling), before blättert rückwärts.
+    Zeitraum (ISO start/end), Symbol und Timeframe filtern. Antwortet mit 304, solange
+    If-None-Match dem aktuellen ETag (letzte seq) entspricht.
+    """
+    etag = f'"{trade_journal.last_seq}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    logs = await trade_journal.query(start=start, end=end, symbol=symbol, timeframe=timeframe,
+                                     after=since, before=before, limit=max(1, min(limit, 5000)))
+    response.headers["ETag"] = etag
+    return {"trade_logs": logs, "last_seq": trade_journal.last_seq}
 
 
+@app.get("/history/{symbol}")
+async def get_history(symbol: str, bar_size: str = "1 min", start: str = None, end: str = None, days: float = 1):
+    """
+    Historische Bars eines Symbols (ISO start/end, sonst die letzten days Tage).
+    Nur noch nicht geladene Zeiträume werden bei IB angefragt.
+    """
+    require_services()
+    contract, _ = await resolve_instrument(symbol)
+    try:
+        end_time = datetime.fromisoformat(end).timestamp() if end else None
+        start_time = datetime.fromisoformat(start).timestamp() if start else \
+            (end_time or time.time()) - days * 86400
+        bars = await bar_store.fetch(contract, bar_size, start_time, end_time)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"❌ {e}")
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=f"❌ {e}")
+    return {"contract": bar_store.key(contract), "barSize": bar_size,
+            "bars": {name: getattr(bars, name).tolist() for name in ("time", "open", "high", "low", "close")}}
+
+
+@app.get("/quotes")
+async def get_quotes():
+    """Letzte Quote je abonniertem Kontrakt (Bid/Ask/Last, Alter in Sekunden, Anzahl Abonnenten)."""
+    require_services()
+    return {"quotes": market_data.quotes()}
+
+
+@app.get("/stats")
+async def get_stats():
+    """Endpoint mit Performance-Statistiken (gesamt, je Symbol und je Timeframe)."""
+    return {"stats": trade_stats.summary()}
+
+@app.get("/equity")
+async def get_equity(points: int = 500):
+    """Endpoint mit der kumulierten Gewinnkurve, per LTTB auf maximal points Punkte reduziert."""
+    return {"equity": trade_stats.equity(max(2, min(points, 5000))), "trades": trade_stats.total.trades}
+
+@app.get("/events")
+async def events():
+    """Server-Sent Events Stream mit connection-, trade-, bracket- und config-Updates."""
+    snapshot = [("connection", connection_state()), ("config", config.config),
+                ("stats", trade_stats.total.summary())]
+    if bracket_supervisor is not None:
+        snapshot += [("bracket", b) for b in bracket_supervisor.list()
+                     if b["status"] in bracket_supervisor.ACTIVE_STATES]
+    return StreamingResponse(
+        event_bus.stream(snapshot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus-Metriken: Latenz je Stage, Alert-to-Fill, Submit-to-Ack und Zähler."""
+    return Response(content=alert_metrics.render(), media_type=MetricsRegistry.CONTENT_TYPE)
+
+@app.get("/health")
+async def health():
+    """Antwortet, sobald der Listener läuft; status "ready" nur nach Prewarm und solange IB verbunden ist."""
+    if services_ready.is_set():
+        status = "ready" if ib.isConnected() else "disconnected"
+    else:
+        status = "failed" if "failed" in startup.milestones else "starting"
+    return {"status": status, "uptimeMs": round(startup.elapsed()),
+            "queued": intake.pending_count, **connection_state(), "startup": startup.summary()}
+
 @app.get("/connection_status")
 async def connection_status():
-    return {"connected": ib.isConnected()}
+    return connection_state()
 
 @app.get("/pending_orders")
 async def pending_orders():
+    require_services()
     return {"orders": ib.pendingTickers()}
 
 @app.get("/")
 async def pending_orders(request: Request):
-    return templates.TemplateResponse(
+    return dashboard_templates().TemplateResponse(
         "dashboard.html",
         {"request": request}
     )
@@ -338,7 +731,7 @@ async def pending_orders(request: Request):
 @app.get("/config")
 async def get_config():
     """Endpoint to fetch current configuration"""
-    return {"config": config.config}
+    return {"config": config.config, "version": config.version}
 
 @app.post("/config/update")
 async def update_config(updates: dict):
@@ -360,9 +753,11 @@ async def update_config(updates: dict):
         for path, value in updates.items():
             current_config = update_nested(current_config, path, value)
         
-        # Write to yaml file
-        with open(config.config_path, 'w') as f:
+        # Write to yaml file (atomar ersetzen, der Watcher sieht nie eine halb geschriebene Datei)
+        tmp_path = config.config_path + '.tmp'
+        with open(tmp_path, 'w') as f:
             yaml.dump(current_config, f, default_flow_style=False)
+        os.replace(tmp_path, config.config_path)
         
         return {"status": "success", "message": "Configuration updated"}
     except Exception as e:
@@ -376,10 +771,18 @@ async def favicon():
 # Add this route for the dashboard
 @app.get("/dashboard")
 async def dashboard(request: Request):
-    return templates.TemplateResponse(
+    return dashboard_templates().TemplateResponse(
         "dashboard.html",
         {"request": request}
     )
 
 if __name__ == '__main__':
-    uvicorn.run(app, host="127.0.0.1", port=8000, lifespan="on")
+    import argparse
+    import uvicorn
+    parser = argparse.ArgumentParser(description="TradingView -> IB bracket order bot")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="time every import and print the startup profile once the service is ready")
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port, lifespan="on")
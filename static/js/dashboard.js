@@ -50,6 +50,68 @@ function updateChartTheme(theme) {
 
 let profitChart;
 
+// Client-side trade state, only deltas are fetched from the server
+const TRADE_PAGE_SIZE = 1000;
+// Same size as the server's hot window (TradeJournal hot_window), older rows live in /trade_logs
+const MAX_TRADES = 500;
+let trades = [];
+let lastSeq = null;
+let tradeLogsEtag = null;
+let pendingTradeFetch = null;
+// SSE trades received before the first fetch has set lastSeq
+let bufferedTrades = [];
+
+function keepRecentTrades() {
+  if (trades.length > MAX_TRADES) trades.splice(0, trades.length - MAX_TRADES);
+}
+
+function fetchNewTrades() {
+  // Share one in-flight request so concurrent callers never apply a delta twice
+  if (!pendingTradeFetch) {
+    pendingTradeFetch = fetchTradeDeltas().finally(() => {
+      pendingTradeFetch = null;
+      // Replay buffered events, applyTrade drops the ones the fetch already returned
+      bufferedTrades.splice(0).forEach(applyTrade);
+    });
+  }
+  return pendingTradeFetch;
+}
+
+async function fetchTradeDeltas() {
+  let changed = false;
+  let firstPage = true;
+
+  while (true) {
+    const url =
+      lastSeq === null
+        ? `/trade_logs?limit=${TRADE_PAGE_SIZE}`
+        : `/trade_logs?since=${lastSeq}&limit=${TRADE_PAGE_SIZE}`;
+    // The ETag is the server's last seq, so it only applies to the first page
+    const headers =
+      firstPage && tradeLogsEtag ? { "If-None-Match": tradeLogsEtag } : {};
+    firstPage = false;
+    const response = await fetch(url, { headers, cache: "no-store" });
+
+    if (response.status === 304) break;
+
+    const data = await response.json();
+    tradeLogsEtag = response.headers.get("ETag");
+    trades.push(...data.trade_logs);
+    keepRecentTrades();
+    changed = changed || data.trade_logs.length > 0;
+
+    if (data.trade_logs.length > 0) {
+      lastSeq = data.trade_logs[data.trade_logs.length - 1].seq;
+    } else if (lastSeq === null) {
+      lastSeq = data.last_seq;
+    }
+    if (data.trade_logs.length < TRADE_PAGE_SIZE || lastSeq >= data.last_seq) {
+      break;
+    }
+  }
+  return changed;
+}
+
 async function updateDashboard() {
   try {
     // Update connection status
@@ -57,12 +119,12 @@ async function updateDashboard() {
     const connData = await connStatus.json();
     updateConnectionStatus(connData.connected);
 
-    // Update trade logs
-    const response = await fetch("/trade_logs");
-    const data = await response.json();
-    updateStats(data.trade_logs);
-    updateTradeTable(data.trade_logs);
-    updateProfitChart(data.trade_logs);
+    // Update trade logs (only new entries since the last poll)
+    if ((await fetchNewTrades()) || !profitChart) {
+      await updateStats();
+      updateTradeTable(trades);
+      await refreshEquity();
+    }
 
     // Update config
     await updateConfig();
@@ -84,21 +146,23 @@ function updateConnectionStatus(connected) {
   }
 }
 
-function updateStats(trades) {
-  const totalTrades = trades.length;
-  const profitableTrades = trades.filter((t) => t.result === "Profit").length;
-  const totalProfit = trades.reduce((sum, t) => sum + t.profit, 0);
-  const winRate = totalTrades
-    ? ((profitableTrades / totalTrades) * 100).toFixed(1)
-    : 0;
-
-  document.getElementById("totalTrades").textContent = totalTrades;
-  document.getElementById("winRate").textContent = `${winRate}%`;
-  document.getElementById("totalProfit").textContent = `$${totalProfit.toFixed(
+function renderStats(stats) {
+  // Aggregates are maintained server-side (/stats and "stats" events)
+  document.getElementById("totalTrades").textContent = stats.trades;
+  document.getElementById("winRate").textContent = `${stats.winRate.toFixed(
+    1
+  )}%`;
+  document.getElementById("totalProfit").textContent = `$${stats.netProfit.toFixed(
     2
   )}`;
 }
 
+async function updateStats() {
+  const response = await fetch("/stats");
+  const data = await response.json();
+  renderStats(data.stats);
+}
+
 function updateTradeTable(trades) {
   const tbody = document.getElementById("tradeTable");
   tbody.innerHTML = "";
@@ -127,7 +191,16 @@ function updateTradeTable(trades) {
         `;
     });
 }
-function updateProfitChart(trades) {
+const EQUITY_POINTS = 300;
+
+async function refreshEquity() {
+  // Server returns the cumulative curve already downsampled (LTTB)
+  const response = await fetch(`/equity?points=${EQUITY_POINTS}`);
+  const data = await response.json();
+  updateProfitChart(data.equity);
+}
+
+function updateProfitChart(points) {
   const ctx = document.getElementById("profitCanvas");
   const isDark = document.documentElement.getAttribute("data-theme") === "dark";
 
@@ -196,13 +269,8 @@ function updateProfitChart(trades) {
     });
   }
 
-  let cumulative = 0;
-  const data = trades.map((t) => {
-    cumulative += t.profit;
-    return cumulative;
-  });
-
-  const labels = trades.map((t) => new Date(t.timestamp).toLocaleTimeString());
+  const data = points.map((p) => p.equity);
+  const labels = points.map((p) => new Date(p.timestamp).toLocaleTimeString());
 
   profitChart.data.labels = labels;
   profitChart.data.datasets[0].data = data;
@@ -213,8 +281,14 @@ async function updateConfig() {
   try {
     const response = await fetch("/config");
     const data = await response.json();
-    const config = data.config;
+    renderConfig(data.config);
+  } catch (error) {
+    console.error("Error updating config:", error);
+  }
+}
 
+function renderConfig(config) {
+  try {
     // Update Order Settings
     const orderSettings = config.order_settings || {};
     const orderSettingsHtml = Object.entries(orderSettings)
@@ -241,7 +315,7 @@ async function updateConfig() {
       .join("");
     document.getElementById("overrideSettings").innerHTML = overridesHtml;
   } catch (error) {
-    console.error("Error updating config:", error);
+    console.error("Error rendering config:", error);
   }
 }
 
@@ -327,21 +401,96 @@ function formatKey(key) {
     .join(" ");
 }
 
-// Update dashboard every 5 seconds
-setInterval(updateDashboard, 5000);
-updateDashboard();
+function renderTrades() {
+  updateTradeTable(trades);
+  refreshEquity().catch((error) =>
+    console.error("Error updating equity curve:", error)
+  );
+}
+
+// Open brackets by id, kept current by "bracket" events
+const openBrackets = new Map();
+const ACTIVE_BRACKET_STATES = ["submitted", "working"];
+
+function applyBracket(bracket) {
+  if (ACTIVE_BRACKET_STATES.includes(bracket.status)) {
+    openBrackets.set(bracket.id, bracket);
+  } else {
+    openBrackets.delete(bracket.id);
+  }
+  document.getElementById("openBrackets").textContent = openBrackets.size;
+}
+
+function applyTrade(trade) {
+  if (lastSeq === null) {
+    // Initial fetch still running: it may already contain this entry
+    bufferedTrades.push(trade);
+    if (bufferedTrades.length > MAX_TRADES) bufferedTrades.shift();
+    return;
+  }
+  // Ignore entries already fetched through /trade_logs
+  if (trade.seq <= lastSeq) return;
+  if (trade.seq !== lastSeq + 1) {
+    // Gap in the stream, fetch the missing entries instead
+    fetchNewTrades().then(renderTrades);
+    return;
+  }
+  trades.push(trade);
+  keepRecentTrades();
+  lastSeq = trade.seq;
+  renderTrades();
+}
+
+function connectEvents() {
+  const source = new EventSource("/events");
+
+  source.addEventListener("open", async () => {
+    // (Re)connected: catch up on trades logged while the stream was down
+    await fetchNewTrades();
+    renderTrades();
+  });
+  source.addEventListener("connection", (e) =>
+    updateConnectionStatus(JSON.parse(e.data).connected)
+  );
+  source.addEventListener("trade", (e) => applyTrade(JSON.parse(e.data)));
+  source.addEventListener("stats", (e) => renderStats(JSON.parse(e.data)));
+  source.addEventListener("bracket", (e) => applyBracket(JSON.parse(e.data)));
+  source.addEventListener("config", (e) => renderConfig(JSON.parse(e.data)));
+  source.addEventListener("error", () =>
+    updateConnectionStatus(false)
+  );
+}
+
+// Push updates via Server-Sent Events, polling only as a fallback
+if (window.EventSource) {
+  connectEvents();
+} else {
+  setInterval(updateDashboard, 5000);
+  updateDashboard();
+}
 
 // Call initTheme when the document loads
 document.addEventListener("DOMContentLoaded", initTheme);
 
-document.getElementById("downloadLogs").addEventListener("click", async () => {
-  try {
-    // Fetch the trade logs
-    const response = await fetch("/trade_logs");
+// Full trade history for the export: the client-side `trades` only hold the recent window
+async function fetchAllTradeLogs() {
+  const pageSize = 5000; // server-side maximum of /trade_logs
+  const all = [];
+  let since = 0;
+  while (true) {
+    const response = await fetch(`/trade_logs?since=${since}&limit=${pageSize}`, { cache: "no-store" });
+    if (!response.ok) throw new Error(`/trade_logs answered ${response.status}`);
     const data = await response.json();
+    all.push(...data.trade_logs);
+    if (data.trade_logs.length < pageSize) return all;
+    since = data.trade_logs[data.trade_logs.length - 1].seq;
+  }
+}
 
+document.getElementById("downloadLogs").addEventListener("click", async () => {
+  try {
     // Convert to pretty-printed JSON
-    const jsonString = JSON.stringify(data.trade_logs, null, 2);
+    const jsonString = JSON.stringify(await fetchAllTradeLogs(), null, 2);
 
     // Create blob and download link
     const blob = new Blob([jsonString], { type: "application/json" });
@@ -0,0 +1,112 @@
+"""
+Offline backtest of the bracket orders place_bracket_order would submit.
+
+Replays the TradingView alert logs (CSV exports as in testing/forward) on
+historical bars (CSV or .npz, see app/services/backtester.py) with the
+order_settings of config.yaml and prints a summary; --out writes the trade
+records in the shape of the live trade log.
+
+Usage:
+    python testing/backtest.py --bars nq_1min.csv --tick-size 0.25 --multiplier 20
+    python testing/backtest.py --bars nq_1min.npz --out trades.json testing/forward/*/*.csv
+    python testing/backtest.py --synthetic 365                  # random-walk bars, a year of minutes
+    python testing/backtest.py --history NQZ5_12345             # bars cached by GET /history (data/bars)
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.core.settings import OrderSettings
+from app.services.backtester import AlertArrays, Bars, BracketBacktester, load_alerts
+from app.services.bar_store import BarStore
+from app.services.instrument_registry import InstrumentRegistry, InstrumentSpec
+
+
+def synthetic_bars(alerts, days, tick_size, bar_seconds=60, seed=None):
+    """Random-walk bars covering `days` before the last alert, passing through the alert limit prices."""
+    rng = np.random.default_rng(seed)
+    end = max(t.timestamp() for t, _ in alerts) + 86400
+    count = int(days * 86400 / bar_seconds)
+    times = end - bar_seconds * np.arange(count, 0, -1, dtype=np.float64)
+    walk = np.cumsum(rng.normal(0, 8 * tick_size, count))
+    # Walk so verbiegen, dass er zu jedem Alert-Zeitpunkt am Limitpreis steht
+    anchors = sorted((t.timestamp(), order.limitPrice) for t, order in alerts)
+    anchor_times, anchor_prices = np.array(anchors).T
+    correction = anchor_prices - np.interp(anchor_times, times, walk)
+    close = np.round((walk + np.interp(times, anchor_times, correction)) / tick_size) * tick_size
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(rng.normal(0, 4 * tick_size, (2, count)))
+    high = np.maximum(open_, close) + np.round(spread[0] / tick_size) * tick_size
+    low = np.minimum(open_, close) - np.round(spread[1] / tick_size) * tick_size
+    return Bars(times, open_, high, low, close)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("csv", nargs="*", help="TradingView alert log CSVs (default: testing/forward/*/*.csv)")
+    parser.add_argument("--bars", help="historical bars or ticks (.csv or .npz)")
+    parser.add_argument("--synthetic", type=float, metavar="DAYS", help="use random-walk 1-minute bars instead")
+    parser.add_argument("--history", metavar="CONTRACT", help="use bars from the local history cache (see --list)")
+    parser.add_argument("--bar-size", default="1 min", help="bar size for --history")
+    parser.add_argument("--list", action="store_true", help="list the contracts in the history cache")
+    parser.add_argument("--config", default=os.path.join(ROOT, "config.yaml"), help="config.yaml with order_settings")
+    parser.add_argument("--symbol", help="only alerts for this symbol (default: all)")
+    parser.add_argument("--tick-size", type=float, default=0.25, help="minimum tick of the instrument")
+    parser.add_argument("--multiplier", type=float, default=20, help="contract multiplier")
+    parser.add_argument("--sec-type", default="FUT", help="secType for the configured commission (FUT, STK)")
+    parser.add_argument("--out", help="write the trade records as JSON to this file")
+    parser.add_argument("--seed", type=int, help="seed for --synthetic")
+    args = parser.parse_args()
+
+    with open(args.config, encoding="utf-8") as f:
+        config = yaml.safe_load(f) or {}
+    store = BarStore()
+    store.configure(config.get("history"))
+    if args.list:
+        print("\n".join(store.keys()) or f"No bars in {store.root}")
+        return
+    if not args.bars and not args.synthetic and not args.history:
+        parser.error("--bars, --synthetic or --history is required")
+    settings = OrderSettings.from_config(config)
+    paths = args.csv or sorted(glob.glob(os.path.join(ROOT, "testing", "forward", "*", "*.csv")))
+    alerts = [a for a in load_alerts(paths) if not args.symbol or a[1].symbol == args.symbol]
+    if not alerts:
+        sys.exit("No alerts found")
+
+    registry = InstrumentRegistry(None)
+    registry.configure(config.get("instruments"))
+    symbol = args.symbol or alerts[0][1].symbol
+    spec = InstrumentSpec(symbol, args.sec_type, min_tick=args.tick_size, multiplier=args.multiplier,
+                          **registry.commission_schedule(symbol, args.sec_type))
+
+    started = time.perf_counter()
+    if args.synthetic:
+        bars = synthetic_bars(alerts, args.synthetic, args.tick_size, seed=args.seed)
+    elif args.history:
+        bars = store.load(args.history, args.bar_size)
+    else:
+        bars = Bars.load(args.bars)
+    loaded = time.perf_counter()
+    records, summary = BracketBacktester(bars, spec, settings).run(AlertArrays(alerts, spec))
+    finished = time.perf_counter()
+
+    print(f"{len(alerts)} alerts on {len(bars)} bars   load {loaded - started:.2f}s   "
+          f"simulate {finished - loaded:.3f}s")
+    for key, value in summary.items():
+        print(f"  {key:<14}{value}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"trade_logs": records, "summary": summary}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Parameter sweep over config.yaml's order_settings with the offline backtester.
+
+Every sweep option takes a comma list (20,40,60) or a range start:stop:step
+(stop inclusive). Fields that are not swept keep their value from --config.
+Results are ranked by --rank (default: net P&L, then drawdown, then win
+rate); --write stores the best combination as a config.yaml fragment.
+
+Usage:
+    python testing/optimize.py --synthetic 365 --stop-loss 20:80:10 --take-profit 40:200:20 --trail-amount 4:16:2
+    python testing/optimize.py --bars nq_1min.npz --stop-loss 20:80:5 --take-profit 40:200:10 \\
+        --trail-amount 2:20:1 --bracket-timeout 900,1800,3600 --random 5000 --write best.yaml
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.settings import OrderSettings
+from app.services.backtester import AlertArrays, Bars, load_alerts
+from app.services.instrument_registry import InstrumentRegistry, InstrumentSpec
+from app.services.optimizer import (RANK_METRICS, SWEEP_FIELDS, ParameterSweep, config_fragment,
+                                    parameter_grid, parameter_samples, rank)
+from backtest import synthetic_bars
+
+
+def parse_values(text):
+    """'20,40,60' or '20:80:10' (stop inclusive) -> list of numbers."""
+    if ":" in text:
+        start, stop, step = (float(part) for part in text.split(":"))
+        values = np.arange(start, stop + step / 2, step).round(10).tolist()
+    else:
+        values = [float(part) for part in text.split(",") if part.strip()]
+    return [int(v) if float(v).is_integer() else v for v in values]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("csv", nargs="*", help="TradingView alert log CSVs (default: testing/forward/*/*.csv)")
+    parser.add_argument("--bars", help="historical bars or ticks (.csv or .npz)")
+    parser.add_argument("--synthetic", type=float, metavar="DAYS", help="use random-walk 1-minute bars instead")
+    parser.add_argument("--seed", type=int, help="seed for --synthetic and --random")
+    parser.add_argument("--config", default=os.path.join(ROOT, "config.yaml"), help="config.yaml with order_settings")
+    parser.add_argument("--symbol", help="only alerts for this symbol (default: all)")
+    parser.add_argument("--tick-size", type=float, default=0.25, help="minimum tick of the instrument")
+    parser.add_argument("--multiplier", type=float, default=20, help="contract multiplier")
+    parser.add_argument("--sec-type", default="FUT", help="secType for the configured commission (FUT, STK)")
+    for name in SWEEP_FIELDS:
+        parser.add_argument("--" + name.replace("_", "-"), dest=name, type=parse_values, metavar="VALUES")
+    parser.add_argument("--random", type=int, metavar="N", help="random search: N combinations instead of the full grid")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--rank", default="netProfit,maxDrawdown,winRate",
+                        help=f"comma separated rank metrics, first wins ({', '.join(RANK_METRICS)})")
+    parser.add_argument("--min-trades", type=int, default=1, help="ignore combinations with fewer trades")
+    parser.add_argument("--top", type=int, default=10, help="print the best N combinations")
+    parser.add_argument("--write", metavar="FILE", help="write the best combination as config.yaml fragment")
+    args = parser.parse_args()
+    if not args.bars and not args.synthetic:
+        parser.error("--bars or --synthetic is required")
+    space = {name: getattr(args, name) for name in SWEEP_FIELDS if getattr(args, name)}
+    if not space:
+        parser.error("nothing to sweep, give at least one of " + ", ".join(
+            "--" + name.replace("_", "-") for name in SWEEP_FIELDS))
+
+    with open(args.config, encoding="utf-8") as f:
+        config = yaml.safe_load(f) or {}
+    settings = OrderSettings.from_config(config)
+    paths = args.csv or sorted(glob.glob(os.path.join(ROOT, "testing", "forward", "*", "*.csv")))
+    alerts = [a for a in load_alerts(paths) if not args.symbol or a[1].symbol == args.symbol]
+    if not alerts:
+        sys.exit("No alerts found")
+
+    registry = InstrumentRegistry(None)
+    registry.configure(config.get("instruments"))
+    symbol = args.symbol or alerts[0][1].symbol
+    spec = InstrumentSpec(symbol, args.sec_type, min_tick=args.tick_size, multiplier=args.multiplier,
+                          **registry.commission_schedule(symbol, args.sec_type))
+    bars = synthetic_bars(alerts, args.synthetic, args.tick_size, seed=args.seed) if args.synthetic \
+        else Bars.load(args.bars)
+
+    combinations = parameter_samples(space, args.random, args.seed) if args.random else parameter_grid(space)
+    sweep = ParameterSweep(bars, AlertArrays(alerts, spec), spec, settings, workers=args.workers)
+    print(f"{len(combinations)} combinations x {len(alerts)} alerts on {len(bars)} bars, {sweep.workers} workers")
+
+    started = time.perf_counter()
+    step = max(1, len(combinations) // 20)
+
+    def progress(done, total):
+        if done == total or done // step != (done - 1) // step:
+            elapsed = time.perf_counter() - started
+            print(f"\r  {done}/{total}  {elapsed:.1f}s  {done / elapsed:.0f}/s", end="", flush=True)
+
+    results = sweep.run(combinations, progress)
+    print()
+    ranked = rank(results, by=[m.strip() for m in args.rank.split(",") if m.strip()], min_trades=args.min_trades)
+    if not ranked:
+        sys.exit("No combination with enough trades")
+
+    for params, summary in ranked[:args.top]:
+        swept = " ".join(f"{name}={value:g}" for name, value in params.items())
+        print(f"  {swept:<60} net {summary['netProfit']:>10.2f}  dd {summary['maxDrawdown']:>9.2f}  "
+              f"win {summary['winRate']:.2%}  trades {summary['trades']}")
+
+    fragment = yaml.safe_dump(config_fragment(ranked[0][0], settings), sort_keys=False)
+    print("\nBest settings:\n" + fragment)
+    if args.write:
+        with open(args.write, "w", encoding="utf-8") as f:
+            f.write(fragment)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+End-to-end replay benchmark for the /webhook order path.
+
+Replays the TradingView alert logs (CSV exports as in testing/forward) against
+main.py's FastAPI app in-process, with a stand-in broker instead of TWS, and
+reports latency percentiles per stage:
+
+    request -> contract resolved -> parent placed -> children placed -> acknowledged
+
+Usage:
+    python testing/replay_benchmark.py testing/forward/05-03-2025/*.csv --speed 60
+    python testing/replay_benchmark.py <csv> --speed 0 --repeat 20     # as fast as possible
+    python testing/replay_benchmark.py <csv> --find-max-rate           # max sustainable alerts/s
+    python testing/replay_benchmark.py <csv> --gateway                 # over a real socket (tws_gateway.py)
+    python testing/replay_benchmark.py <csv> --batch 8                 # groups of 8 alerts via /webhook/batch
+"""
+import argparse
+import asyncio
+import contextlib
+import contextvars
+import csv
+import glob
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+STAGES = [
+    ("request", "contract"),
+    ("contract", "parent_placed"),
+    ("parent_placed", "children_placed"),
+    ("children_placed", "ack"),
+    ("request", "ack"),
+]
+
+current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+def load_alerts(paths):
+    """Parse TradingView alert log CSVs. Returns [(datetime, payload dict)] sorted by time."""
+    alerts = []
+    for path in paths:
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                payload = json.loads(row["Beschreibung"])
+                timestamp = datetime.fromisoformat(row["Zeit"].replace("Z", "+00:00"))
+                alerts.append((timestamp, payload))
+    alerts.sort(key=lambda a: a[0])
+    return alerts
+
+
+class GatewayClient:
+    """Leaves main.ib untouched but points it at an in-process TwsGateway."""
+
+    def __init__(self, gateway):
+        self.gateway = gateway
+        self.on_place = None
+
+    def install(self, ib):
+        connect, place = ib.connectAsync, ib.placeOrder
+
+        async def connectAsync(host='127.0.0.1', port=7497, *args, **kwargs):
+            return await connect(self.gateway.host, self.gateway.port, *args, **kwargs)
+
+        def placeOrder(contract, order):
+            trade = place(contract, order)
+            if self.on_place:
+                self.on_place(trade)
+            return trade
+
+        ib.connectAsync = connectAsync
+        ib.placeOrder = placeOrder
+        return self
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+class Replay:
+    """Runs main.app in-process with the stand-in broker and records per-stage timestamps."""
+
+    def __init__(self, broker, verbose=False, batch=1):
+        self.broker = broker
+        self.verbose = verbose
+        self.batch = batch
+        self.traces = []
+        self.out = sys.stdout  # the app's own output is suppressed unless verbose
+
+    @contextlib.asynccontextmanager
+    async def running(self, journal_path):
+        os.chdir(ROOT)
+        with self._app_output():
+            import main
+        import httpx
+
+        self.main = main
+        # App-Logs nur mit --verbose (Konsole), nie in die Logdatei des Bots
+        main.setup_logging({"file": None, "console": "text" if self.verbose else None})
+        main.build_services()
+        for ib in main.ib_pool.clients():
+            self.broker.install(ib)
+        self.broker.on_place = self._on_place
+        main.trade_journal.path = journal_path
+        main.intake.path = os.path.join(os.path.dirname(journal_path), "intake.jsonl")
+
+        resolve = main.contract_resolver.resolve
+
+        async def timed_resolve(symbol):
+            contract = await resolve(symbol)
+            self._mark("contract")
+            return contract
+
+        main.contract_resolver.resolve = timed_resolve
+
+        with self._app_output():
+            async with main.lifespan(main.app):
+                await main.services_ready.wait()
+                transport = httpx.ASGITransport(app=main.app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://replay") as client:
+                    self.client = client
+                    yield self
+
+    def _app_output(self):
+        return contextlib.nullcontext() if self.verbose else contextlib.redirect_stdout(io.StringIO())
+
+    def _mark(self, stage, first=False):
+        trace = current_trace.get()
+        if trace is not None and not (first and stage in trace):
+            trace[stage] = time.perf_counter()
+
+    def _on_place(self, trade):
+        # Batch: erste Parent-Order bzw. letzte Child-Order (time-to-last-order)
+        if trade.order.parentId:
+            self._mark("children_placed")
+        else:
+            self._mark("parent_placed", first=True)
+
+    async def send(self, payload, key):
+        trace = {"request": time.perf_counter()}
+        current_trace.set(trace)
+        # Eigener Idempotenz-Schlüssel je Sendung, sonst würden Wiederholungen als Duplikate verworfen
+        response = await self.client.post("/webhook", json=payload, headers={"Idempotency-Key": key})
+        trace["ack"] = time.perf_counter()
+        trace["status"] = response.status_code
+        self.traces.append(trace)
+        return trace
+
+    async def send_batch(self, payloads, key):
+        trace = {"request": time.perf_counter(), "alerts": len(payloads)}
+        current_trace.set(trace)
+        response = await self.client.post("/webhook/batch", json=payloads, headers={"Idempotency-Key": key})
+        trace["ack"] = time.perf_counter()
+        trace["status"] = response.status_code
+        self.traces.append(trace)
+        return trace
+
+    async def replay(self, alerts, speed, repeat=1):
+        """Send all alerts, paced by their original spacing divided by speed (0 = no pacing)."""
+        tasks = []
+        start = time.perf_counter()
+        first = alerts[0][0]
+        for r in range(repeat):
+            offset = r * ((alerts[-1][0] - first).total_seconds() + 1)
+            for i in range(0, len(alerts), self.batch):
+                chunk = alerts[i:i + self.batch]
+                if speed > 0:
+                    due = start + ((chunk[0][0] - first).total_seconds() + offset) / speed
+                    await asyncio.sleep(max(0.0, due - time.perf_counter()))
+                if self.batch > 1:
+                    send = self.send_batch([payload for _, payload in chunk], f"replay-{r}-{i}")
+                else:
+                    send = self.send(chunk[0][1], f"replay-{r}-{i}")
+                tasks.append(asyncio.create_task(send))
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - start
+
+    async def fixed_rate(self, alerts, rate, count):
+        """Open-loop load: send count alerts at a fixed rate. Returns (traces, elapsed)."""
+        self.traces = []
+        tasks = []
+        start = time.perf_counter()
+        for i in range(count):
+            await asyncio.sleep(max(0.0, start + i / rate - time.perf_counter()))
+            tasks.append(asyncio.create_task(self.send(alerts[i % len(alerts)][1], f"rate-{rate}-{i}")))
+        await asyncio.gather(*tasks)
+        return self.traces, time.perf_counter() - start
+
+
+def report(traces, elapsed, out=sys.stdout):
+    ok = [t for t in traces if 200 <= t.get("status", 0) < 300]
+    sent = sum(t.get("alerts", 1) for t in traces)
+    print(f"\nAlerts sent: {sent} in {len(traces)} requests   accepted: {sum(t.get('alerts', 1) for t in ok)}   "
+          f"elapsed: {elapsed:.2f}s   throughput: {sent / elapsed:.1f} alerts/s", file=out)
+    print(f"{'stage':<36}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}   (ms)", file=out)
+    result = {}
+    for a, b in STAGES:
+        values = [(t[b] - t[a]) * 1000 for t in ok if a in t and b in t]
+        row = {q: percentile(values, q) for q in (50, 90, 99)}
+        row["max"] = max(values) if values else float("nan")
+        result[f"{a}->{b}"] = row
+        print(f"{a + ' -> ' + b:<36}{row[50]:>10.2f}{row[90]:>10.2f}{row[99]:>10.2f}{row['max']:>10.2f}", file=out)
+    return result
+
+
+async def find_max_rate(replay, alerts, slo_ms, count, start_rate=10.0, out=sys.stdout):
+    """Double the alert rate until p99 ack latency exceeds slo_ms or throughput falls behind."""
+    rate, best = start_rate, None
+    while rate <= 100000:
+        traces, elapsed = await replay.fixed_rate(alerts, rate, count)
+        p99 = percentile([(t["ack"] - t["request"]) * 1000 for t in traces], 99)
+        achieved = len(traces) / elapsed
+        sustained = p99 <= slo_ms and achieved >= 0.9 * rate and all(t["status"] == 202 for t in traces)
+        print(f"rate {rate:>8.0f}/s   achieved {achieved:>8.1f}/s   p99 ack {p99:>8.2f} ms   "
+              f"{'ok' if sustained else 'saturated'}", file=out)
+        if not sustained:
+            break
+        best = rate
+        rate *= 2
+    return best
+
+
+async def run(args):
+    from stub_broker import StubBroker
+    from tws_gateway import TwsGateway
+
+    alerts = load_alerts(args.csv)
+    if not alerts:
+        sys.exit("No alerts found")
+    print(f"Loaded {len(alerts)} alerts from {len(args.csv)} file(s)")
+
+    if args.gateway:
+        gateway = await TwsGateway(port=0, fill_latency=args.fill_latency, exit_latency=args.exit_latency,
+                                   partial_fills=args.partial_fills).start()
+        broker = GatewayClient(gateway)
+    else:
+        gateway = None
+        broker = StubBroker(fill_latency=args.fill_latency, exit_latency=args.exit_latency)
+    try:
+        await _run(args, alerts, broker)
+    finally:
+        if gateway:
+            await gateway.close()
+
+
+async def _run(args, alerts, broker):
+    with tempfile.TemporaryDirectory() as tmp:
+        async with Replay(broker, args.verbose, args.batch).running(os.path.join(tmp, "journal.db")) as replay:
+            if args.find_max_rate:
+                best = await find_max_rate(replay, alerts, args.slo_ms, args.count, out=replay.out)
+                print(f"\nMax sustainable alert rate: {best or 0:.0f} alerts/s (p99 ack <= {args.slo_ms} ms)",
+                      file=replay.out)
+                return
+            elapsed = await replay.replay(alerts, args.speed, args.repeat)
+            result = report(replay.traces, elapsed, out=replay.out)
+            if isinstance(broker, GatewayClient):
+                # Über den echten Socket laufen die Orders durch den Pacer (IB-Limit 50 Messages/s)
+                pacer = replay.main.ib_pool.pacer()
+                started = time.perf_counter()
+                while pacer.depth():
+                    await asyncio.sleep(0.01)
+                stats = pacer.stats()
+                print(f"IB pacing (orders): {sum(stats['sent'].values())} messages, queue drained "
+                      f"{(time.perf_counter() - started) * 1000:.0f} ms after the last ack, "
+                      f"max wait {stats['maxWaitMs']:.0f} ms", file=replay.out)
+            if args.json:
+                with open(args.json, "w") as f:
+                    json.dump({"alerts": len(replay.traces), "elapsed": elapsed, "stages": result}, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("csv", nargs="*", help="TradingView alert log CSVs (default: testing/forward/*/*.csv)")
+    parser.add_argument("--speed", type=float, default=0, help="replay speed factor, 0 = as fast as possible")
+    parser.add_argument("--repeat", type=int, default=1, help="replay the alert set this many times")
+    parser.add_argument("--fill-latency", type=float, default=0.05, help="stand-in broker entry fill latency (s)")
+    parser.add_argument("--exit-latency", type=float, default=0.2, help="stand-in broker exit fill latency (s)")
+    parser.add_argument("--gateway", action="store_true", help="use the TWS socket stand-in instead of patching IB")
+    parser.add_argument("--partial-fills", type=int, default=1, help="executions per fill (--gateway only)")
+    parser.add_argument("--batch", type=int, default=1, help="send this many alerts per /webhook/batch request")
+    parser.add_argument("--find-max-rate", action="store_true", help="search the max sustainable alert rate")
+    parser.add_argument("--slo-ms", type=float, default=100.0, help="p99 ack latency limit for --find-max-rate")
+    parser.add_argument("--count", type=int, default=200, help="alerts per rate step for --find-max-rate")
+    parser.add_argument("--json", help="write the stage percentiles to this file")
+    parser.add_argument("--verbose", action="store_true", help="show the app's own output")
+    args = parser.parse_args()
+    args.csv = args.csv or sorted(glob.glob(os.path.join(ROOT, "testing", "forward", "*", "*.csv")))
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Cold-start budget of main.py: time from process start until the HTTP
+listener accepts alerts (GET /health answers) and until the service is
+ready (IB connected, contracts prewarmed, queued alerts placed).
+
+Starts main.py with --profile-startup as a subprocess, polls /health and
+prints the startup profile (phases and slowest imports) the service
+reports. Only GET /health is sent, no alerts - safe next to a live TWS.
+
+Usage:
+    python testing/startup_time.py
+    python testing/startup_time.py --runs 5 --budget 300     # exit code 1 if accepting takes longer
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def health(port):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=0.5) as response:
+            return json.load(response)
+    except (urllib.error.URLError, ConnectionError, TimeoutError, ValueError):
+        return None
+
+
+def measure(ready_timeout, verbose=False):
+    """One cold start. Returns (accepting s, ready s or None, last /health body)."""
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, "main.py"), "--port", str(port),
+                                "--profile-startup"], cwd=ROOT,
+                               stdout=None if verbose else subprocess.DEVNULL,
+                               stderr=None if verbose else subprocess.DEVNULL)
+    accepting = ready = None
+    body = None
+    try:
+        while time.perf_counter() - started < ready_timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"main.py exited with code {process.returncode}")
+            body = health(port)
+            now = time.perf_counter() - started
+            if body is not None:
+                accepting = accepting or now
+                if body["status"] != "starting":
+                    ready = now if body["status"] == "ready" else None
+                    break
+            time.sleep(0.005)
+    finally:
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return accepting, ready, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="cold starts to measure")
+    parser.add_argument("--budget", type=float, metavar="MS", help="fail if the median time to accepting exceeds this")
+    parser.add_argument("--ready-timeout", type=float, default=60, help="seconds to wait for ready")
+    parser.add_argument("--verbose", action="store_true", help="show main.py's output")
+    args = parser.parse_args()
+
+    accepting, ready, body = [], [], None
+    for run in range(args.runs):
+        a, r, body = measure(args.ready_timeout, args.verbose)
+        if a is None:
+            sys.exit(f"run {run + 1}: /health never answered")
+        accepting.append(a * 1000)
+        if r is not None:
+            ready.append(r * 1000)
+        print(f"run {run + 1}: accepting after {a * 1000:.0f} ms, "
+              + (f"ready after {r * 1000:.0f} ms" if r is not None else f"status {body['status']}"))
+
+    median = statistics.median(accepting)
+    print(f"\naccepting: median {median:.0f} ms, max {max(accepting):.0f} ms"
+          + (f"   ready: median {statistics.median(ready):.0f} ms" if ready else ""))
+    if body:
+        profile = body.get("startup", {})
+        print("\nmilestones (ms since process start, last run): "
+              + ", ".join(f"{k} {v:.0f}" for k, v in profile.get("milestones", {}).items()))
+        for phase in profile.get("phases", []):
+            print(f"  {phase['name']:<28}{phase['startMs']:>10.1f}{phase['ms']:>10.1f}")
+        for item in profile.get("imports", [])[:10]:
+            print(f"  {item['module']:<44}{item['selfMs']:>10.1f}{item['cumulativeMs']:>12.1f}")
+    if args.budget is not None and median > args.budget:
+        sys.exit(f"over budget: {median:.0f} ms > {args.budget:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+In-process stand-in for Interactive Brokers.
+
+Replaces the network-facing methods of an ib_insync IB instance so the order
+path in main.py can run without TWS: contract details come from a fixed
+futures chain, placed orders get client-side order IDs and are filled after a
+configurable latency at their limit price. Status changes are emitted through
+the same Trade.statusEvent / IB.orderStatusEvent as a real connection.
+"""
+import asyncio
+import datetime
+import itertools
+import zlib
+from ib_insync import ContractDetails, Future, OrderStatus, PriceIncrement, Ticker, Trade, TradeLogEntry
+
+# Multiplier und Tick-Größe der gängigen CME-Index-Futures
+FUTURES_SPECS = {
+    "NQ": ("20", 0.25),
+    "MNQ": ("2", 0.25),
+    "ES": ("50", 0.25),
+    "MES": ("5", 0.25),
+}
+
+# Market Rules (Preisraster) je ID, wie von reqMarketRule geliefert
+MARKET_RULES = {
+    1: [PriceIncrement(lowEdge=0.0, increment=0.25)],
+    2: [PriceIncrement(lowEdge=0.0, increment=0.01)],
+}
+
+
+def futures_chain(symbol, exchange="CME", currency="USD"):
+    """ContractDetails of the quarterly contracts of the next two years, expiring on the third Friday."""
+    multiplier, min_tick = FUTURES_SPECS.get(symbol, ("1", 0.01))
+    rule_id = next(i for i, rule in MARKET_RULES.items() if rule[0].increment == min_tick)
+    today = datetime.date.today()
+    details = []
+    for year in (today.year, today.year + 1):
+        for month in (3, 6, 9, 12):
+            first = datetime.date(year, month, 1)
+            expiry = first + datetime.timedelta(days=(4 - first.weekday()) % 7 + 14)
+            details.append(ContractDetails(contract=Future(
+                conId=zlib.crc32(f"{symbol}{year}{month:02d}".encode()) & 0x7FFFFFFF,
+                symbol=symbol,
+                lastTradeDateOrContractMonth=expiry.strftime("%Y%m%d"),
+                localSymbol=f"{symbol}{'HMUZ'[month // 3 - 1]}{year % 10}",
+                exchange=exchange, currency=currency, multiplier=multiplier,
+                tradingClass=symbol,
+            ), minTick=min_tick, priceMagnifier=1, contractMonth=f"{year}{month:02d}",
+                longName=f"{symbol} {year}{month:02d}", timeZoneId="US/Central",
+                validExchanges=exchange, marketRuleIds=str(rule_id)))
+    return details
+
+
+class StubBroker:
+    def __init__(self, fill_latency=0.05, exit_latency=0.2, take_profit_wins=True):
+        self.fill_latency = fill_latency
+        self.exit_latency = exit_latency
+        self.take_profit_wins = take_profit_wins
+        self.ib = None
+        self.trades = {}
+        self.tickers = {}   # conId -> Ticker, ohne Updates bis quote()
+        self.on_place = None  # optional callback(trade) for instrumentation
+        self._ids = itertools.count(1)
+
+    def install(self, ib):
+        """
+        Patch an IB instance so that all broker traffic is served locally.
+        Can be called for every client of a connection pool; order events are
+        emitted on the first installed instance (the orders connection).
+        """
+        self.ib = self.ib or ib
+        state = {"connected": False}
+
+        async def connectAsync(*args, **kwargs):
+            state["connected"] = True
+            ib.connectedEvent.emit()
+            return ib
+
+        def disconnect():
+            if state["connected"]:
+                state["connected"] = False
+                ib.disconnectedEvent.emit()
+
+        ib.connectAsync = connectAsync
+        ib.isConnected = lambda: state["connected"]
+        ib.disconnect = disconnect
+        ib.placeOrder = self.placeOrder
+        ib.client.getReqId = lambda: next(self._ids)
+        ib.cancelOrder = self.cancelOrder
+        ib.reqGlobalCancel = lambda: [self.cancelOrder(t.order) for t in list(self.trades.values())]
+        ib.reqContractDetailsAsync = self.reqContractDetailsAsync
+        ib.reqMarketRuleAsync = self.reqMarketRuleAsync
+        ib.reqAllOpenOrdersAsync = self.reqAllOpenOrdersAsync
+        ib.reqExecutionsAsync = self.reqExecutionsAsync
+        ib.reqPositionsAsync = self.reqPositionsAsync
+        ib.reqMarketDataType = lambda marketDataType: None
+        ib.reqMktData = lambda contract, *args, **kwargs: self.tickers.setdefault(contract.conId, Ticker(contract=contract))
+        ib.cancelMktData = lambda contract: self.tickers.pop(contract.conId, None)
+        return self
+
+    def quote(self, ib, contract, bid, ask, last=None):
+        """Publish a quote for a subscribed contract on the given client (market_data connection)."""
+        ticker = self.tickers.get(contract.conId)
+        if ticker is not None:
+            ticker.bid, ticker.ask, ticker.last = bid, ask, last if last is not None else bid
+            ib.pendingTickersEvent.emit({ticker})
+
+    async def reqContractDetailsAsync(self, contract):
+        return futures_chain(contract.symbol, contract.exchange, contract.currency)
+
+    async def reqMarketRuleAsync(self, marketRuleId):
+        return MARKET_RULES.get(marketRuleId, [])
+
+    async def reqAllOpenOrdersAsync(self):
+        return [t for t in self.trades.values() if not t.isDone()]
+
+    async def reqExecutionsAsync(self, execFilter=None):
+        return []   # der Stub startet ohne Historie
+
+    async def reqPositionsAsync(self):
+        return []
+
+    def placeOrder(self, contract, order):
+        order.orderId = order.orderId or next(self._ids)
+        status = OrderStatus(orderId=order.orderId, status=OrderStatus.PendingSubmit, remaining=order.totalQuantity)
+        trade = Trade(contract, order, status, [], [TradeLogEntry(datetime.datetime.now(datetime.timezone.utc), status.status)])
+        self.trades[order.orderId] = trade
+        if self.on_place:
+            self.on_place(trade)
+
+        if order.transmit:
+            # Die Gruppe wird mit der letzten Order (transmit=True) aktiviert
+            group = [t for t in self.trades.values()
+                     if t.order.orderId == order.parentId or (order.parentId and t.order.parentId == order.parentId)]
+            for t in group or [trade]:
+                self._set_status(t, OrderStatus.Submitted)
+            parent = self.trades.get(order.parentId, trade)
+            asyncio.get_running_loop().call_later(self.fill_latency, self._fill_parent, parent)
+        else:
+            self._set_status(trade, OrderStatus.PreSubmitted)
+        return trade
+
+    def cancelOrder(self, order):
+        trade = self.trades.get(order.orderId)
+        if trade and not trade.isDone():
+            self._set_status(trade, OrderStatus.Cancelled)
+        return trade
+
+    def _fill_parent(self, parent):
+        if parent.isDone():
+            return
+        self._fill(parent)
+        children = [t for t in self.trades.values() if t.order.parentId == parent.order.orderId]
+        if children:
+            asyncio.get_running_loop().call_later(self.exit_latency, self._fill_exit, children)
+
+    def _fill_exit(self, children):
+        winner_type = "LMT" if self.take_profit_wins else "TRAIL LIMIT"
+        winner = next((t for t in children if t.order.orderType == winner_type), children[0])
+        self._fill(winner)
+        for t in children:
+            if t is not winner and not t.isDone():
+                self._set_status(t, OrderStatus.Cancelled)
+
+    def _fill(self, trade):
+        order = trade.order
+        price = order.lmtPrice if order.orderType == "LMT" else order.trailStopPrice
+        trade.orderStatus.filled = order.totalQuantity
+        trade.orderStatus.remaining = 0
+        trade.orderStatus.avgFillPrice = price
+        trade.orderStatus.lastFillPrice = price
+        self._set_status(trade, OrderStatus.Filled)
+
+    def _set_status(self, trade, status):
+        trade.orderStatus.status = status
+        trade.log.append(TradeLogEntry(datetime.datetime.now(datetime.timezone.utc), status))
+        trade.statusEvent.emit(trade)
+        self.ib.orderStatusEvent.emit(trade)
+        if status == OrderStatus.Filled:
+            trade.filledEvent.emit(trade)
+        elif status == OrderStatus.Cancelled:
+            trade.cancelledEvent.emit(trade)
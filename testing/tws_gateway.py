@@ -0,0 +1,717 @@
+"""
+Local stand-in for TWS / IB Gateway.
+
+Speaks enough of the TWS API socket protocol for ib_insync's IB.connectAsync
+to connect and synchronize, so main.py and app/core/connection.py can run
+against it unchanged on any machine:
+
+    handshake, startApi, nextValidId, managedAccounts, reqIds, reqCurrentTime,
+    reqPositions, reqOpenOrders / reqAllOpenOrders, reqCompletedOrders,
+    reqAccountUpdates(Multi), reqExecutions, reqContractDetails, reqMarketRule,
+    placeOrder, cancelOrder, reqGlobalCancel
+
+Orders are kept per (clientId, orderId) and outlive the client connection like
+in TWS. A transmitted parent is filled after --fill-latency at its limit price
+(optionally in --partial-fills executions), its children are activated and
+after --exit-latency either the take profit or the trailing stop fills and the
+sibling is cancelled (or, in an OCA group of type 2/3, reduced by the filled
+quantity and filled after another --exit-latency). Every fill produces execDetails, orderStatus and a
+commissionReport. --disconnect-every drops all clients periodically and
+refuses new connections for --downtime seconds to exercise reconnect logic.
+
+Usage:
+    python testing/tws_gateway.py                       # listens on 127.0.0.1:7497
+    python testing/tws_gateway.py --fill-latency 0.2 --partial-fills 3
+    python testing/tws_gateway.py --disconnect-every 30 --downtime 5
+"""
+import argparse
+import asyncio
+import itertools
+import math
+import random
+import struct
+import sys
+import time
+from datetime import datetime, timezone
+
+from ib_insync import Contract, Order
+from ib_insync.util import UNSET_DOUBLE, UNSET_INTEGER
+
+from stub_broker import MARKET_RULES, futures_chain
+
+SERVER_VERSION = 157
+
+# Nachrichten-IDs (eingehend)
+REQ_MKT_DATA = 1
+CANCEL_MKT_DATA = 2
+REQ_MKT_DATA_TYPE = 59
+PLACE_ORDER = 3
+CANCEL_ORDER = 4
+REQ_OPEN_ORDERS = 5
+REQ_ACCOUNT_UPDATES = 6
+REQ_EXECUTIONS = 7
+REQ_IDS = 8
+REQ_CONTRACT_DETAILS = 9
+REQ_ALL_OPEN_ORDERS = 16
+REQ_MANAGED_ACCTS = 17
+REQ_CURRENT_TIME = 49
+REQ_GLOBAL_CANCEL = 58
+REQ_POSITIONS = 61
+START_API = 71
+REQ_ACCOUNT_UPDATES_MULTI = 76
+REQ_MARKET_RULE = 91
+REQ_COMPLETED_ORDERS = 99
+
+ACTIVE = ("PreSubmitted", "Submitted")
+
+
+class _Fields:
+    """Sequential reader over the fields of one incoming message."""
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.pos = 0
+
+    def str(self):
+        value = self.fields[self.pos]
+        self.pos += 1
+        return value
+
+    def int(self):
+        value = self.str()
+        return int(value) if value else 0
+
+    def float(self):
+        value = self.str()
+        if not value:
+            return UNSET_DOUBLE
+        return math.inf if value == "Infinite" else float(value)
+
+    def bool(self):
+        return self.int() != 0
+
+    def skip(self, n):
+        self.pos += n
+
+
+def parse_contract(r):
+    contract = Contract(
+        conId=r.int(), symbol=r.str(), secType=r.str(), lastTradeDateOrContractMonth=r.str(), strike=r.float(),
+        right=r.str(), multiplier=r.str(), exchange=r.str(), primaryExchange=r.str(), currency=r.str(),
+        localSymbol=r.str(), tradingClass=r.str())
+    if contract.strike == UNSET_DOUBLE:
+        contract.strike = 0.0
+    return contract
+
+
+def parse_place_order(fields):
+    """
+    Decode a placeOrder message (as sent by ib_insync's Client.placeOrder for
+    server version 157) into (contract, order). Only the fields the gateway
+    simulates are kept; combos and order conditions are not supported.
+    """
+    r = _Fields(fields)
+    r.skip(1)
+    order = Order(orderId=r.int())
+    contract = parse_contract(r)
+    if contract.secType == "BAG":
+        raise ValueError("combo orders are not supported")
+    r.skip(2)  # secIdType, secId
+    order.action = r.str()
+    order.totalQuantity = r.float()
+    order.orderType = r.str()
+    order.lmtPrice = r.float()
+    order.auxPrice = r.float()
+    order.tif = r.str()
+    order.ocaGroup = r.str()
+    order.account = r.str()
+    r.skip(2)  # openClose, origin
+    order.orderRef = r.str()
+    order.transmit = r.bool()
+    order.parentId = r.int()
+    r.skip(6)  # blockOrder .. hidden
+    r.skip(12)  # '', discretionaryAmt .. exemptCode
+    order.ocaType = r.int()
+    r.skip(17)  # rule80A .. volatilityType
+    if r.str():  # deltaNeutralOrderType
+        r.skip(9)
+    else:
+        r.skip(1)
+    r.skip(2)  # continuousUpdate, referencePriceType
+    order.trailStopPrice = r.float()
+    order.trailingPercent = r.float()
+    r.skip(2)  # scaleInitLevelSize, scaleSubsLevelSize
+    if 0 < r.float() < UNSET_DOUBLE:
+        r.skip(7)
+    r.skip(3)  # scaleTable, activeStartTime, activeStopTime
+    if r.str():  # hedgeType
+        r.skip(1)
+    r.skip(4)  # optOutSmartRouting, clearingAccount, clearingIntent, notHeld
+    if r.bool():  # deltaNeutralContract
+        r.skip(3)
+    if r.str():  # algoStrategy
+        r.skip(2 * r.int())
+    r.skip(1)  # algoId
+    order.whatIf = r.bool()
+    r.skip(4)  # orderMiscOptions, solicited, randomizeSize, randomizePrice
+    if order.orderType == "PEG BENCH":
+        r.skip(5)
+    if r.int():
+        raise ValueError("order conditions are not supported")
+    r.skip(2)  # adjustedOrderType, triggerPrice
+    order.lmtPriceOffset = r.float()
+    return contract, order
+
+
+def encode(*fields):
+    """Serialize fields into one length-prefixed API message."""
+    parts = []
+    for field in fields:
+        if field is None or (not isinstance(field, str) and field in (UNSET_INTEGER, UNSET_DOUBLE)):
+            parts.append("")
+        elif isinstance(field, bool):
+            parts.append("1" if field else "0")
+        elif field == math.inf:
+            parts.append("Infinite")
+        else:
+            parts.append(str(field))
+    payload = ("\0".join(parts) + "\0").encode()
+    return struct.pack(">I", len(payload)) + payload
+
+
+class GatewayOrder:
+    """Server-side state of one order."""
+
+    def __init__(self, client_id, perm_id, contract, order):
+        self.client_id = client_id
+        self.perm_id = perm_id
+        self.contract = contract
+        self.order = order
+        self.status = "PreSubmitted"
+        self.filled = 0.0
+        self.avg_price = 0.0
+        self.last_price = 0.0
+        self.scheduled = False       # Fill bzw. Exit bereits eingeplant
+
+    @property
+    def remaining(self):
+        return self.order.totalQuantity - self.filled
+
+    @property
+    def active(self):
+        return self.status in ACTIVE
+
+
+class Session:
+    """One API client connection."""
+
+    def __init__(self, gateway, reader, writer):
+        self.gateway = gateway
+        self.reader = reader
+        self.writer = writer
+        self.task = None
+        self.client_id = None
+        self.account_updates = False
+        self.positions = False
+
+    def send(self, *fields):
+        if not self.writer.is_closing():
+            self.writer.write(encode(*fields))
+
+    def close(self):
+        if not self.writer.is_closing():
+            self.writer.close()
+
+    async def read_message(self):
+        size = struct.unpack(">I", await self.reader.readexactly(4))[0]
+        payload = await self.reader.readexactly(size)
+        return payload.decode(errors="replace").split("\0")[:-1]
+
+    async def run(self):
+        prefix = await self.reader.readexactly(4)
+        if prefix != b"API\0":
+            raise ConnectionError(f"unexpected handshake {prefix!r}")
+        await self.read_message()  # "v157..176" - Client-Versionen, wir antworten immer mit SERVER_VERSION
+        now = datetime.now(timezone.utc).strftime("%Y%m%d %H:%M:%S UTC")
+        self.send(SERVER_VERSION, now)
+        while True:
+            fields = await self.read_message()
+            if fields:
+                self.gateway.handle(self, fields)
+
+
+class TwsGateway:
+    """
+    Fake TWS: accepts API connections and simulates order execution.
+
+    All state lives on the event loop; fills are scheduled with call_later so
+    the configured latencies are observed without blocking other clients.
+    """
+
+    def __init__(self, host="127.0.0.1", port=7497, fill_latency=0.05, exit_latency=0.2, partial_fills=1,
+                 take_profit_ratio=0.5, commission=2.25, disconnect_every=None, downtime=0.0,
+                 account="DU1234567", seed=None, verbose=False):
+        self.host = host
+        self.port = port
+        self.fill_latency = fill_latency
+        self.exit_latency = exit_latency
+        self.partial_fills = max(1, partial_fills)
+        self.take_profit_ratio = take_profit_ratio
+        self.commission = commission
+        self.disconnect_every = disconnect_every
+        self.downtime = downtime
+        self.account = account
+        self.verbose = verbose
+        self.sessions = set()
+        self.orders = {}       # (clientId, orderId) -> GatewayOrder
+        self.executions = []   # (clientId, contract, execution fields, commission fields)
+        self.positions = {}    # conId -> [contract, position, avgCost]
+        self.next_ids = {}     # clientId -> next valid order id
+        self.last_price = {}   # conId -> letzter Fill-Preis
+        self._perm_ids = itertools.count(1000001)
+        self._exec_ids = itertools.count(1)
+        self._random = random.Random(seed)
+        self._down_until = 0.0
+        self._server = None
+        self._chaos_task = None
+        self._handlers = {
+            START_API: self._start_api,
+            REQ_IDS: self._req_ids,
+            REQ_MANAGED_ACCTS: lambda s, r: s.send(15, 1, self.account),
+            REQ_CURRENT_TIME: lambda s, r: s.send(49, 1, int(time.time())),
+            REQ_MKT_DATA_TYPE: lambda s, r: None,
+            REQ_MKT_DATA: lambda s, r: None,      # keine Quotes, der Quote-Check wird übersprungen
+            CANCEL_MKT_DATA: lambda s, r: None,
+            REQ_POSITIONS: self._req_positions,
+            REQ_OPEN_ORDERS: lambda s, r: self._req_open_orders(s, all_clients=False),
+            REQ_ALL_OPEN_ORDERS: lambda s, r: self._req_open_orders(s, all_clients=True),
+            REQ_COMPLETED_ORDERS: lambda s, r: s.send(102),
+            REQ_ACCOUNT_UPDATES: self._req_account_updates,
+            REQ_ACCOUNT_UPDATES_MULTI: self._req_account_updates_multi,
+            REQ_EXECUTIONS: self._req_executions,
+            REQ_CONTRACT_DETAILS: self._req_contract_details,
+            REQ_MARKET_RULE: self._req_market_rule,
+            PLACE_ORDER: self._place_order,
+            CANCEL_ORDER: self._cancel_order,
+            REQ_GLOBAL_CANCEL: self._global_cancel,
+        }
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._on_connect, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        if self.disconnect_every:
+            self._chaos_task = asyncio.create_task(self._disconnect_periodically())
+        self._log(f"🚀 TWS stand-in listening on {self.host}:{self.port} (server version {SERVER_VERSION})")
+        return self
+
+    async def close(self):
+        if self._chaos_task:
+            self._chaos_task.cancel()
+        tasks = [session.task for session in self.sessions]
+        self.drop_connections(downtime=0)
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def drop_connections(self, downtime=None):
+        """Close all client connections and refuse new ones for `downtime` seconds."""
+        downtime = self.downtime if downtime is None else downtime
+        self._down_until = time.monotonic() + downtime
+        for session in list(self.sessions):
+            session.close()
+        self._log(f"🔌 Dropped all connections (down for {downtime}s)")
+
+    # --- Verbindungen ---
+
+    async def _on_connect(self, reader, writer):
+        if time.monotonic() < self._down_until:
+            writer.close()
+            return
+        session = Session(self, reader, writer)
+        session.task = asyncio.current_task()
+        self.sessions.add(session)
+        try:
+            await session.run()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.sessions.discard(session)
+            session.close()
+            self._log(f"👋 Client {session.client_id} disconnected")
+
+    async def _disconnect_periodically(self):
+        while True:
+            await asyncio.sleep(self.disconnect_every)
+            self.drop_connections()
+
+    def handle(self, session, fields):
+        handler = self._handlers.get(int(fields[0]))
+        if handler is None:
+            self._log(f"⚠️ Unsupported message {fields[0]} ignored")
+            return
+        r = _Fields(fields)
+        r.skip(1)
+        try:
+            handler(session, r)
+        except Exception as e:
+            self._log(f"❌ Error handling message {fields[0]}: {e}")
+            session.send(4, 2, -1, 320, f"Error reading request: {e}")
+
+    def _send_to(self, client_id, *fields):
+        for session in self.sessions:
+            if session.client_id == client_id:
+                session.send(*fields)
+
+    def _log(self, message):
+        if self.verbose:
+            print(message)
+
+    # --- Requests ---
+
+    def _start_api(self, session, r):
+        r.skip(1)  # version
+        client_id = r.int()
+        if any(other.client_id == client_id for other in self.sessions):
+            session.send(4, 2, -1, 326, f"Unable to connect as the client id {client_id} is already in use.")
+            session.close()
+            return
+        session.client_id = client_id
+        self.next_ids.setdefault(session.client_id, 1)
+        session.send(15, 1, self.account)
+        session.send(9, 1, self.next_ids[session.client_id])
+        self._log(f"✅ Client {session.client_id} connected")
+
+    def _req_ids(self, session, r):
+        session.send(9, 1, self.next_ids.get(session.client_id, 1))
+
+    def _req_positions(self, session, r):
+        session.positions = True
+        for contract, position, avg_cost in self.positions.values():
+            self._send_position(session, contract, position, avg_cost)
+        session.send(62, 1)
+
+    def _req_open_orders(self, session, all_clients):
+        for gw_order in self.orders.values():
+            if gw_order.active and (all_clients or gw_order.client_id == session.client_id):
+                self._send_open_order(session, gw_order)
+                self._send_status(session, gw_order)
+        session.send(53, 1)
+
+    def _req_account_updates(self, session, r):
+        r.skip(1)  # version
+        session.account_updates = r.bool()
+        if session.account_updates:
+            session.send(54, 1, self.account)
+
+    def _req_account_updates_multi(self, session, r):
+        r.skip(1)
+        session.send(74, 1, r.int())
+
+    def _req_executions(self, session, r):
+        r.skip(1)  # version
+        req_id = r.int()
+        for client_id, execution, report in self.executions:
+            if session.client_id in (0, client_id):
+                session.send(11, req_id, *execution)
+        session.send(55, 1, req_id)
+        for client_id, execution, report in self.executions:
+            if session.client_id in (0, client_id):
+                session.send(*report)
+
+    def _req_contract_details(self, session, r):
+        r.skip(1)  # version
+        req_id = r.int()
+        request = parse_contract(r)
+        details = []
+        if request.secType in ("FUT", ""):
+            details = [
+                cd for cd in futures_chain(request.symbol, request.exchange or "CME", request.currency or "USD")
+                if (not request.conId or cd.contract.conId == request.conId)
+                and (not request.localSymbol or cd.contract.localSymbol == request.localSymbol)
+                and cd.contract.lastTradeDateOrContractMonth.startswith(request.lastTradeDateOrContractMonth)
+            ]
+        if not details:
+            session.send(4, 2, req_id, 200, "No security definition has been found for the request")
+            return
+        for cd in details:
+            c = cd.contract
+            session.send(
+                10, 8, req_id, c.symbol, c.secType, c.lastTradeDateOrContractMonth, 0.0, "", c.exchange,
+                c.currency, c.localSymbol, c.tradingClass, c.tradingClass, c.conId, cd.minTick, 1,
+                c.multiplier, "LMT,MKT,STP,STP LMT,TRAIL,TRAIL LIMIT", cd.validExchanges, cd.priceMagnifier, 0,
+                cd.longName, "", cd.contractMonth, "", "", "", cd.timeZoneId, "", "", "", "", 0,
+                1, "", "", cd.marketRuleIds, c.lastTradeDateOrContractMonth, "")
+        session.send(52, 1, req_id)
+
+    def _req_market_rule(self, session, r):
+        rule_id = r.int()
+        increments = MARKET_RULES.get(rule_id, [])
+        session.send(93, rule_id, len(increments),
+                     *itertools.chain.from_iterable((i.lowEdge, i.increment) for i in increments))
+
+    def _place_order(self, session, r):
+        contract, order = parse_place_order(r.fields)
+        client_id = session.client_id
+        order.clientId = client_id
+        order.account = order.account or self.account
+        key = (client_id, order.orderId)
+        existing = self.orders.get(key)
+        if existing and not existing.active:
+            session.send(4, 2, order.orderId, 103, "Duplicate order id")
+            return
+        if not existing and order.orderId < self.next_ids.get(client_id, 1):
+            session.send(4, 2, order.orderId, 103, "Duplicate order id")
+            return
+        if order.parentId and (client_id, order.parentId) not in self.orders:
+            session.send(4, 2, order.orderId, 135, f"Can't find order with id = {order.parentId}")
+            return
+
+        if existing:
+            # Änderung einer offenen Order
+            o = existing.order
+            o.totalQuantity, o.lmtPrice, o.auxPrice = order.totalQuantity, order.lmtPrice, order.auxPrice
+            o.trailStopPrice, o.lmtPriceOffset, o.transmit = order.trailStopPrice, order.lmtPriceOffset, order.transmit
+            gw_order = existing
+        else:
+            self.next_ids[client_id] = max(self.next_ids.get(client_id, 1), order.orderId + 1)
+            gw_order = GatewayOrder(client_id, next(self._perm_ids), contract, order)
+            order.permId = gw_order.perm_id
+            self.orders[key] = gw_order
+        self._log(f"📝 {client_id}/{order.orderId} {order.action} {order.totalQuantity} {contract.localSymbol or contract.symbol} "
+                  f"{order.orderType} parent={order.parentId} transmit={order.transmit}")
+
+        if not order.transmit:
+            self._set_status(gw_order, "PreSubmitted")
+            return
+
+        # transmit=True aktiviert die ganze Gruppe (Parent + bisher gesendete Children)
+        parent = self.orders.get((client_id, order.parentId)) if order.parentId else gw_order
+        group = [parent] + self._children(parent)
+        for member in group:
+            member.order.transmit = True
+            if member.active:
+                self._set_status(member, "Submitted")
+        if not parent.scheduled and (parent.active or parent.status == "Filled"):
+            parent.scheduled = True
+            if parent.active:
+                asyncio.get_running_loop().call_later(self.fill_latency, self._fill, parent, self.partial_fills)
+            else:
+                asyncio.get_running_loop().call_later(self.exit_latency, self._fill_exit, parent)
+
+    def _cancel_order(self, session, r):
+        r.skip(1)  # version
+        order_id = r.int()
+        gw_order = self.orders.get((session.client_id, order_id))
+        if gw_order is None:
+            session.send(4, 2, order_id, 135, f"Can't find order with id = {order_id}")
+        elif not gw_order.active:
+            session.send(4, 2, order_id, 10148,
+                         f"OrderId {order_id} that needs to be cancelled cannot be cancelled, state: {gw_order.status}.")
+        else:
+            self._cancel(gw_order)
+
+    def _global_cancel(self, session, r):
+        for gw_order in list(self.orders.values()):
+            if gw_order.active:
+                self._cancel(gw_order)
+
+    # --- Ausführung ---
+
+    def _children(self, parent):
+        return [o for o in self.orders.values()
+                if o.client_id == parent.client_id and o.order.parentId == parent.order.orderId]
+
+    def _cancel(self, gw_order):
+        self._set_status(gw_order, "Cancelled")
+        session_error = (4, 2, gw_order.order.orderId, 202, "Order Canceled - reason:")
+        self._send_to(gw_order.client_id, *session_error)
+        for child in self._children(gw_order):
+            if child.active:
+                self._cancel(child)
+
+    def _fill(self, gw_order, slices):
+        """Execute the remaining quantity in `slices` partial fills, one per fill_latency."""
+        if not gw_order.active or not gw_order.order.transmit:
+            return
+        quantity = gw_order.remaining if slices <= 1 else max(1.0, math.floor(gw_order.remaining / slices))
+        self._execute(gw_order, min(quantity, gw_order.remaining), self._fill_price(gw_order))
+        if gw_order.remaining > 0:
+            asyncio.get_running_loop().call_later(self.fill_latency, self._fill, gw_order, slices - 1)
+        elif self._children(gw_order):
+            asyncio.get_running_loop().call_later(self.exit_latency, self._fill_exit, gw_order)
+        else:
+            parent = self.orders.get((gw_order.client_id, gw_order.order.parentId)) if gw_order.order.parentId else None
+            if gw_order.order.ocaGroup:
+                # Explizite OCA-Gruppe: Typ 1 storniert, Typ 2/3 reduziert die übrigen um die gefüllte Menge
+                if self._apply_oca(gw_order) and parent is not None:
+                    asyncio.get_running_loop().call_later(self.exit_latency, self._fill_exit, parent)
+            else:
+                for sibling in self._children(parent) if parent else ():
+                    if sibling.active:
+                        self._cancel(sibling)
+
+    def _fill_exit(self, parent):
+        children = [c for c in self._children(parent) if c.active and c.order.transmit]
+        if not children:
+            return
+        wins = self._random.random() < self.take_profit_ratio
+        winner = next((c for c in children if (c.order.orderType == "LMT") == wins), children[0])
+        # Geschwister werden nach dem vollständigen Fill des Gewinners storniert (OCA)
+        self._fill(winner, self.partial_fills)
+
+    def _apply_oca(self, gw_order):
+        """OCA after a full fill. Returns True if a reduced member is still working."""
+        group = gw_order.order.ocaGroup
+        working = False
+        for other in list(self.orders.values()):
+            if other is not gw_order and other.active and other.order.ocaGroup == group \
+                    and other.client_id == gw_order.client_id:
+                if gw_order.order.ocaType in (2, 3) and other.remaining > gw_order.filled:
+                    other.order.totalQuantity -= gw_order.filled
+                    self._set_status(other, other.status)
+                    working = True
+                else:
+                    self._cancel(other)
+        return working
+
+    def _fill_price(self, gw_order):
+        o = gw_order.order
+        if o.orderType == "LMT" and o.lmtPrice != UNSET_DOUBLE:
+            return o.lmtPrice
+        if o.orderType.startswith("TRAIL") and o.trailStopPrice != UNSET_DOUBLE:
+            return o.trailStopPrice
+        if o.orderType.startswith("STP") and o.auxPrice != UNSET_DOUBLE:
+            return o.auxPrice
+        return self.last_price.get(gw_order.contract.conId, o.lmtPrice if o.lmtPrice != UNSET_DOUBLE else 0.0)
+
+    def _execute(self, gw_order, quantity, price):
+        c, o = gw_order.contract, gw_order.order
+        gw_order.avg_price = (gw_order.avg_price * gw_order.filled + price * quantity) / (gw_order.filled + quantity)
+        gw_order.filled += quantity
+        gw_order.last_price = price
+        self.last_price[c.conId] = price
+        realized = self._update_position(gw_order, quantity, price)
+
+        exec_id = f"0000{gw_order.perm_id:08x}.{next(self._exec_ids):08d}.01.01"
+        execution = (
+            o.orderId, c.conId, c.symbol, c.secType, c.lastTradeDateOrContractMonth, c.strike or 0.0, c.right,
+            c.multiplier, c.exchange, c.currency, c.localSymbol, c.tradingClass, exec_id, int(time.time()),
+            o.account, c.exchange, "BOT" if o.action == "BUY" else "SLD", quantity, price, gw_order.perm_id,
+            gw_order.client_id, 0, gw_order.filled, gw_order.avg_price, o.orderRef, "", "", "", 1)
+        report = (59, 1, exec_id, round(self.commission * quantity, 2), c.currency,
+                  UNSET_DOUBLE if realized is None else round(realized, 2), UNSET_DOUBLE, "")
+        self.executions.append((gw_order.client_id, execution, report))
+
+        self._send_to(gw_order.client_id, 11, -1, *execution)
+        self._set_status(gw_order, "Filled" if gw_order.remaining <= 0 else "Submitted")
+        self._send_to(gw_order.client_id, *report)
+        self._log(f"💰 {gw_order.client_id}/{o.orderId} filled {quantity}@{price} ({gw_order.filled}/{o.totalQuantity})")
+
+    def _update_position(self, gw_order, quantity, price):
+        """
+        Average-cost position keeping with commissions in the cost basis, as
+        TWS reports it. Returns the realized P&L of the closing part, None if
+        the fill only opened or increased the position.
+        """
+        c = gw_order.contract
+        multiplier = float(c.multiplier or 1)
+        signed = quantity if gw_order.order.action == "BUY" else -quantity
+        entry = self.positions.setdefault(c.conId, [c, 0.0, 0.0])
+        position, avg_cost = entry[1], entry[2]
+        realized = None
+        if position and (position > 0) != (signed > 0):
+            direction = 1 if position > 0 else -1
+            closing = min(abs(signed), abs(position))
+            realized = ((price * multiplier - direction * self.commission) - avg_cost) * closing * direction
+            position -= closing * direction
+            signed += closing * direction
+            if position == 0:
+                avg_cost = 0.0
+        if signed:
+            direction = 1 if signed > 0 else -1
+            unit_cost = price * multiplier + direction * self.commission
+            avg_cost = (avg_cost * abs(position) + unit_cost * abs(signed)) / (abs(position) + abs(signed))
+            position += signed
+        entry[1], entry[2] = position, avg_cost
+        for session in self.sessions:
+            if session.positions:
+                self._send_position(session, c, position, avg_cost)
+        return realized
+
+    def _set_status(self, gw_order, status):
+        gw_order.status = status
+        for session in self.sessions:
+            if session.client_id == gw_order.client_id:
+                if status in ("PreSubmitted", "Submitted") and gw_order.filled == 0:
+                    self._send_open_order(session, gw_order)
+                self._send_status(session, gw_order)
+
+    # --- Ausgehende Nachrichten ---
+
+    def _send_status(self, session, gw_order):
+        o = gw_order.order
+        session.send(3, gw_order.order.orderId, gw_order.status, gw_order.filled, gw_order.remaining,
+                     gw_order.avg_price, gw_order.perm_id, o.parentId, gw_order.last_price,
+                     gw_order.client_id, "", 0.0)
+
+    def _send_position(self, session, c, position, avg_cost):
+        session.send(61, 3, self.account, c.conId, c.symbol, c.secType, c.lastTradeDateOrContractMonth,
+                     c.strike or 0.0, c.right, c.multiplier, c.exchange, c.currency, c.localSymbol,
+                     c.tradingClass, position, avg_cost)
+
+    def _send_open_order(self, session, gw_order):
+        c, o = gw_order.contract, gw_order.order
+        session.send(
+            5, o.orderId,
+            c.conId, c.symbol, c.secType, c.lastTradeDateOrContractMonth, c.strike or 0.0, c.right,
+            c.multiplier, c.exchange, c.currency, c.localSymbol, c.tradingClass,
+            # action .. goodAfterTime
+            o.action, o.totalQuantity, o.orderType, o.lmtPrice, o.auxPrice, o.tif, o.ocaGroup, o.account,
+            "", 0, o.orderRef, gw_order.client_id, gw_order.perm_id, False, False, 0.0, "",
+            # (unbenutzt), faGroup .. stockRangeUpper
+            "", "", "", "", "", "", "", "", "", "", 0, "", -1, 0, "", "", "", "", "",
+            # displaySize .. deltaNeutralAuxPrice
+            0, False, False, False, "", o.ocaType, False, False, "", o.parentId, 0, "", "", "", "",
+            # continuousUpdate .. comboLegsDescrip, combo legs, order combo legs, smart combo routing params
+            False, "", o.trailStopPrice, o.trailingPercent, "", "", "", 0, 0, 0,
+            # scale fields, hedgeType, optOutSmartRouting .. notHeld, deltaNeutralContract, algoStrategy
+            "", "", "", "", False, "", "", False, 0, "",
+            # solicited, whatIf, order state, randomizeSize, randomizePrice, conditions
+            False, False, gw_order.status, *[""] * 14, False, False, 0,
+            # adjustedOrderType .. usePriceMgmtAlgo
+            "", "", o.trailStopPrice, o.lmtPriceOffset, "", "", "", 0, "", "", "", "", False, False, False, "")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7497)
+    parser.add_argument("--fill-latency", type=float, default=0.05, help="delay until an entry (or partial) fills (s)")
+    parser.add_argument("--exit-latency", type=float, default=0.2, help="delay from entry fill to exit fill (s)")
+    parser.add_argument("--partial-fills", type=int, default=1, help="split every fill into this many executions")
+    parser.add_argument("--take-profit-ratio", type=float, default=0.5, help="share of brackets exiting at take profit")
+    parser.add_argument("--commission", type=float, default=2.25, help="commission per contract")
+    parser.add_argument("--disconnect-every", type=float, help="drop all clients every N seconds")
+    parser.add_argument("--downtime", type=float, default=0.0, help="refuse connections for N seconds after a drop")
+    parser.add_argument("--seed", type=int, help="random seed for the exit selection")
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args()
+
+    gateway = TwsGateway(
+        host=args.host, port=args.port, fill_latency=args.fill_latency, exit_latency=args.exit_latency,
+        partial_fills=args.partial_fills, take_profit_ratio=args.take_profit_ratio, commission=args.commission,
+        disconnect_every=args.disconnect_every, downtime=args.downtime, seed=args.seed, verbose=not args.quiet)
+    await gateway.serve_forever()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        sys.exit(0)
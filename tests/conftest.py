@@ -0,0 +1,18 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Tests importieren die App wie main.py aus dem Repository-Root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def run():
+    """Ein Event-Loop für alle App-Tests: main und der Verbindungspool halten loop-gebundene asyncio.Events."""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop.run_until_complete
+    loop.close()
+    asyncio.set_event_loop(None)
@@ -0,0 +1,30 @@
+import asyncio
+from types import SimpleNamespace
+
+from ib_insync import IB, Future, Order, OrderStatus, Trade
+
+from app.services.bracket_supervisor import BracketSupervisor
+from app.services.order_tracker import OrderTracker
+from app.services.pnl_engine import PnLEngine
+
+
+def make_trade(order_id, status, parent_id=0):
+    order = Order(orderId=order_id, parentId=parent_id, action="BUY", totalQuantity=1, orderType="LMT", lmtPrice=1.0)
+    return Trade(Future("NQ"), order, OrderStatus(orderId=order_id, status=status))
+
+
+def test_expired_bracket_untracks_all_legs():
+    async def run():
+        ib = IB()
+        tracker = OrderTracker(ib)
+        supervisor = BracketSupervisor(tracker, PnLEngine(ib))
+        parent = make_trade(1, "Filled")
+        tp, ts = make_trade(2, "Submitted", 1), make_trade(3, "Submitted", 1)
+        order = SimpleNamespace(symbol="NQ", action="BUY", timeframe="1")
+        bracket = supervisor.submit(order, parent, tp, ts, fill_timeout=1, bracket_timeout=0.05)
+        await asyncio.gather(*supervisor._tasks.values())
+        return supervisor.get(bracket["id"]), tracker
+
+    bracket, tracker = asyncio.run(run())
+    assert bracket["status"] == "expired"
+    assert tracker._tracked == {}
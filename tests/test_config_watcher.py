@@ -0,0 +1,50 @@
+import os
+
+import yaml
+
+from app.core.config import ConfigWatcher
+
+CONFIG = {"order_settings": {"overrides": {"quantity": 2}}}
+
+
+def write(path, content):
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def test_unchanged_content_updates_last_modified(tmp_path):
+    path = str(tmp_path / "config.yaml")
+    write(path, yaml.dump(CONFIG))
+    watcher = ConfigWatcher(path)
+    watcher.reload()
+    os.utime(path, (1, 1))
+    watcher.reload()
+    assert watcher.version == 1
+    assert watcher.last_modified == os.path.getmtime(path)
+
+
+def test_partial_write_keeps_last_good_config(tmp_path):
+    path = str(tmp_path / "config.yaml")
+    write(path, yaml.dump(CONFIG))
+    watcher = ConfigWatcher(path)
+    watcher.reload()
+    for content in ("", "order_settings:\n  overrides: [unclosed"):
+        write(path, content)
+        os.utime(path, (2, 2))
+        watcher.reload()
+        assert watcher.version == 1
+        assert watcher.config == CONFIG
+        assert watcher.last_modified != 2
+
+
+def test_missing_file_publishes_defaults(tmp_path):
+    path = str(tmp_path / "config.yaml")
+    write(path, yaml.dump(CONFIG))
+    watcher = ConfigWatcher(path)
+    watcher.reload()
+    published = []
+    watcher.on_change = published.append
+    os.remove(path)
+    watcher.reload()
+    assert watcher.version == 2
+    assert published == [{}]
@@ -0,0 +1,70 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from ib_insync import ContractDetails, Future, Stock
+
+from app.services.contract_resolver import ContractResolver
+from app.services.instrument_registry import InstrumentRegistry
+
+
+class FakeIB:
+    """reqContractDetailsAsync with a fixed list of contracts; fail=True simulates an IB error."""
+
+    def __init__(self, details):
+        self.details = details
+        self.fail = False
+        self.requests = 0
+
+    async def reqContractDetailsAsync(self, contract):
+        self.requests += 1
+        if self.fail:
+            raise TimeoutError("IB did not answer")
+        return [d for d in self.details if d.contract.symbol == contract.symbol
+                and d.contract.secType == contract.secType]
+
+
+def future(con_id, days):
+    expiry = (datetime.now() + timedelta(days=days)).strftime("%Y%m%d")
+    return ContractDetails(contract=Future(conId=con_id, symbol="NQ", exchange="CME", currency="USD",
+                                           lastTradeDateOrContractMonth=expiry))
+
+
+def test_refresh_rolls_to_next_month_before_expiry():
+    async def run():
+        resolver = ContractResolver(FakeIB([future(1, 2), future(2, 92)]))
+        front = await resolver.resolve("NQ1!")
+        # Front Month läuft innerhalb des Horizonts aus -> vorab auf den nächsten Monat rollen
+        await resolver.refresh_expiring(horizon=timedelta(days=3))
+        return front, resolver.get("NQ1!")
+
+    front, rolled = asyncio.run(run())
+    assert front.conId == 1
+    assert rolled.conId == 2
+
+
+def test_failed_refresh_keeps_cached_contract():
+    async def run():
+        ib = FakeIB([future(1, 2), future(2, 92)])
+        resolver = ContractResolver(ib)
+        await resolver.resolve("NQ1!")
+        ib.fail = True
+        await resolver.refresh_expiring(horizon=timedelta(days=3))
+        return resolver.get("NQ1!")
+
+    assert asyncio.run(run()).conId == 1
+
+
+def test_stock_resolves_with_stock_commission():
+    async def run():
+        aapl = ContractDetails(contract=Stock(conId=265598, symbol="AAPL", exchange="SMART", currency="USD"),
+                               minTick=0.01)
+        resolver = ContractResolver(FakeIB([future(1, 30), aapl]), sec_types={"aapl": "stk"})
+        contract = await resolver.resolve("NASDAQ:AAPL")
+        spec = await InstrumentRegistry(resolver).load("NASDAQ:AAPL")
+        return contract, spec, resolver.get("NASDAQ:AAPL")
+
+    contract, spec, cached = asyncio.run(run())
+    assert contract.conId == 265598 and contract.secType == "STK"
+    assert cached is contract
+    assert spec.sec_type == "STK"
+    assert spec.commission_for(100) == 1.0 and spec.commission_for(1000) == 5.0
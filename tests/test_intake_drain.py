@@ -0,0 +1,53 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "testing"))
+
+from replay_benchmark import Replay   # noqa: E402
+from stub_broker import StubBroker    # noqa: E402
+
+ALERT = {"symbol": "NQ1!", "action": "BUY", "quantity": 1, "limitPrice": 18000.0,
+         "takeProfit": 40, "trailAmt": 7, "timeframe": "1"}
+
+
+def test_queued_alert_waits_for_reconnect(tmp_path, run):
+    async def replay_run():
+        async with Replay(StubBroker()).running(str(tmp_path / "journal.db")) as replay:
+            main = replay.main
+            ib = main.ib_pool.orders
+            connect, reconnect = ib.connectAsync, asyncio.Event()
+
+            async def blocked_connect(*args, **kwargs):
+                await reconnect.wait()
+                return await connect(*args, **kwargs)
+
+            # Verbindung bricht während des Drains ab, der Reconnect hängt bis zur Freigabe
+            submit, attempts = main.submit_bracket_order, []
+
+            async def failing_submit(order, received_at=None):
+                attempts.append(order)
+                if len(attempts) == 1:
+                    ib.connectAsync = blocked_connect
+                    ib.disconnect()
+                    raise ConnectionError("Not connected")
+                return await submit(order, received_at)
+
+            main.submit_bracket_order = failing_submit
+            main.services_ready.clear()
+            record_id = main.intake.accept(ALERT)["intakeId"]
+            health = (await replay.client.get("/health")).json()
+            drain = asyncio.create_task(main.drain_intake())
+            await asyncio.sleep(0.2)
+            waiting = ([r.id for r in main.intake.pending()], main.services_ready.is_set())
+
+            reconnect.set()
+            await asyncio.wait_for(drain, 5)
+            main.submit_bracket_order = submit
+            return record_id, health, waiting, len(attempts), main.intake.pending_count, main.services_ready.is_set()
+
+    record_id, health, waiting, attempts, pending, ready = run(replay_run())
+    assert health["status"] == "starting"
+    assert waiting == ([record_id], False)   # bleibt vorgemerkt, ready erst nach dem Reconnect
+    assert attempts == 2          # nach dem Reconnect erneut platziert, nicht als Fehler verworfen
+    assert pending == 0 and ready
@@ -0,0 +1,46 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "testing"))
+
+from replay_benchmark import Replay   # noqa: E402
+from stub_broker import StubBroker    # noqa: E402
+
+ALERTS = [{"symbol": "NQ1!", "action": "BUY", "quantity": 1, "limitPrice": 18000.0 + i,
+           "takeProfit": 40, "trailAmt": 7, "timeframe": str(i)} for i in range(3)]
+
+
+def test_failed_place_does_not_release_sent_brackets(tmp_path, run):
+    async def replay_run():
+        broker = StubBroker(fill_latency=60, exit_latency=60)
+        async with Replay(broker).running(str(tmp_path / "journal.db")) as replay:
+            ib = replay.main.ib
+            place, calls = ib.placeOrder, []
+
+            def failing_place(contract, order):
+                calls.append(order)
+                if len(calls) == 5:   # Take Profit der zweiten Bracket
+                    raise RuntimeError("socket error")
+                return place(contract, order)
+
+            ib.placeOrder = failing_place
+            try:
+                await replay.client.post("/webhook/batch", json=ALERTS, headers={"Idempotency-Key": "batch-1"})
+            except RuntimeError:
+                pass
+            ib.placeOrder = place
+            cancelled = [t.order.orderId for t in broker.trades.values() if t.orderStatus.status == "Cancelled"]
+
+            retry = await replay.client.post("/webhook/batch", json=ALERTS, headers={"Idempotency-Key": "batch-1"})
+            parents = [t for t in broker.trades.values() if not t.order.parentId]
+            return calls, cancelled, retry.json(), parents
+
+    calls, cancelled, retry, parents = run(replay_run())
+    assert cancelled == [calls[3].orderId]            # nicht übertragener Parent der zweiten Bracket verworfen
+    results = retry["results"]
+    assert results[0].get("duplicate") is True       # bereits gesendet: nicht erneut platziert
+    assert not results[1].get("duplicate") and not results[2].get("duplicate")
+    assert retry["submitted"] == 2
+    live = [p for p in parents if p.orderStatus.status != "Cancelled"]
+    assert len(live) == 3